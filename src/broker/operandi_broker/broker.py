@@ -1,15 +1,21 @@
 from logging import getLogger
+from math import ceil
 from os import environ
-from time import sleep
+import signal
+from time import monotonic, sleep
+from typing import Dict, List, Optional
 
 from operandi_utils import (
     get_log_file_path_prefix, reconfigure_all_loggers, verify_database_uri, verify_and_parse_mq_uri)
 from operandi_utils.constants import LOG_LEVEL_BROKER
-from operandi_utils.hpc import NHRExecutor, NHRTransfer
-from operandi_utils.rabbitmq.constants import (
-    RABBITMQ_QUEUE_HPC_DOWNLOADS, RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS, RABBITMQ_QUEUE_JOB_STATUSES)
+from operandi_utils.rabbitmq import get_connection_consumer
 
-from .broker_utils import create_child_process, kill_workers
+from .broker_utils import (
+    create_batch_scripts_sync_process, create_child_process, kill_workers, send_signal_to_worker)
+from .constants import (
+    BROKER_INVENTORY_LOG_INTERVAL, BROKER_SCALING_INTERVAL, BROKER_SCALING_MESSAGES_PER_WORKER,
+    BROKER_SUPERVISION_INTERVAL, BROKER_WORKER_POOLS)
+from .worker_supervisor import WorkerSupervisor
 
 
 class ServiceBroker:
@@ -38,54 +44,110 @@ class ServiceBroker:
         except ValueError as e:
             raise ValueError(e)
 
-        try:
-            NHRTransfer().upload_batch_scripts()
-            NHRExecutor().make_remote_batch_scripts_executable()
-        except Exception as error:
-            self.log.error(f"Error while trying to upload batch scripts to HPC: {error}")
-
         # A dictionary to keep track of queues and worker pids
         # Keys: Each key is a unique queue name
         # Value: List of worker pids consuming from the key queue name
         self.queues_and_workers = {}
+        # Pids of workers requested to stop after finishing their current message, not reaped yet
+        self.stopping_workers: List[int] = []
+        # Reaps exited workers and restarts the ones that exited unexpectedly
+        self.supervisor = WorkerSupervisor(
+            logger=self.log, queues_and_workers=self.queues_and_workers, stopping_workers=self.stopping_workers,
+            create_worker=self.create_worker_process)
 
-    def run_broker(self):
-        # A list of queues for which a worker process should be created
-        queues = [RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS]
-        status_queue = RABBITMQ_QUEUE_JOB_STATUSES
-        hpc_download_queue = RABBITMQ_QUEUE_HPC_DOWNLOADS
+        # The batch scripts are synced in the background, the workers are started without waiting for the HPC
+        self.sync_batch_scripts()
 
+    def sync_batch_scripts(self):
+        sync_pid = create_batch_scripts_sync_process(self.log)
+        if sync_pid:
+            self.supervisor.helper_started(pid=sync_pid, name="batch_scripts_sync")
+
+    def run_broker(self):
         try:
-            for queue_name in queues:
-                self.log.info(f"Creating a worker process to consume from queue: {queue_name}")
-                self.create_worker_process(queue_name, "submit_worker")
-            self.log.info(f"Creating a status worker process to consume from queue: {status_queue}")
-            self.create_worker_process(status_queue, "status_worker")
-            self.log.info(f"Creating a download worker process to consume from queue: {hpc_download_queue}")
-            self.create_worker_process(hpc_download_queue, "download_worker")
+            for queue_name, worker_pool in BROKER_WORKER_POOLS.items():
+                self.log.info(
+                    f"Creating {worker_pool['min_workers']} {worker_pool['worker_type']} processes "
+                    f"to consume from queue: {queue_name}, max: {worker_pool['max_workers']}")
+                for _ in range(worker_pool["min_workers"]):
+                    self.create_worker_process(queue_name, worker_pool["worker_type"])
         except Exception as error:
             self.log.error(f"Error while creating worker processes: {error}")
 
         try:
-            # Sleep the parent process till a signal is invoked
-            # Better than sleeping in loop, not tested yet
-            # signal.pause()
-
-            # Loop and sleep
+            last_scaling_time = monotonic()
+            last_inventory_log_time = monotonic()
             while True:
-                sleep(5)
+                sleep(BROKER_SUPERVISION_INTERVAL)
+                self.supervisor.supervise()
+                if monotonic() - last_scaling_time >= BROKER_SCALING_INTERVAL:
+                    self.scale_workers()
+                    last_scaling_time = monotonic()
+                if monotonic() - last_inventory_log_time >= BROKER_INVENTORY_LOG_INTERVAL:
+                    self.log.info(f"Workers inventory: {self.get_workers_inventory()}")
+                    last_inventory_log_time = monotonic()
         # TODO: Check this in docker environment
         # This may not work with SSH/Docker, SIGINT may not be caught with KeyboardInterrupt.
         except KeyboardInterrupt:
             self.log.info(f"SIGINT signal received. Sending SIGINT to worker processes.")
             # Sends SIGINT to workers
-            kill_workers(self.log, self.queues_and_workers)
+            self.kill_workers()
             self.log.info(f"Closing gracefully in 3 seconds!")
             exit(0)
         except Exception as error:
             # This is for logging any other errors
             self.log.error(f"Unexpected error: {error}")
 
+    def get_queue_depths(self) -> Dict[str, Optional[int]]:
+        # A short-lived connection, the broker process must not keep connections that are inherited by forked workers
+        rmq_consumer = get_connection_consumer(rabbitmq_url=self.rabbitmq_url)
+        try:
+            return {
+                queue_name: rmq_consumer.get_queue_message_count(queue_name=queue_name)
+                for queue_name in BROKER_WORKER_POOLS
+            }
+        finally:
+            rmq_consumer.disconnect()
+
+    def scale_workers(self):
+        try:
+            queue_depths = self.get_queue_depths()
+        except Exception as error:
+            self.log.error(f"Failed to get the depths of the queues: {error}")
+            return
+        for queue_name, worker_pool in BROKER_WORKER_POOLS.items():
+            queue_depth = queue_depths.get(queue_name, None)
+            if queue_depth is None:
+                continue
+            current_workers = len(self.queues_and_workers.get(queue_name, []))
+            current_workers += self.supervisor.pending_restarts_amount(queue_name)
+            desired_workers = ceil(queue_depth / BROKER_SCALING_MESSAGES_PER_WORKER)
+            desired_workers = max(worker_pool["min_workers"], min(worker_pool["max_workers"], desired_workers))
+            if desired_workers > current_workers:
+                self.log.info(
+                    f"Scaling up queue: {queue_name}, ready messages: {queue_depth}, "
+                    f"workers: {current_workers} -> {desired_workers}")
+                for _ in range(desired_workers - current_workers):
+                    self.create_worker_process(queue_name, worker_pool["worker_type"])
+            elif desired_workers < current_workers and self.queues_and_workers.get(queue_name, []):
+                # Scale down gradually, a single worker per scaling round
+                self.log.info(
+                    f"Scaling down queue: {queue_name}, ready messages: {queue_depth}, "
+                    f"workers: {current_workers} -> {current_workers - 1}")
+                self.stop_worker_process(queue_name)
+
+    # Requests a graceful stop of a worker process, the worker exits after finishing its current message
+    def stop_worker_process(self, queue_name: str) -> None:
+        worker_pid = self.queues_and_workers[queue_name].pop()
+        self.log.info(f"Requesting a graceful stop of worker process with pid: {worker_pid}, queue: {queue_name}")
+        send_signal_to_worker(self.log, worker_pid=worker_pid, signal_type=signal.SIGUSR1)
+        self.stopping_workers.append(worker_pid)
+
+    def get_workers_inventory(self) -> Dict:
+        inventory = self.supervisor.get_inventory()
+        inventory["stopping_workers"] = list(self.stopping_workers)
+        return inventory
+
     # Creates a separate worker process and append its pid if successful
     def create_worker_process(self, queue_name, worker_type: str) -> None:
         # If the entry for queue_name does not exist, create id
@@ -100,6 +162,7 @@ class ServiceBroker:
             self.log.info(f"Assigning a new worker process with pid: {child_pid}, to queue: {queue_name}")
             # append the pid to the workers list of the queue_name
             (self.queues_and_workers[queue_name]).append(child_pid)
+            self.supervisor.worker_started(pid=child_pid, queue_name=queue_name, worker_type=worker_type)
 
     def kill_workers(self):
-        kill_workers(self.log, self.queues_and_workers)
+        kill_workers(self.log, {**self.queues_and_workers, "stopping_workers": self.stopping_workers})
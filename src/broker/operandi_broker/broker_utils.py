@@ -1,10 +1,12 @@
 from logging import Logger
-from os import fork
+from os import _exit, fork
 import psutil
 import signal
 from time import sleep
 from typing import Dict
 
+from operandi_utils.hpc import NHRTransfer
+
 from .job_worker_download import JobWorkerDownload
 from .job_worker_status import JobWorkerStatus
 from .job_worker_submit import JobWorkerSubmit
@@ -39,6 +41,35 @@ def create_child_process(
         exit(-1)
 
 
+# Forks a short-lived child process that syncs the batch scripts to the HPC and exits.
+# The sync runs in a separate process, hence, the broker process stays single threaded and
+# does not pass held locks of the paramiko or the logging threads to the forked workers.
+def create_batch_scripts_sync_process(logger: Logger) -> int:
+    logger.info(f"Trying to create a process for syncing the batch scripts to the HPC")
+    try:
+        created_pid = fork()
+    except Exception as os_error:
+        logger.error(f"Failed to create the batch scripts sync process, reason: {os_error}")
+        return 0
+
+    if created_pid != 0:
+        return created_pid
+    exit_code = 0
+    hpc_io_transfer = None
+    try:
+        hpc_io_transfer = NHRTransfer()
+        hpc_io_transfer.sync_batch_scripts()
+    except Exception as error:
+        logger.error(f"Error while trying to sync batch scripts to HPC: {error}")
+        exit_code = 1
+    finally:
+        if hpc_io_transfer:
+            hpc_io_transfer.close_sftp_client()
+            hpc_io_transfer.connection_pool.close_all()
+    # Skip the cleanup handlers inherited from the broker process
+    _exit(exit_code)
+
+
 def send_signal_to_worker(logger: Logger, worker_pid: int, signal_type: signal):
     try:
         process = psutil.Process(pid=worker_pid)
@@ -0,0 +1,91 @@
+from os import environ
+
+from operandi_utils.rabbitmq import (
+    RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_HPC_DOWNLOADS, RABBITMQ_QUEUE_JOB_STATUSES, RABBITMQ_QUEUE_USERS)
+
+__all__ = [
+    "BROKER_SCALING_INTERVAL",
+    "BROKER_SCALING_MESSAGES_PER_WORKER",
+    "BROKER_INVENTORY_LOG_INTERVAL",
+    "BROKER_SUPERVISION_INTERVAL",
+    "BROKER_WORKER_POOLS",
+    "BROKER_WORKER_RESTART_BACKOFF_BASE",
+    "BROKER_WORKER_RESTART_BACKOFF_MAX",
+    "BROKER_WORKER_STABLE_RUN_TIME",
+    "DOWNLOAD_PREVIOUS_DIRS_CLEANUP_INTERVAL",
+    "HPC_POOL_METRICS_LOG_INTERVAL",
+    "SUBMIT_PIPELINE_MAX_IN_FLIGHT",
+    "SUBMIT_PIPELINE_SHUTDOWN_TIMEOUT",
+    "STATUS_CHECK_INTERVAL_NEAR_COMPLETION",
+    "STATUS_CHECK_INTERVAL_PENDING",
+    "STATUS_CHECK_INTERVAL_RUNNING",
+    "STATUS_CHECK_CLAIM_TTL",
+    "STATUS_CHECK_MIN_INTERVAL",
+    "STATUS_ESTIMATED_SECONDS_PER_PAGE",
+    "STATUS_NEAR_COMPLETION_RATIO",
+    "STATUS_RECONCILE_TICK"
+]
+
+# Seconds between two batched slurm state checks, status requests received in between are coalesced
+STATUS_CHECK_MIN_INTERVAL: int = int(environ.get("OPERANDI_BROKER_STATUS_CHECK_MIN_INTERVAL", 10))
+# Seconds in which a job state check claimed by any status worker process is not repeated by another one
+STATUS_CHECK_CLAIM_TTL: int = int(environ.get("OPERANDI_BROKER_STATUS_CHECK_CLAIM_TTL", 10))
+# Seconds between two runs of the status reconciler, only the jobs due for a check are queried each run
+STATUS_RECONCILE_TICK: int = int(environ.get("OPERANDI_BROKER_STATUS_RECONCILE_TICK", 15))
+# Seconds between two state checks of the same job depending on the job state
+STATUS_CHECK_INTERVAL_PENDING: int = int(environ.get("OPERANDI_BROKER_STATUS_CHECK_INTERVAL_PENDING", 120))
+STATUS_CHECK_INTERVAL_RUNNING: int = int(environ.get("OPERANDI_BROKER_STATUS_CHECK_INTERVAL_RUNNING", 60))
+STATUS_CHECK_INTERVAL_NEAR_COMPLETION: int = int(
+    environ.get("OPERANDI_BROKER_STATUS_CHECK_INTERVAL_NEAR_COMPLETION", 15))
+# Used to estimate the expected run time of a job from the amount of pages of the workspace
+STATUS_ESTIMATED_SECONDS_PER_PAGE: float = float(environ.get("OPERANDI_BROKER_STATUS_ESTIMATED_SECONDS_PER_PAGE", 3))
+# A running job is considered near completion after this ratio of the expected run time has passed
+STATUS_NEAR_COMPLETION_RATIO: float = 0.8
+
+# The max amount of workflow job submissions a submit worker processes at once, each in a different pipeline stage
+SUBMIT_PIPELINE_MAX_IN_FLIGHT: int = int(environ.get("OPERANDI_BROKER_SUBMIT_PIPELINE_MAX_IN_FLIGHT", 3))
+# Seconds to wait for the running pipeline stages of a submit worker that is shutting down
+SUBMIT_PIPELINE_SHUTDOWN_TIMEOUT: int = 5
+
+# Seconds between two removals of the expired previous versions of the workspaces swapped by a download worker
+DOWNLOAD_PREVIOUS_DIRS_CLEANUP_INTERVAL: int = 60
+
+# Seconds between two supervision rounds of the broker main loop
+BROKER_SUPERVISION_INTERVAL: int = 5
+# Seconds between two log entries of the live worker inventory
+BROKER_INVENTORY_LOG_INTERVAL: int = 300
+# Seconds between two log entries of the HPC connection pool metrics of a worker, aligned with the inventory log
+HPC_POOL_METRICS_LOG_INTERVAL: int = BROKER_INVENTORY_LOG_INTERVAL
+# Seconds a worker has to run to be considered stable, earlier exits increase the restart backoff
+BROKER_WORKER_STABLE_RUN_TIME: int = 60
+# Restart backoff in seconds, doubled for every consecutive early exit of a worker of the same queue
+BROKER_WORKER_RESTART_BACKOFF_BASE: int = 5
+BROKER_WORKER_RESTART_BACKOFF_MAX: int = 300
+# Seconds between two scaling decisions based on the RabbitMQ queue depths
+BROKER_SCALING_INTERVAL: int = int(environ.get("OPERANDI_BROKER_SCALING_INTERVAL", 30))
+# The amount of ready messages in a queue per worker process that justifies one more worker
+BROKER_SCALING_MESSAGES_PER_WORKER: int = int(environ.get("OPERANDI_BROKER_SCALING_MESSAGES_PER_WORKER", 2))
+
+# Queue name -> worker type, min and max amount of worker processes consuming from the queue
+BROKER_WORKER_POOLS = {
+    RABBITMQ_QUEUE_HARVESTER: {
+        "worker_type": "submit_worker",
+        "min_workers": int(environ.get("OPERANDI_BROKER_HARVESTER_WORKERS_MIN", 1)),
+        "max_workers": int(environ.get("OPERANDI_BROKER_HARVESTER_WORKERS_MAX", 4))
+    },
+    RABBITMQ_QUEUE_USERS: {
+        "worker_type": "submit_worker",
+        "min_workers": int(environ.get("OPERANDI_BROKER_USERS_WORKERS_MIN", 1)),
+        "max_workers": int(environ.get("OPERANDI_BROKER_USERS_WORKERS_MAX", 2))
+    },
+    RABBITMQ_QUEUE_JOB_STATUSES: {
+        "worker_type": "status_worker",
+        "min_workers": int(environ.get("OPERANDI_BROKER_STATUS_WORKERS_MIN", 1)),
+        "max_workers": int(environ.get("OPERANDI_BROKER_STATUS_WORKERS_MAX", 1))
+    },
+    RABBITMQ_QUEUE_HPC_DOWNLOADS: {
+        "worker_type": "download_worker",
+        "min_workers": int(environ.get("OPERANDI_BROKER_DOWNLOAD_WORKERS_MIN", 1)),
+        "max_workers": int(environ.get("OPERANDI_BROKER_DOWNLOAD_WORKERS_MAX", 2))
+    }
+}
@@ -0,0 +1,209 @@
+from json import dumps
+from logging import Logger
+from time import monotonic
+from typing import Dict, List, Set
+
+from operandi_utils.constants import StateJob, StateJobSlurm, StateWorkspace
+from operandi_utils.database import (
+    DBHPCSlurmJob, DBWorkflowJob, DBWorkspace, sync_db_claim_hpc_slurm_jobs_state_check,
+    sync_db_get_active_hpc_slurm_jobs, sync_db_get_workflow_job, sync_db_get_workspace,
+    sync_db_update_hpc_slurm_jobs_states, sync_db_update_workflow_job, sync_db_update_workspace
+)
+from operandi_utils.hpc import NHRExecutor
+from operandi_utils.rabbitmq import RABBITMQ_QUEUE_HPC_DOWNLOADS
+from operandi_utils.rabbitmq.publisher import RMQPublisher
+from .constants import (
+    STATUS_CHECK_CLAIM_TTL, STATUS_CHECK_INTERVAL_NEAR_COMPLETION, STATUS_CHECK_INTERVAL_PENDING,
+    STATUS_CHECK_INTERVAL_RUNNING, STATUS_CHECK_MIN_INTERVAL, STATUS_ESTIMATED_SECONDS_PER_PAGE, STATUS_NEAR_COMPLETION_RATIO
+)
+
+
+class HPCStatusEngine:
+    """
+    Checks the slurm states of all active jobs with a single sacct call, updates the changed states
+    in bulk, and publishes result download messages for the jobs that finished in the HPC.
+
+    Each job is scheduled for its next check with an interval adapted to its state: waiting jobs are
+    checked rarely, running jobs more often, and jobs close to their expected completion most often.
+
+    Before querying the HPC, the state checks are claimed in the DB. Jobs already checked by any
+    status worker process in the last `claim_ttl` seconds are skipped, hence, duplicate status
+    requests result in at most one HPC check per job and interval.
+    """
+    def __init__(
+        self, logger: Logger, hpc_executor: NHRExecutor, rmq_publisher: RMQPublisher,
+        min_interval: int = STATUS_CHECK_MIN_INTERVAL, claim_ttl: int = STATUS_CHECK_CLAIM_TTL
+    ):
+        self.log = logger
+        self.hpc_executor = hpc_executor
+        self.rmq_publisher = rmq_publisher
+        self.min_interval = min_interval
+        self.claim_ttl = claim_ttl
+        self.last_check_time = None
+        # Workflow job id -> monotonic time of the next scheduled slurm state check
+        self._next_check_times: Dict[str, float] = {}
+        # Workflow job id -> monotonic time since the slurm job is known to be running
+        self._running_since: Dict[str, float] = {}
+        # Workflow job id -> expected run time in seconds
+        self._expected_durations: Dict[str, float] = {}
+
+    def check_active_jobs(self, force: bool = False) -> List[str]:
+        """
+        Returns the workflow job ids whose slurm job state changed. Unless `force` is set,
+        the HPC is not queried again if the last check happened less than `min_interval` seconds ago.
+        """
+        if not force and self.last_check_time and monotonic() - self.last_check_time < self.min_interval:
+            self.log.info(f"Slurm job states were checked less than {self.min_interval} seconds ago, skipping")
+            return []
+        self.last_check_time = monotonic()
+
+        db_hpc_slurm_jobs: List[DBHPCSlurmJob] = sync_db_get_active_hpc_slurm_jobs()
+        if not db_hpc_slurm_jobs:
+            self.log.info("No active slurm jobs to be checked")
+            return []
+        return self._check_jobs(db_hpc_slurm_jobs)
+
+    def request_check(self, workflow_job_id: str) -> List[str]:
+        """
+        Marks the job as due for a check. The check is coalesced with the checks of other due jobs
+        and is not executed if the last check happened less than `min_interval` seconds ago.
+        """
+        self._next_check_times[workflow_job_id] = 0
+        if self.last_check_time and monotonic() - self.last_check_time < self.min_interval:
+            self.log.info(f"Slurm job states were checked less than {self.min_interval} seconds ago, coalescing")
+            return []
+        return self.reconcile_due_jobs()
+
+    def reconcile_due_jobs(self) -> List[str]:
+        """
+        Checks only the active jobs whose scheduled check time has been reached.
+        Returns the workflow job ids whose slurm job state changed.
+        """
+        db_hpc_slurm_jobs: List[DBHPCSlurmJob] = sync_db_get_active_hpc_slurm_jobs()
+        self._forget_inactive_jobs({db_hpc_slurm_job.workflow_job_id for db_hpc_slurm_job in db_hpc_slurm_jobs})
+        now = monotonic()
+        due_db_hpc_slurm_jobs = [
+            db_hpc_slurm_job for db_hpc_slurm_job in db_hpc_slurm_jobs
+            if self._next_check_times.get(db_hpc_slurm_job.workflow_job_id, 0) <= now
+        ]
+        if not due_db_hpc_slurm_jobs:
+            self.log.debug(f"None of the {len(db_hpc_slurm_jobs)} active slurm jobs is due for a check")
+            return []
+        self.last_check_time = now
+        return self._check_jobs(due_db_hpc_slurm_jobs)
+
+    def _check_jobs(self, db_hpc_slurm_jobs: List[DBHPCSlurmJob]) -> List[str]:
+        requested_amount = len(db_hpc_slurm_jobs)
+        db_hpc_slurm_jobs = sync_db_claim_hpc_slurm_jobs_state_check(
+            workflow_job_ids=[db_hpc_slurm_job.workflow_job_id for db_hpc_slurm_job in db_hpc_slurm_jobs],
+            ttl_seconds=self.claim_ttl)
+        if len(db_hpc_slurm_jobs) < requested_amount:
+            self.log.info(
+                f"Skipping {requested_amount - len(db_hpc_slurm_jobs)} slurm jobs already checked "
+                f"in the last {self.claim_ttl} seconds")
+        if not db_hpc_slurm_jobs:
+            return []
+        slurm_job_ids = [db_hpc_slurm_job.hpc_slurm_job_id for db_hpc_slurm_job in db_hpc_slurm_jobs]
+        new_slurm_job_states = self.hpc_executor.check_slurm_job_states(slurm_job_ids=slurm_job_ids)
+
+        changed_states: Dict[str, StateJobSlurm] = {}
+        for db_hpc_slurm_job in db_hpc_slurm_jobs:
+            old_slurm_job_state = db_hpc_slurm_job.hpc_slurm_job_state
+            new_slurm_job_state = new_slurm_job_states.get(db_hpc_slurm_job.hpc_slurm_job_id, StateJobSlurm.UNSET)
+            current_slurm_job_state = old_slurm_job_state
+            if new_slurm_job_state != StateJobSlurm.UNSET:
+                current_slurm_job_state = new_slurm_job_state
+            self._schedule_next_check(
+                workflow_job_id=db_hpc_slurm_job.workflow_job_id, slurm_job_state=current_slurm_job_state)
+            if new_slurm_job_state == StateJobSlurm.UNSET or old_slurm_job_state == new_slurm_job_state:
+                continue
+            self.log.info(
+                f"Job {db_hpc_slurm_job.hpc_slurm_job_id} changed state: "
+                f"{old_slurm_job_state} -> {new_slurm_job_state}")
+            changed_states[db_hpc_slurm_job.workflow_job_id] = new_slurm_job_state
+        self.log.info(f"Checked {len(db_hpc_slurm_jobs)} active slurm jobs, changed: {len(changed_states)}")
+
+        # The slurm job state of each job is persisted only after its workflow job state was handled.
+        # Otherwise, a failed handling would leave the new slurm job state in the DB and the job would
+        # never be handled again, since the next checks would see no change of the slurm job state.
+        handled_workflow_job_ids = []
+        for workflow_job_id, new_slurm_job_state in changed_states.items():
+            try:
+                self.handle_workflow_job_state(workflow_job_id=workflow_job_id, new_slurm_job_state=new_slurm_job_state)
+                sync_db_update_hpc_slurm_jobs_states(workflow_job_ids_to_states={workflow_job_id: new_slurm_job_state})
+            except Exception as error:
+                self.log.warning(f"Failed to handle the state of workflow job: {workflow_job_id}, {error}")
+                # Check the job again with the next reconciliation
+                self._forget_job(workflow_job_id)
+                continue
+            handled_workflow_job_ids.append(workflow_job_id)
+        return handled_workflow_job_ids
+
+    def _schedule_next_check(self, workflow_job_id: str, slurm_job_state: StateJobSlurm):
+        now = monotonic()
+        if StateJobSlurm.is_state_hpc_success(slurm_job_state) or StateJobSlurm.is_state_hpc_fail(slurm_job_state):
+            self._forget_job(workflow_job_id)
+            return
+        if not StateJobSlurm.is_state_running(slurm_job_state):
+            interval = STATUS_CHECK_INTERVAL_PENDING
+            if slurm_job_state == StateJobSlurm.COMPLETING:
+                interval = STATUS_CHECK_INTERVAL_NEAR_COMPLETION
+        else:
+            running_since = self._running_since.setdefault(workflow_job_id, now)
+            expected_duration = self._get_expected_duration(workflow_job_id)
+            near_completion_time = running_since + expected_duration * STATUS_NEAR_COMPLETION_RATIO
+            if now >= near_completion_time:
+                interval = STATUS_CHECK_INTERVAL_NEAR_COMPLETION
+            else:
+                # Do not wait past the point where the job is expected to be near its completion
+                interval = min(STATUS_CHECK_INTERVAL_RUNNING, near_completion_time - now)
+                interval = max(STATUS_CHECK_INTERVAL_NEAR_COMPLETION, interval)
+        self._next_check_times[workflow_job_id] = now + interval
+
+    def _get_expected_duration(self, workflow_job_id: str) -> float:
+        if workflow_job_id not in self._expected_durations:
+            try:
+                db_workflow_job: DBWorkflowJob = sync_db_get_workflow_job(workflow_job_id)
+                db_workspace: DBWorkspace = sync_db_get_workspace(db_workflow_job.workspace_id)
+                expected_duration = db_workspace.pages_amount * STATUS_ESTIMATED_SECONDS_PER_PAGE
+            except RuntimeError as error:
+                self.log.warning(f"Failed to estimate the run time of workflow job: {workflow_job_id}, {error}")
+                expected_duration = float("inf")
+            self._expected_durations[workflow_job_id] = expected_duration
+        return self._expected_durations[workflow_job_id]
+
+    def _forget_inactive_jobs(self, active_workflow_job_ids: Set[str]):
+        for workflow_job_id in list(self._next_check_times.keys()):
+            if workflow_job_id not in active_workflow_job_ids:
+                self._forget_job(workflow_job_id)
+
+    def _forget_job(self, workflow_job_id: str):
+        self._next_check_times.pop(workflow_job_id, None)
+        self._running_since.pop(workflow_job_id, None)
+        self._expected_durations.pop(workflow_job_id, None)
+
+    def handle_workflow_job_state(self, workflow_job_id: str, new_slurm_job_state: StateJobSlurm):
+        db_workflow_job: DBWorkflowJob = sync_db_get_workflow_job(workflow_job_id)
+        old_job_state = db_workflow_job.job_state
+        # Convert the slurm job state to operandi workflow job state
+        new_job_state = StateJob.convert_from_slurm_job(slurm_job_state=new_slurm_job_state)
+
+        if old_job_state == new_job_state:
+            self.log.info(f"No change in workflow job state needed, state is still: {old_job_state}")
+            return
+
+        if old_job_state in [StateJob.SUCCESS, StateJob.FAILED, StateJob.TRANSFERRING_FROM_HPC]:
+            self.log.info(f"No change in workflow job state needed, state is already: {old_job_state}")
+            return
+
+        self.log.info(f"Workflow job: {workflow_job_id}, changed state: {old_job_state} -> {new_job_state}")
+        sync_db_update_workflow_job(find_job_id=workflow_job_id, job_state=new_job_state)
+        if new_job_state == StateJob.HPC_SUCCESS or new_job_state == StateJob.HPC_FAILED:
+            sync_db_update_workspace(
+                find_workspace_id=db_workflow_job.workspace_id, state=StateWorkspace.TRANSFERRING_FROM_HPC)
+            sync_db_update_workflow_job(find_job_id=workflow_job_id, job_state=StateJob.TRANSFERRING_FROM_HPC)
+            result_download_message = {"job_id": f"{workflow_job_id}", "previous_job_state": f"{new_job_state.value}"}
+            self.log.info(f"Encoding the result download RabbitMQ message: {result_download_message}")
+            encoded_result_download_message = dumps(result_download_message).encode(encoding="utf-8")
+            self.rmq_publisher.publish_to_queue(
+                queue_name=RABBITMQ_QUEUE_HPC_DOWNLOADS, message=encoded_result_download_message)
@@ -2,14 +2,20 @@ from logging import getLogger
 import signal
 from os import getpid, getppid, setsid
 from sys import exit
+from typing import Optional
 
 from operandi_utils import reconfigure_all_loggers, get_log_file_path_prefix
 from operandi_utils.constants import LOG_LEVEL_WORKER
 from operandi_utils.database import sync_db_initiate_database
-from operandi_utils.hpc import NHRExecutor, NHRTransfer
+from operandi_utils.hpc import NHRConnectionPool, NHRExecutor, NHRTransfer
 from operandi_utils.rabbitmq import get_connection_consumer, get_connection_publisher
+from operandi_utils.rabbitmq.constants import PREFETCH_COUNT
+
+from .constants import HPC_POOL_METRICS_LOG_INTERVAL
 
 NOT_IMPLEMENTED_ERROR: str = "The method was not implemented in the extending class"
+# Seconds between two checks whether a graceful stop of the worker was requested
+GRACEFUL_STOP_CHECK_INTERVAL: int = 1
 
 # Each worker class listens to a specific queue, consumes messages, and processes messages.
 class JobWorkerBase:
@@ -23,11 +29,16 @@ class JobWorkerBase:
 
         self.rmq_consumer = None
         self.rmq_publisher = None
+        self.hpc_connection_pool: Optional[NHRConnectionPool] = None
         self.hpc_executor = None
         self.hpc_io_transfer = None
 
         self.has_consumed_message = False
         self.current_message_delivery_tag = None
+        # Set when the worker should stop consuming after finishing the current message
+        self.stop_requested = False
+        # The amount of unacknowledged messages delivered to the worker at once
+        self.prefetch_count = PREFETCH_COUNT
 
     def disconnect_rmq_connections(self):
         self.log.info("Disconnecting existing RabbitMQ connections.")
@@ -38,6 +49,15 @@ class JobWorkerBase:
             self.log.info("Disconnecting the RMQ publisher")
             self.rmq_publisher.disconnect()
 
+    def log_hpc_connection_pool_metrics(self):
+        if self.hpc_connection_pool:
+            self.log.info(f"HPC connection pool metrics: {self.hpc_connection_pool.get_metrics()}")
+
+    def close_hpc_connections(self):
+        if self.hpc_connection_pool:
+            self.log_hpc_connection_pool_metrics()
+            self.hpc_connection_pool.close_all()
+
     def __del__(self):
         self.disconnect_rmq_connections()
 
@@ -47,6 +67,10 @@ class JobWorkerBase:
     def _handle_msg_failure(self, interruption: bool):
         raise NotImplementedError(NOT_IMPLEMENTED_ERROR)
 
+    # Extending classes may schedule periodic tasks on the consumer connection before consuming starts
+    def _schedule_periodic_tasks(self):
+        pass
+
     def run(self, hpc_executor: bool, hpc_io_transfer: bool, publisher: bool):
         try:
             # Source: https://unix.stackexchange.com/questions/18166/what-are-session-leaders-in-ps
@@ -54,17 +78,21 @@ class JobWorkerBase:
             setsid()
             # Reconfigure all loggers to the same format
             reconfigure_all_loggers(log_level=LOG_LEVEL_WORKER, log_file_path=self.log_file_path)
-            self.log.info(f"Activating signal handler for SIGINT, SIGTERM")
+            self.log.info(f"Activating signal handler for SIGINT, SIGTERM, SIGUSR1")
             signal.signal(signal.SIGINT, self.signal_handler)
             signal.signal(signal.SIGTERM, self.signal_handler)
+            signal.signal(signal.SIGUSR1, self.graceful_stop_signal_handler)
 
             sync_db_initiate_database(self.db_url)
             self.log.info("MongoDB connection successful.")
             if hpc_executor:
-                self.hpc_executor = NHRExecutor()
+                self.hpc_executor = NHRExecutor(connection_pool=self.hpc_connection_pool)
+                # The executor and the transfer share the same pooled ssh connections
+                self.hpc_connection_pool = self.hpc_executor.connection_pool
                 self.log.info("HPC executor connection successful.")
             if hpc_io_transfer:
-                self.hpc_io_transfer = NHRTransfer()
+                self.hpc_io_transfer = NHRTransfer(connection_pool=self.hpc_connection_pool)
+                self.hpc_connection_pool = self.hpc_io_transfer.connection_pool
                 self.log.info("HPC transfer connection successful.")
             if publisher:
                 self.rmq_publisher = get_connection_publisher(rabbitmq_url=self.rmq_url, enable_acks=True)
@@ -72,14 +100,44 @@ class JobWorkerBase:
 
             self.rmq_consumer = get_connection_consumer(rabbitmq_url=self.rmq_url)
             self.log.info(f"RMQConsumer connected")
+            if self.prefetch_count != PREFETCH_COUNT:
+                self.rmq_consumer.set_prefetch_count(prefetch_count=self.prefetch_count)
             self.rmq_consumer.configure_consuming(
                 queue_name=self.queue_name, callback_method=self._consumed_msg_callback)
+            self._schedule_periodic_tasks()
+            if self.hpc_connection_pool:
+                self.rmq_consumer.schedule_callback(
+                    delay=HPC_POOL_METRICS_LOG_INTERVAL, callback=self._log_hpc_connection_pool_metrics_periodically)
+            self.rmq_consumer.schedule_callback(delay=GRACEFUL_STOP_CHECK_INTERVAL, callback=self._stop_if_requested)
             self.log.info(f"Starting consuming from queue: {self.queue_name}")
             self.rmq_consumer.start_consuming()
+            self.log.info(f"Stopped consuming from queue: {self.queue_name}")
+            self.disconnect_rmq_connections()
+            self.close_hpc_connections()
         except Exception as e:
             self.log.error(f"The worker failed, reason: {e}")
             raise Exception(f"The worker failed, reason: {e}")
 
+    # Checked periodically by the consuming loop, hence, never while a message callback is being executed
+    def _stop_if_requested(self):
+        if self.stop_requested and not self.has_consumed_message:
+            self.log.info("Graceful stop requested, stopping consuming")
+            self.rmq_consumer.stop_consuming()
+            return
+        self.rmq_consumer.schedule_callback(delay=GRACEFUL_STOP_CHECK_INTERVAL, callback=self._stop_if_requested)
+
+    # Logged periodically by the consuming loop, not only when the worker shuts down
+    def _log_hpc_connection_pool_metrics_periodically(self):
+        self.log_hpc_connection_pool_metrics()
+        self.rmq_consumer.schedule_callback(
+            delay=HPC_POOL_METRICS_LOG_INTERVAL, callback=self._log_hpc_connection_pool_metrics_periodically)
+
+    # The arguments to this method are passed by the caller from the OS
+    def graceful_stop_signal_handler(self, sig, frame):
+        signal_name = signal.Signals(sig).name
+        self.log.info(f"{signal_name} received from parent process `{getppid()}`, stopping after the current message.")
+        self.stop_requested = True
+
     # The arguments to this method are passed by the caller from the OS
     def signal_handler(self, sig, frame):
         signal_name = signal.Signals(sig).name
@@ -89,5 +147,6 @@ class JobWorkerBase:
             self._handle_msg_failure(interruption=True)
         # TODO: Verify if this call here is necessary
         self.disconnect_rmq_connections()
+        self.close_hpc_connections()
         self.log.info("Exiting gracefully.")
         exit(0)
@@ -1,21 +1,45 @@
 from json import loads
+from os import environ
 from pathlib import Path
-from typing import List
+from typing import List, Set
 from typing_extensions import override
 
 from ocrd import Resolver
 from operandi_broker.job_worker_base import JobWorkerBase
+from operandi_utils import remove_expired_previous_dirs
 from operandi_utils.constants import StateJob, StateWorkspace
 from operandi_utils.database import (
     DBWorkflowJob, DBWorkspace, DBHPCSlurmJob, DBUserAccount, sync_db_create_page_stat,
     sync_db_get_hpc_slurm_job, sync_db_get_user_account, sync_db_get_workflow_job, sync_db_get_workspace,
     sync_db_update_workflow_job, sync_db_update_workspace)
+from .constants import DOWNLOAD_PREVIOUS_DIRS_CLEANUP_INTERVAL
 
 
 class JobWorkerDownload(JobWorkerBase):
     def __init__(self, db_url, rabbitmq_url, queue_name):
         super().__init__(db_url, rabbitmq_url, queue_name)
         self.current_message_job_id = None
+        # The parent dirs of the swapped workspaces, checked periodically for expired previous versions.
+        # The server workspaces dir is checked from the start, so leftovers of exited workers are removed as well.
+        self.previous_dirs_parents: Set[Path] = set()
+        if environ.get("OPERANDI_SERVER_BASE_DIR", None):
+            self.previous_dirs_parents.add(Path(environ["OPERANDI_SERVER_BASE_DIR"], "workspaces"))
+
+    @override
+    def _schedule_periodic_tasks(self):
+        self.log.info(f"Scheduling the previous workspaces cleanup every {DOWNLOAD_PREVIOUS_DIRS_CLEANUP_INTERVAL} seconds")
+        self.rmq_consumer.schedule_callback(delay=0, callback=self._remove_expired_previous_dirs)
+
+    # Periodically removes the previous versions of the workspaces once their grace period is over
+    def _remove_expired_previous_dirs(self):
+        for parent_dir in self.previous_dirs_parents:
+            try:
+                for previous_dir in remove_expired_previous_dirs(parent_dir=parent_dir):
+                    self.log.info(f"Removed the expired previous workspace version: {previous_dir}")
+            except Exception as error:
+                self.log.warning(f"Removing the expired previous workspace versions in {parent_dir} has failed: {error}")
+        self.rmq_consumer.schedule_callback(
+            delay=DOWNLOAD_PREVIOUS_DIRS_CLEANUP_INTERVAL, callback=self._remove_expired_previous_dirs)
 
     @override
     def _consumed_msg_callback(self, ch, method, properties, body):
@@ -138,6 +162,7 @@ class JobWorkerDownload(JobWorkerBase):
     def __download_results_from_hpc(self, job_dir: str, workspace_dir: str) -> None:
         self.hpc_io_transfer.get_and_unpack_slurm_workspace(
             ocrd_workspace_dir=Path(workspace_dir), workflow_job_dir=Path(job_dir))
+        self.previous_dirs_parents.add(Path(workspace_dir).parent)
         self.log.info(f"Transferred slurm workspace from hpc path")
         # Delete the result dir from the HPC home folder
         job_id = Path(job_dir).name
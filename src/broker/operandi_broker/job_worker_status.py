@@ -1,12 +1,11 @@
-from json import dumps, loads
+from json import loads
 from typing_extensions import override
 
-from operandi_utils.constants import StateJob, StateWorkspace
-from operandi_utils.database import (
-    DBHPCSlurmJob, DBWorkflowJob,
-    sync_db_get_hpc_slurm_job, sync_db_get_workflow_job,
-    sync_db_update_hpc_slurm_job, sync_db_update_workflow_job, sync_db_update_workspace)
-from operandi_utils.rabbitmq import RABBITMQ_QUEUE_HPC_DOWNLOADS
+from operandi_utils.database import sync_db_get_hpc_inventory, sync_db_update_hpc_inventory
+from operandi_utils.hpc.constants import HPC_INVENTORY_REFRESH_INTERVAL
+
+from .constants import STATUS_RECONCILE_TICK
+from .hpc_status_engine import HPCStatusEngine
 from .job_worker_base import JobWorkerBase
 
 
@@ -14,6 +13,7 @@ class JobWorkerStatus(JobWorkerBase):
     def __init__(self, db_url, rabbitmq_url, queue_name):
         super().__init__(db_url, rabbitmq_url, queue_name)
         self.current_message_job_id = None
+        self.hpc_status_engine = None
 
     @override
     def _consumed_msg_callback(self, ch, method, properties, body):
@@ -33,24 +33,16 @@ class JobWorkerStatus(JobWorkerBase):
             self._handle_msg_failure(interruption=False)
             return
 
+        # The requested job is checked together with all other due jobs in a single batch.
+        # Duplicate requests for the same job are coalesced into a single check per interval.
         try:
-            db_hpc_slurm_job: DBHPCSlurmJob = sync_db_get_hpc_slurm_job(self.current_message_job_id)
-            db_workflow_job: DBWorkflowJob = sync_db_get_workflow_job(self.current_message_job_id)
-            workspace_id = db_workflow_job.workspace_id
+            self.hpc_status_engine.request_check(workflow_job_id=self.current_message_job_id)
         except RuntimeError as error:
             self.log.warning(f"Database run-time error has occurred: {error}")
             self._handle_msg_failure(interruption=False)
             return
         except Exception as error:
-            self.log.warning(f"Database related error has occurred: {error}")
-            self._handle_msg_failure(interruption=False)
-            return
-
-        try:
-            self.__handle_hpc_and_workflow_states(
-                db_hpc_slurm_job=db_hpc_slurm_job, db_workflow_job=db_workflow_job, workspace_id=workspace_id)
-        except ValueError as error:
-            self.log.warning(f"{error}")
+            self.log.warning(f"Checking the states of the active jobs has failed: {error}")
             self._handle_msg_failure(interruption=False)
             return
 
@@ -58,6 +50,46 @@ class JobWorkerStatus(JobWorkerBase):
         self.log.info(f"Ack delivery tag: {self.current_message_delivery_tag}")
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
+    @override
+    def _schedule_periodic_tasks(self):
+        self.hpc_status_engine = HPCStatusEngine(
+            logger=self.log, hpc_executor=self.hpc_executor, rmq_publisher=self.rmq_publisher)
+        self.log.info(f"Scheduling the status reconciler every {STATUS_RECONCILE_TICK} seconds")
+        self.rmq_consumer.schedule_callback(delay=0, callback=self._reconcile_active_jobs)
+        self.log.info(f"Scheduling the HPC inventory refresh every {HPC_INVENTORY_REFRESH_INTERVAL} seconds")
+        self.rmq_consumer.schedule_callback(delay=0, callback=self._refresh_hpc_inventory)
+
+    # Periodically reconciles the states of the active jobs with the HPC,
+    # without waiting for status requests to be consumed from the queue
+    def _reconcile_active_jobs(self):
+        try:
+            self.hpc_status_engine.reconcile_due_jobs()
+        except Exception as error:
+            self.log.warning(f"Reconciling the states of the active jobs has failed: {error}")
+        self.rmq_consumer.schedule_callback(delay=STATUS_RECONCILE_TICK, callback=self._reconcile_active_jobs)
+
+    # Periodically lists the models and processor images available in the HPC and shares them through the DB,
+    # the server checks the submitted workflows against that inventory without connecting to the HPC
+    def _refresh_hpc_inventory(self):
+        inventory = self.hpc_executor.inventory
+        try:
+            # Another status worker may have refreshed the inventory recently
+            db_hpc_inventory = sync_db_get_hpc_inventory()
+            if not inventory.refreshed_at or inventory.refreshed_at < db_hpc_inventory.refreshed_at:
+                inventory.update(
+                    ocrd_models=db_hpc_inventory.ocrd_models, sif_images=db_hpc_inventory.sif_images,
+                    refreshed_at=db_hpc_inventory.refreshed_at)
+        except RuntimeError:
+            self.log.info("No HPC inventory found in the DB yet")
+        try:
+            if not inventory.is_fresh(ttl=HPC_INVENTORY_REFRESH_INTERVAL):
+                self.hpc_executor.list_hpc_inventory()
+                sync_db_update_hpc_inventory(
+                    ocrd_models=sorted(inventory.ocrd_models), sif_images=sorted(inventory.sif_images))
+        except Exception as error:
+            self.log.warning(f"Refreshing the HPC inventory has failed: {error}")
+        self.rmq_consumer.schedule_callback(delay=HPC_INVENTORY_REFRESH_INTERVAL, callback=self._refresh_hpc_inventory)
+
     @override
     def _handle_msg_failure(self, interruption: bool):
         self.has_consumed_message = False
@@ -75,44 +107,3 @@ class JobWorkerStatus(JobWorkerBase):
         # Reset the current message related parameters
         self.current_message_delivery_tag = None
         self.current_message_job_id = None
-
-    def __handle_hpc_and_workflow_states(
-        self, db_hpc_slurm_job: DBHPCSlurmJob, db_workflow_job: DBWorkflowJob, workspace_id: str
-    ):
-        old_slurm_job_state = db_hpc_slurm_job.hpc_slurm_job_state
-        new_slurm_job_state = self.hpc_executor.check_slurm_job_state(slurm_job_id=db_hpc_slurm_job.hpc_slurm_job_id)
-
-        if old_slurm_job_state == new_slurm_job_state:
-            self.log.info(f"No change in slurm job state, state is still: {old_slurm_job_state}")
-            return
-
-        job_id = db_workflow_job.job_id
-        old_job_state = db_workflow_job.job_state
-        self.log.info(
-            f"Job {db_hpc_slurm_job.hpc_slurm_job_id} changed state: {old_slurm_job_state} -> {new_slurm_job_state}")
-        sync_db_update_hpc_slurm_job(find_workflow_job_id=job_id, hpc_slurm_job_state=new_slurm_job_state)
-
-        # Convert the slurm job state to operandi workflow job state
-        new_job_state = StateJob.convert_from_slurm_job(slurm_job_state=new_slurm_job_state)
-
-        if old_job_state == new_job_state:
-            self.log.info(f"No change in workflow job state needed, state is still: {old_job_state}")
-            return
-
-        if old_job_state in [StateJob.SUCCESS, StateJob.FAILED, StateJob.TRANSFERRING_FROM_HPC]:
-            self.log.info(f"No change in workflow job state needed, state is already: {old_job_state}")
-            return
-
-        self.log.info(f"Workflow job: {job_id}, changed state: {old_job_state} -> {new_job_state}")
-        sync_db_update_workflow_job(find_job_id=job_id, job_state=new_job_state)
-        if new_job_state == StateJob.HPC_SUCCESS or new_job_state == StateJob.HPC_FAILED:
-            sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.TRANSFERRING_FROM_HPC)
-            sync_db_update_workflow_job(find_job_id=job_id, job_state=StateJob.TRANSFERRING_FROM_HPC)
-            result_download_message = {"job_id": f"{job_id}", "previous_job_state": f"{new_job_state.value}"}
-            self.log.info(f"Encoding the result download RabbitMQ message: {result_download_message}")
-            encoded_result_download_message = dumps(result_download_message).encode(encoding="utf-8")
-            self.rmq_publisher.publish_to_queue(
-                queue_name=RABBITMQ_QUEUE_HPC_DOWNLOADS, message=encoded_result_download_message)
-
-        self.log.info(f"Latest slurm job state: {new_slurm_job_state}")
-        self.log.info(f"Latest workflow job state: {new_job_state}")
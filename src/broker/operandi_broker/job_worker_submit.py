@@ -1,7 +1,9 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
 from json import loads
 from os.path import join
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Optional
 from typing_extensions import override
 
 from operandi_broker.job_worker_base import JobWorkerBase
@@ -11,25 +13,78 @@ from operandi_utils.database import (
     DBUserAccount, DBWorkflow, DBWorkflowJob, DBWorkspace,
     sync_db_create_page_stat, sync_db_get_user_account, sync_db_get_workflow, sync_db_get_workflow_job,
     sync_db_get_workspace, sync_db_create_hpc_slurm_job, sync_db_update_workflow_job, sync_db_update_workspace)
+from operandi_utils.hpc import NHRTransfer
 from operandi_utils.hpc.constants import (
     HPC_BATCH_SUBMIT_WORKFLOW_JOB, HPC_JOB_DEADLINE_TIME_REGULAR, HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_SHORT,
     HPC_JOB_QOS_DEFAULT)
+from operandi_utils.hpc.nhr_transfer import SlurmWorkspacePipe
+from .constants import SUBMIT_PIPELINE_MAX_IN_FLIGHT, SUBMIT_PIPELINE_SHUTDOWN_TIMEOUT
+
+
+class SubmitJobContext:
+    """
+    Keeps the state of a single workflow job submission while it passes through the pipeline stages.
+    """
+    def __init__(self, delivery_tag: int):
+        self.delivery_tag: int = delivery_tag
+        self.job_id: Optional[str] = None
+        self.user_id: Optional[str] = None
+        self.workflow_id: Optional[str] = None
+        self.workspace_id: Optional[str] = None
+        self.institution_id: Optional[str] = None
+        self.input_file_grp: Optional[str] = None
+        self.remove_file_grps: Optional[str] = None
+        self.partition: Optional[str] = None
+        self.cpus: int = 0
+        self.ram: int = 0
+        self.nf_process_forks: int = 0
+        self.workflow_script_path: Optional[Path] = None
+        self.use_mets_server: bool = False
+        self.nf_executable_steps: List[str] = []
+        self.workspace_dir: Optional[Path] = None
+        self.mets_basename: str = "mets.xml"
+        self.ws_pages_amount: int = 0
+        self.slurm_job_id: Optional[str] = None
+        # The packing stage writes the slurm workspace zip into the pipe, the uploading stage reads it
+        self.zip_pipe: Optional[SlurmWorkspacePipe] = None
+        # The futures of the stages started for the job, awaited on shutdown
+        self.futures: List[Future] = []
+        # The name of the last stage that was started, used to report failures
+        self.stage: str = "consumed"
 
 
 class JobWorkerSubmit(JobWorkerBase):
+    """
+    Submits workflow jobs to the HPC in a pipeline of stages, each with its own thread:
+    packing the slurm workspace (CPU/disk bound), streaming it into the HPC (network bound),
+    and triggering the slurm job (latency bound). The packing and the uploading stages of a job
+    run at once, connected with a bounded in-memory pipe, hence, the next workspace is packed
+    while the current one is still being uploaded. Several messages are in flight at once.
+    The uploading stage has its own ssh connection and sftp session, the triggering stage uses
+    the connection pool of the worker. The DB updates and the message acknowledgements are
+    always executed in the main thread of the RabbitMQ connection, and a message is
+    acknowledged only after its job was submitted and saved in the DB (or has failed).
+    """
     def __init__(self, db_url, rabbitmq_url, queue_name, test_sbatch=False):
         super().__init__(db_url, rabbitmq_url, queue_name)
         self.test_sbatch = test_sbatch
-        self.current_message_job_id = None
-        self.current_message_user_id = None
-        self.current_message_wf_id = None
-        self.current_message_ws_id = None
+        self.prefetch_count = SUBMIT_PIPELINE_MAX_IN_FLIGHT
+        # Delivery tag -> context of the submissions currently in the pipeline
+        self.jobs_in_flight: Dict[int, SubmitJobContext] = {}
+        self.pack_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="submit_pack")
+        self.upload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="submit_upload")
+        self.sbatch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="submit_sbatch")
+        # Created by the uploading stage thread, not shared with the other stages
+        self.upload_transfer: Optional[NHRTransfer] = None
+        # Once set, the completions of the stages are no longer passed to the consumer connection
+        self.shutting_down = False
 
     @override
     def _consumed_msg_callback(self, ch, method, properties, body):
         self.log.debug(f"ch: {ch}, method: {method}, properties: {properties}, body: {body}")
         self.log.debug(f"Consumed message: {body}")
-        self.current_message_delivery_tag = method.delivery_tag
+        job_context = SubmitJobContext(delivery_tag=method.delivery_tag)
+        self.jobs_in_flight[method.delivery_tag] = job_context
         self.has_consumed_message = True
 
         # Since the workflow_message is constructed by the Operandi Server,
@@ -37,164 +92,204 @@ class JobWorkerSubmit(JobWorkerBase):
         try:
             consumed_message = loads(body)
             self.log.info(f"Consumed message: {consumed_message}")
-            self.current_message_job_id = consumed_message["job_id"]
-            input_file_grp = consumed_message["input_file_grp"]
-            remove_file_grps = consumed_message["remove_file_grps"]
-            slurm_job_partition = consumed_message["partition"]
-            slurm_job_cpus = int(consumed_message["cpus"])
-            slurm_job_ram = int(consumed_message["ram"])
+            job_context.job_id = consumed_message["job_id"]
+            job_context.input_file_grp = consumed_message["input_file_grp"]
+            job_context.remove_file_grps = consumed_message["remove_file_grps"]
+            job_context.partition = consumed_message["partition"]
+            job_context.cpus = int(consumed_message["cpus"])
+            job_context.ram = int(consumed_message["ram"])
             # How many process instances to create for each OCR-D processor
             # By default, the amount of cpus, since that gives optimal performance
-            nf_process_forks = slurm_job_cpus
+            job_context.nf_process_forks = job_context.cpus
         except Exception as error:
             self.log.error(f"Parsing the consumed message has failed: {error}")
-            self._handle_msg_failure(interruption=False)
+            self._handle_job_failure(job_context)
             return
 
         try:
-            db_workflow_job: DBWorkflowJob = sync_db_get_workflow_job(self.current_message_job_id)
-            self.current_message_user_id = db_workflow_job.user_id
-            self.current_message_wf_id = db_workflow_job.workflow_id
-            self.current_message_ws_id = db_workflow_job.workspace_id
-
-            db_workflow: DBWorkflow = sync_db_get_workflow(self.current_message_wf_id)
-            workflow_script_path = Path(db_workflow.workflow_script_path)
-            nf_uses_mets_server = db_workflow.uses_mets_server
-            nf_executable_steps = db_workflow.executable_steps
-
-            db_workspace: DBWorkspace = sync_db_get_workspace(self.current_message_ws_id)
-            workspace_dir = Path(db_workspace.workspace_dir)
-            mets_basename = db_workspace.mets_basename
-            ws_pages_amount = db_workspace.pages_amount
-            if not mets_basename:
-                mets_basename = "mets.xml"
+            db_workflow_job: DBWorkflowJob = sync_db_get_workflow_job(job_context.job_id)
+            job_context.user_id = db_workflow_job.user_id
+            job_context.workflow_id = db_workflow_job.workflow_id
+            job_context.workspace_id = db_workflow_job.workspace_id
+
+            db_workflow: DBWorkflow = sync_db_get_workflow(job_context.workflow_id)
+            job_context.workflow_script_path = Path(db_workflow.workflow_script_path)
+            job_context.use_mets_server = db_workflow.uses_mets_server
+            job_context.nf_executable_steps = db_workflow.executable_steps
+
+            db_workspace: DBWorkspace = sync_db_get_workspace(job_context.workspace_id)
+            job_context.workspace_dir = Path(db_workspace.workspace_dir)
+            job_context.ws_pages_amount = db_workspace.pages_amount
+            if db_workspace.mets_basename:
+                job_context.mets_basename = db_workspace.mets_basename
+
+            db_user: DBUserAccount = sync_db_get_user_account(db_workspace.user_id)
+            job_context.institution_id = db_user.institution_id
+
+            sync_db_update_workspace(find_workspace_id=job_context.workspace_id, state=StateWorkspace.TRANSFERRING_TO_HPC)
+            sync_db_update_workflow_job(find_job_id=job_context.job_id, job_state=StateJob.TRANSFERRING_TO_HPC)
         except RuntimeError as error:
             self.log.error(f"Database run-time error has occurred: {error}")
-            self._handle_msg_failure(interruption=False)
+            self._handle_job_failure(job_context)
             return
         except Exception as error:
             self.log.error(f"Database related error has occurred: {error}")
-            self._handle_msg_failure(interruption=False)
+            self._handle_job_failure(job_context)
             return
 
-        # Trigger a slurm job in the HPC
-        try:
-            self.prepare_and_trigger_slurm_job(
-                workflow_job_id=self.current_message_job_id, workspace_id=self.current_message_ws_id,
-                workspace_dir=workspace_dir, workspace_base_mets=mets_basename,
-                workflow_script_path=workflow_script_path, input_file_grp=input_file_grp,
-                nf_process_forks=nf_process_forks, ws_pages_amount=ws_pages_amount, use_mets_server=nf_uses_mets_server,
-                nf_executable_steps=nf_executable_steps, file_groups_to_remove=remove_file_grps, cpus=slurm_job_cpus,
-                ram=slurm_job_ram, partition=slurm_job_partition
-            )
+        # The callback returns immediately, the next message is consumed while this one is in the pipeline
+        job_context.zip_pipe = SlurmWorkspacePipe(
+            ocrd_workspace_dir=job_context.workspace_dir, workflow_job_id=job_context.job_id,
+            nextflow_script_path=job_context.workflow_script_path)
+        job_context.stage = "packing"
+        # Failures of the packing stage abort the pipe, hence, they are reported by the uploading stage
+        self._submit_to_stage(self.pack_executor, self._stage_pack, job_context, report_failure=False)
+        self._submit_to_stage(
+            self.upload_executor, self._stage_upload, job_context,
+            on_success=partial(self._submit_to_stage, self.sbatch_executor, self._stage_sbatch, job_context,
+                               on_success=partial(self._schedule_job_submitted, job_context)))
 
-            job_state = StateJob.PENDING
-            self.log.info(f"Setting new job state `{job_state}` of job_id: {self.current_message_job_id}")
-            sync_db_update_workflow_job(find_job_id=self.current_message_job_id, job_state=job_state)
+    def _submit_to_stage(
+        self, stage_executor: ThreadPoolExecutor, stage_method: Callable, job_context: SubmitJobContext,
+        on_success: Optional[Callable] = None, report_failure: bool = True
+    ):
+        future = stage_executor.submit(stage_method, job_context)
+        job_context.futures.append(future)
+        future.add_done_callback(partial(self._on_stage_done, job_context, on_success, report_failure))
 
-            ws_state = StateWorkspace.PENDING
-            self.log.info(f"Setting new workspace state `{ws_state}` of workspace_id: {self.current_message_ws_id}")
-            sync_db_update_workspace(find_workspace_id=self.current_message_ws_id, state=ws_state)
-
-            self.log.info(f"The HPC slurm job was successfully submitted")
-        except Exception as error:
-            self.log.error(f"Triggering a slurm job in the HPC has failed: {error}")
-            self._handle_msg_failure(interruption=False)
+    # Executed in the thread of the finished stage
+    def _on_stage_done(
+        self, job_context: SubmitJobContext, on_success: Optional[Callable], report_failure: bool, future: Future
+    ):
+        # The consumer connection may be already closed
+        if self.shutting_down or future.cancelled():
+            return
+        error = future.exception()
+        if error:
+            self.log.error(f"Job {job_context.job_id} failed in pipeline stage {job_context.stage}: {error}")
+            if report_failure:
+                self.rmq_consumer.add_callback_threadsafe(partial(self._handle_job_failure, job_context))
             return
+        if on_success:
+            on_success()
 
-        self.has_consumed_message = False
-        self.log.debug(f"Ack delivery tag: {self.current_message_delivery_tag}")
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+    def _schedule_job_submitted(self, job_context: SubmitJobContext):
+        self.rmq_consumer.add_callback_threadsafe(partial(self._handle_job_submitted, job_context))
 
-    @override
-    def _handle_msg_failure(self, interruption: bool):
-        job_state = StateJob.FAILED
-        self.log.info(f"Setting new state `{job_state}` of job_id: {self.current_message_job_id}")
-        sync_db_update_workflow_job(find_job_id=self.current_message_job_id, job_state=job_state)
-        self.has_consumed_message = False
-
-        ws_state = StateWorkspace.READY
-        self.log.info(f"Setting new workspace state `{ws_state}` of workspace_id: {self.current_message_ws_id}")
-        sync_db_update_workspace(find_workspace_id=self.current_message_ws_id, state=ws_state)
-
-        if interruption:
-            # self.log.info(f"Nacking delivery tag: {self.current_message_delivery_tag}")
-            # self.rmq_consumer._channel.basic_nack(delivery_tag=self.current_message_delivery_tag)
-            # TODO: Sending ACK for now because it is hard to clean up without a mets workspace backup mechanism
-            self.log.info(f"Interruption Ack delivery tag: {self.current_message_delivery_tag}")
-            self.rmq_consumer.ack_message(delivery_tag=self.current_message_delivery_tag)
-            return
+    def _stage_pack(self, job_context: SubmitJobContext):
+        self.log.info(f"Job {job_context.job_id} entering pipeline stage: packing")
+        self.hpc_io_transfer.pack_slurm_workspace(zip_pipe=job_context.zip_pipe)
+
+    def _stage_upload(self, job_context: SubmitJobContext):
+        job_context.stage = "uploading"
+        self.log.info(f"Job {job_context.job_id} entering pipeline stage: uploading")
+        if not self.upload_transfer:
+            self.upload_transfer = NHRTransfer()
+        # With the content store enabled only the files missing in the store are uploaded
+        self.upload_transfer.put_slurm_workspace_from_pipe(zip_pipe=job_context.zip_pipe)
 
-        self.log.debug(f"Ack delivery tag: {self.current_message_delivery_tag}")
-        self.rmq_consumer.ack_message(delivery_tag=self.current_message_delivery_tag)
-
-        # Reset the current message related parameters
-        self.current_message_delivery_tag = None
-        self.current_message_job_id = None
-        self.current_message_user_id = None
-        self.current_message_wf_id = None
-        self.current_message_ws_id = None
-
-    def prepare_and_trigger_slurm_job(
-        self, workflow_job_id: str, workspace_id: str, workspace_dir: Path, workspace_base_mets: str,
-        workflow_script_path: Path, input_file_grp: str, nf_process_forks: int, ws_pages_amount: int,
-        use_mets_server: bool, nf_executable_steps: List[str], file_groups_to_remove: str, cpus: int, ram: int,
-        partition: str
-    ) -> str:
+    def _stage_sbatch(self, job_context: SubmitJobContext):
+        job_context.stage = "triggering"
+        self.log.info(f"Job {job_context.job_id} entering pipeline stage: triggering")
         if self.test_sbatch:
             job_deadline_time = HPC_JOB_DEADLINE_TIME_TEST
             qos = HPC_JOB_QOS_SHORT
         else:
             job_deadline_time = HPC_JOB_DEADLINE_TIME_REGULAR
             qos = HPC_JOB_QOS_DEFAULT
+        # NOTE: The paths below must be a valid existing path inside the HPC
+        job_context.slurm_job_id = self.hpc_executor.trigger_slurm_job(
+            workflow_job_id=job_context.job_id, nextflow_script_path=job_context.workflow_script_path,
+            workspace_id=job_context.workspace_id, mets_basename=job_context.mets_basename,
+            input_file_grp=job_context.input_file_grp, nf_process_forks=job_context.nf_process_forks,
+            ws_pages_amount=job_context.ws_pages_amount, use_mets_server=job_context.use_mets_server,
+            nf_executable_steps=job_context.nf_executable_steps, file_groups_to_remove=job_context.remove_file_grps,
+            cpus=job_context.cpus, ram=job_context.ram, job_deadline_time=job_deadline_time,
+            partition=job_context.partition, qos=qos)
 
-        # Recreate the transfer connection for each workflow job submission
-        # This is required due to all kind of nasty connection fails - timeouts,
-        # paramiko transport not reporting properly, etc.
-        # self.hpc_executor = HPCExecutor(tunel_host='localhost', tunel_port=4022)
-        # self.log.info("HPC executor connection renewed successfully.")
-        # self.hpc_io_transfer = HPCTransfer(tunel_host='localhost', tunel_port=4023)
-        # self.log.info("HPC transfer connection renewed successfully.")
-
+    # Executed in the main thread
+    def _handle_job_submitted(self, job_context: SubmitJobContext):
         try:
-            db_workspace: DBWorkspace = sync_db_update_workspace(
-                find_workspace_id=workspace_id, state=StateWorkspace.TRANSFERRING_TO_HPC)
-            sync_db_update_workflow_job(find_job_id=workflow_job_id, job_state=StateJob.TRANSFERRING_TO_HPC)
-            self.hpc_io_transfer.pack_and_put_slurm_workspace(
-                ocrd_workspace_dir=workspace_dir, workflow_job_id=workflow_job_id,
-                nextflow_script_path=workflow_script_path)
-            db_user: DBUserAccount = sync_db_get_user_account(db_workspace.user_id)
-            institute_id = db_user.institution_id
-        except Exception as error:
-            raise Exception(f"Failed to pack and put slurm workspace: {error}")
+            sync_db_create_hpc_slurm_job(
+                user_id=job_context.user_id,
+                workflow_job_id=job_context.job_id, hpc_slurm_job_id=job_context.slurm_job_id,
+                hpc_batch_script_path=join(self.hpc_io_transfer.batch_scripts_dir, HPC_BATCH_SUBMIT_WORKFLOW_JOB),
+                hpc_slurm_workspace_path=join(self.hpc_io_transfer.slurm_workspaces_dir, job_context.job_id))
 
-        try:
-            # NOTE: The paths below must be a valid existing path inside the HPC
-            slurm_job_id = self.hpc_executor.trigger_slurm_job(
-                workflow_job_id=workflow_job_id, nextflow_script_path=workflow_script_path,
-                workspace_id=workspace_id, mets_basename=workspace_base_mets,
-                input_file_grp=input_file_grp, nf_process_forks=nf_process_forks, ws_pages_amount=ws_pages_amount,
-                use_mets_server=use_mets_server, nf_executable_steps=nf_executable_steps,
-                file_groups_to_remove=file_groups_to_remove, cpus=cpus, ram=ram, job_deadline_time=job_deadline_time,
-                partition=partition, qos=qos)
+            job_state = StateJob.PENDING
+            self.log.info(f"Setting new job state `{job_state}` of job_id: {job_context.job_id}")
+            sync_db_update_workflow_job(find_job_id=job_context.job_id, job_state=job_state)
+
+            ws_state = StateWorkspace.PENDING
+            self.log.info(f"Setting new workspace state `{ws_state}` of workspace_id: {job_context.workspace_id}")
+            sync_db_update_workspace(find_workspace_id=job_context.workspace_id, state=ws_state)
         except Exception as error:
-            self.log.info(f"Creating page stat failed with quantity {ws_pages_amount}")
+            self.log.error(f"Failed to save the hpc slurm job in DB: {error}")
+            self._handle_job_failure(job_context)
+            return
+
+        self.log.info(f"The HPC slurm job was successfully submitted: {job_context.slurm_job_id}")
+        self._finish_job(job_context)
+
+    # Executed in the main thread
+    def _handle_job_failure(self, job_context: SubmitJobContext):
+        if job_context.job_id:
+            job_state = StateJob.FAILED
+            self.log.info(f"Setting new state `{job_state}` of job_id: {job_context.job_id}")
+            sync_db_update_workflow_job(find_job_id=job_context.job_id, job_state=job_state)
+        if job_context.workspace_id:
+            ws_state = StateWorkspace.READY
+            self.log.info(f"Setting new workspace state `{ws_state}` of workspace_id: {job_context.workspace_id}")
+            sync_db_update_workspace(find_workspace_id=job_context.workspace_id, state=ws_state)
+        if job_context.stage == "triggering":
+            self.log.info(f"Creating page stat failed with quantity {job_context.ws_pages_amount}")
             sync_db_create_page_stat(
                 stat_type="failed",
-                quantity=ws_pages_amount,
-                institution_id=institute_id,
-                user_id=db_workspace.user_id,
-                workspace_id=workspace_id,
-                workflow_job_id=workflow_job_id
+                quantity=job_context.ws_pages_amount,
+                institution_id=job_context.institution_id,
+                user_id=job_context.user_id,
+                workspace_id=job_context.workspace_id,
+                workflow_job_id=job_context.job_id
             )
-            raise Exception(f"Triggering slurm job failed: {error}")
+        self._finish_job(job_context)
 
-        try:
-            sync_db_create_hpc_slurm_job(
-                user_id=self.current_message_user_id,
-                workflow_job_id=workflow_job_id, hpc_slurm_job_id=slurm_job_id,
-                hpc_batch_script_path=join(self.hpc_io_transfer.batch_scripts_dir, HPC_BATCH_SUBMIT_WORKFLOW_JOB),
-                hpc_slurm_workspace_path=join(self.hpc_io_transfer.slurm_workspaces_dir, workflow_job_id))
-        except Exception as error:
-            raise Exception(f"Failed to save the hpc slurm job in DB: {error}")
-        return slurm_job_id
+    def _finish_job(self, job_context: SubmitJobContext):
+        self.jobs_in_flight.pop(job_context.delivery_tag, None)
+        self.has_consumed_message = bool(self.jobs_in_flight)
+        self.log.debug(f"Ack delivery tag: {job_context.delivery_tag}")
+        self.rmq_consumer.ack_message(delivery_tag=job_context.delivery_tag)
+
+    @override
+    def _handle_msg_failure(self, interruption: bool):
+        # The completions of the stages still running are dropped, the jobs are failed below
+        self.shutting_down = True
+        for job_context in self.jobs_in_flight.values():
+            if job_context.zip_pipe:
+                job_context.zip_pipe.abort(InterruptedError("The submit worker is shutting down"))
+        for stage_executor in [self.pack_executor, self.upload_executor, self.sbatch_executor]:
+            stage_executor.shutdown(wait=False, cancel_futures=True)
+        running_futures = [
+            future for job_context in self.jobs_in_flight.values() for future in job_context.futures if not future.done()]
+        _, not_done = wait(running_futures, timeout=SUBMIT_PIPELINE_SHUTDOWN_TIMEOUT)
+        if not_done:
+            self.log.warning(
+                f"{len(not_done)} pipeline stages did not finish in {SUBMIT_PIPELINE_SHUTDOWN_TIMEOUT} seconds")
+        # TODO: Sending ACK for now because it is hard to clean up without a mets workspace backup mechanism
+        for job_context in list(self.jobs_in_flight.values()):
+            self.log.info(f"Interruption of job: {job_context.job_id}, stage: {job_context.stage}")
+            self._handle_job_failure(job_context)
+
+    @override
+    def log_hpc_connection_pool_metrics(self):
+        super().log_hpc_connection_pool_metrics()
+        if self.upload_transfer:
+            self.log.info(f"HPC upload connection pool metrics: {self.upload_transfer.connection_pool.get_metrics()}")
+
+    @override
+    def close_hpc_connections(self):
+        # Logs the metrics of both pools before any of them is closed
+        super().close_hpc_connections()
+        # Closing the connection also interrupts an upload stage that did not finish in time
+        if self.upload_transfer:
+            self.upload_transfer.close_sftp_client()
+            self.upload_transfer.connection_pool.close_all()
@@ -0,0 +1,121 @@
+from logging import Logger
+from os import waitpid, waitstatus_to_exitcode, WNOHANG
+from time import monotonic
+from typing import Callable, Dict, List
+
+from .constants import (
+    BROKER_WORKER_RESTART_BACKOFF_BASE, BROKER_WORKER_RESTART_BACKOFF_MAX, BROKER_WORKER_STABLE_RUN_TIME)
+
+
+class WorkerSupervisor:
+    """
+    Reaps the exited worker processes of the broker and restarts the ones that exited unexpectedly.
+    Restarts of a queue are delayed with an exponential backoff while its workers keep failing shortly
+    after being started, so a persistent failure (e.g., the HPC being unreachable) does not result in
+    a fork loop.
+
+    Attributes:
+        queues_and_workers: queue name -> pids of the workers consuming from the queue, shared with the broker
+        stopping_workers:   pids of the workers requested to stop gracefully, shared with the broker
+        restart_counts:     queue name -> amount of worker restarts so far
+    """
+    def __init__(
+        self, logger: Logger, queues_and_workers: Dict[str, List[int]], stopping_workers: List[int],
+        create_worker: Callable[[str, str], None]
+    ) -> None:
+        self.log = logger
+        self.queues_and_workers = queues_and_workers
+        self.stopping_workers = stopping_workers
+        self.create_worker = create_worker
+
+        self.restart_counts: Dict[str, int] = {}
+        # pid -> queue name, worker type and start time of the worker
+        self._workers_info: Dict[int, Dict] = {}
+        # queue name -> the amount of consecutive failures of workers shortly after their start
+        self._consecutive_failures: Dict[str, int] = {}
+        # List of worker restarts waiting for their backoff time, each with queue name, worker type and due time
+        self._pending_restarts: List[Dict] = []
+        # pid -> name of short-lived helper processes of the broker, these are reaped but never restarted
+        self._helpers_info: Dict[int, str] = {}
+
+    def worker_started(self, pid: int, queue_name: str, worker_type: str) -> None:
+        self._workers_info[pid] = {"queue_name": queue_name, "worker_type": worker_type, "started_at": monotonic()}
+
+    def helper_started(self, pid: int, name: str) -> None:
+        self._helpers_info[pid] = name
+
+    def pending_restarts_amount(self, queue_name: str) -> int:
+        return len([restart for restart in self._pending_restarts if restart["queue_name"] == queue_name])
+
+    def supervise(self) -> None:
+        self.reap_workers()
+        self.restart_due_workers()
+
+    def reap_workers(self) -> None:
+        while True:
+            try:
+                pid, wait_status = waitpid(-1, WNOHANG)
+            except ChildProcessError:
+                # No child processes left
+                return
+            if not pid:
+                return
+            self._handle_exited_worker(pid=pid, exit_code=waitstatus_to_exitcode(wait_status))
+
+    def _handle_exited_worker(self, pid: int, exit_code: int) -> None:
+        if pid in self._helpers_info:
+            self.log.info(f"Helper process: {self._helpers_info.pop(pid)}, with pid: {pid} exited, exit code: {exit_code}")
+            return
+        worker_info = self._workers_info.pop(pid, None)
+        if pid in self.stopping_workers:
+            self.stopping_workers.remove(pid)
+            self.log.info(f"Worker process with pid: {pid} has stopped gracefully, exit code: {exit_code}")
+            return
+        if not worker_info:
+            self.log.warning(f"Reaped an unknown child process with pid: {pid}, exit code: {exit_code}")
+            return
+
+        queue_name = worker_info["queue_name"]
+        worker_type = worker_info["worker_type"]
+        if pid in self.queues_and_workers.get(queue_name, []):
+            self.queues_and_workers[queue_name].remove(pid)
+        run_time = monotonic() - worker_info["started_at"]
+        if run_time < BROKER_WORKER_STABLE_RUN_TIME:
+            self._consecutive_failures[queue_name] = self._consecutive_failures.get(queue_name, 0) + 1
+        else:
+            self._consecutive_failures[queue_name] = 0
+        failures = self._consecutive_failures[queue_name]
+        backoff = 0 if not failures else min(
+            BROKER_WORKER_RESTART_BACKOFF_MAX, BROKER_WORKER_RESTART_BACKOFF_BASE * 2 ** (failures - 1))
+        self.log.error(
+            f"Worker process with pid: {pid} of queue: {queue_name} exited unexpectedly after {run_time:.0f} "
+            f"seconds, exit code: {exit_code}. Restarting in {backoff} seconds")
+        self._pending_restarts.append(
+            {"queue_name": queue_name, "worker_type": worker_type, "due_time": monotonic() + backoff})
+
+    def restart_due_workers(self) -> None:
+        now = monotonic()
+        for pending_restart in list(self._pending_restarts):
+            if pending_restart["due_time"] > now:
+                continue
+            self._pending_restarts.remove(pending_restart)
+            queue_name = pending_restart["queue_name"]
+            self.restart_counts[queue_name] = self.restart_counts.get(queue_name, 0) + 1
+            self.log.info(
+                f"Restarting a worker process of queue: {queue_name}, restarts: {self.restart_counts[queue_name]}")
+            self.create_worker(queue_name, pending_restart["worker_type"])
+
+    def get_inventory(self) -> Dict[str, Dict]:
+        now = monotonic()
+        inventory = {}
+        for queue_name, worker_pids in self.queues_and_workers.items():
+            inventory[queue_name] = {
+                "workers": [
+                    {"pid": pid, "uptime": int(now - self._workers_info[pid]["started_at"])}
+                    if pid in self._workers_info else {"pid": pid}
+                    for pid in worker_pids
+                ],
+                "restarts": self.restart_counts.get(queue_name, 0),
+                "pending_restarts": self.pending_restarts_amount(queue_name)
+            }
+        return inventory
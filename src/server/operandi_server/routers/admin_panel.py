@@ -7,7 +7,6 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from operandi_server.models import PYUserInfo, WorkflowJobRsrc, WorkspaceRsrc, WorkflowRsrc
 from operandi_utils import create_db_query
 from operandi_utils.constants import AccountType, ServerApiTag
-from operandi_utils.rabbitmq import get_connection_publisher
 from .user_utils import get_user_accounts, get_user_processing_stats_with_handling, user_auth_with_handling
 from .workflow_utils import get_user_workflows, get_user_workflow_jobs
 from .workspace_utils import get_user_workspaces
@@ -17,17 +16,9 @@ class RouterAdminPanel:
     def __init__(self):
         self.logger = getLogger("operandi_server.routers.admin_panel")
 
-        self.logger.info(f"Trying to connect RMQ Publisher")
-        self.rmq_publisher = get_connection_publisher(enable_acks=True)
-        self.logger.info(f"RMQPublisher connected")
-
         self.router = APIRouter(tags=[ServerApiTag.ADMIN])
         self.add_api_routes(self.router)
 
-    def __del__(self):
-        if self.rmq_publisher:
-            self.rmq_publisher.disconnect()
-
     def add_api_routes(self, router: APIRouter):
         router.add_api_route(
             path="/admin/users",
@@ -83,7 +74,7 @@ class RouterAdminPanel:
         """
         await self.auth_admin_with_handling(auth)
         query = create_db_query(user_id, start_date, end_date, hide_deleted)
-        return await get_user_workflow_jobs(logger=self.logger, rmq_publisher=self.rmq_publisher, query=query)
+        return await get_user_workflow_jobs(logger=self.logger, query=query)
 
     async def user_workspaces(
         self, user_id: str, auth: HTTPBasicCredentials = Depends(HTTPBasic()),
@@ -7,7 +7,6 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from operandi_utils.constants import AccountType, ServerApiTag
 from operandi_server.models import PYUserAction, WorkflowJobRsrc, WorkspaceRsrc, WorkflowRsrc
 from operandi_utils.database.models_stats import DBProcessingStatsTotal
-from operandi_utils.rabbitmq import get_connection_publisher
 from operandi_utils.utils import create_db_query
 from .workflow_utils import get_user_workflows, get_user_workflow_jobs
 from .workspace_utils import get_user_workspaces
@@ -18,17 +17,9 @@ class RouterUser:
     def __init__(self):
         self.logger = getLogger("operandi_server.routers.user")
 
-        self.logger.info(f"Trying to connect RMQ Publisher")
-        self.rmq_publisher = get_connection_publisher(enable_acks=True)
-        self.logger.info(f"RMQPublisher connected")
-
         self.router = APIRouter(tags=[ServerApiTag.USER])
         self.add_api_routes(self.router)
 
-    def __del__(self):
-        if self.rmq_publisher:
-            self.rmq_publisher.disconnect()
-
     def add_api_routes(self, router: APIRouter):
         router.add_api_route(
             path="/user/register",
@@ -116,7 +107,7 @@ class RouterUser:
         """
         py_user_action = await user_auth_with_handling(self.logger, auth)
         query = create_db_query(py_user_action.user_id, start_date, end_date, hide_deleted=True)
-        return await get_user_workflow_jobs(logger=self.logger, rmq_publisher=self.rmq_publisher, query=query)
+        return await get_user_workflow_jobs(logger=self.logger, query=query)
 
     async def user_workspaces(
         self, auth: HTTPBasicCredentials = Depends(HTTPBasic()),
@@ -17,15 +17,16 @@ from operandi_utils.constants import AccountType, ServerApiTag, StateJob, StateW
 from operandi_utils.database import (
     db_create_page_stat_with_handling, db_create_workflow, db_create_workflow_job, db_get_hpc_slurm_job,
     db_update_workspace)
+from operandi_utils.hpc.nhr_inventory import HPCInventory
 from operandi_utils.rabbitmq import get_connection_publisher, RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS
 from operandi_server.files_manager import LFMInstance, receive_resource
 from operandi_server.models import SbatchArguments, WorkflowArguments, WorkflowRsrc, WorkflowJobRsrc
 from .workflow_utils import (
+    check_hpc_inventory_with_handling,
     get_db_workflow_job_with_handling,
     get_db_workflow_with_handling,
     get_user_workflows,
-    nf_script_extract_metadata_with_handling,
-    push_status_request_to_rabbitmq
+    nf_script_extract_metadata_with_handling
 )
 from .workspace_utils import (
     check_if_file_group_exists_with_handling, get_db_workspace_with_handling, find_file_groups_to_remove_with_handling)
@@ -38,6 +39,8 @@ class RouterWorkflow:
 
         # The workflows available to all users by default
         self.production_workflows = production_workflows
+        # The models and processor images available in the HPC, refreshed from the DB
+        self.hpc_inventory = HPCInventory()
 
         self.logger.info(f"Trying to connect RMQ Publisher")
         self.rmq_publisher = get_connection_publisher(enable_acks=True)
@@ -219,9 +222,6 @@ class RouterWorkflow:
         db_workflow = await get_db_workflow_with_handling(
             self.logger, workflow_id=workflow_id, check_deleted=False, check_local_existence=False)
 
-        if db_wf_job.job_state not in [StateJob.SUCCESS, StateJob.FAILED, StateJob.TRANSFERRING_FROM_HPC]:
-            await push_status_request_to_rabbitmq(self.logger, self.rmq_publisher, job_id=job_id)
-
         return WorkflowJobRsrc.from_db_workflow_job(
             db_workflow_job=db_wf_job, db_workflow=db_workflow, db_workspace=db_workspace)
 
@@ -237,7 +237,6 @@ class RouterWorkflow:
         db_wf_job = await get_db_workflow_job_with_handling(self.logger, job_id=job_id, check_local_existence=True)
         job_state = db_wf_job.job_state
         if job_state != StateJob.SUCCESS and job_state != StateJob.FAILED:
-            await push_status_request_to_rabbitmq(self.logger, self.rmq_publisher, job_id=job_id)
             message = f"Cannot download logs of a job unless it succeeds or fails: {job_id}"
             self.logger.exception(message)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=message)
@@ -261,7 +260,6 @@ class RouterWorkflow:
         db_wf_job = await get_db_workflow_job_with_handling(self.logger, job_id=job_id, check_local_existence=True)
         job_state = db_wf_job.job_state
         if job_state != StateJob.SUCCESS and job_state != StateJob.FAILED:
-            await push_status_request_to_rabbitmq(self.logger, self.rmq_publisher, job_id=job_id)
             message = f"Cannot download logs of a job unless it succeeds or fails: {job_id}"
             self.logger.exception(message)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=message)
@@ -323,6 +321,8 @@ class RouterWorkflow:
 
         # Check the availability of the workflow to be used
         db_workflow = await get_db_workflow_with_handling(self.logger, workflow_id=workflow_id)
+        # Fail fast instead of after waiting in the slurm queue when a processor image is missing in the HPC
+        await check_hpc_inventory_with_handling(self.logger, self.hpc_inventory, db_workflow)
         if preserve_file_grps:
             self.logger.info(f"Finding file groups to be removed based on the reproducible/preserve file groups")
             remove_file_grps = find_file_groups_to_remove_with_handling(self.logger, db_workspace, preserve_file_grps)
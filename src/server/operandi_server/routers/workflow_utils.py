@@ -1,17 +1,17 @@
 from fastapi import HTTPException, status
-from json import dumps
 from logging import Logger
 from pathlib import Path
 from typing import Any, Dict, List
 
-from operandi_utils.constants import StateJob
+from operandi_utils.constants import OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE
 from operandi_utils.database import (
-    db_get_all_workflows_by_user, db_get_all_workflow_jobs_by_user,
+    db_get_all_workflows_by_user, db_get_all_workflow_jobs_by_user, db_get_hpc_inventory,
     db_get_workflow, db_get_workflow_job, db_get_workspace
 )
 from operandi_utils.database.models import DBWorkflow, DBWorkflowJob
+from operandi_utils.hpc.constants import HPC_INVENTORY_REFRESH_INTERVAL, HPC_INVENTORY_TTL
+from operandi_utils.hpc.nhr_inventory import HPCInventory
 from operandi_utils.oton.constants import PARAMS_KEY_METS_SOCKET_PATH
-from operandi_utils.rabbitmq import RABBITMQ_QUEUE_JOB_STATUSES
 from operandi_server.models import WorkflowRsrc, WorkflowJobRsrc
 
 
@@ -48,6 +48,36 @@ async def get_db_workflow_job_with_handling(logger, job_id: str, check_local_exi
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=message)
     return db_workflow_job
 
+async def check_hpc_inventory_with_handling(logger, hpc_inventory: HPCInventory, db_workflow: DBWorkflow) -> None:
+    # The inventory is listed by the status worker of the broker, the server only reads it from the DB
+    if not hpc_inventory.is_fresh(ttl=HPC_INVENTORY_REFRESH_INTERVAL):
+        try:
+            db_hpc_inventory = await db_get_hpc_inventory()
+            hpc_inventory.update(
+                ocrd_models=db_hpc_inventory.ocrd_models, sif_images=db_hpc_inventory.sif_images,
+                refreshed_at=db_hpc_inventory.refreshed_at)
+        except RuntimeError as error:
+            logger.warning(f"Skipping the check of the processor images, no HPC inventory available: {error}")
+            return
+    if not hpc_inventory.is_fresh(ttl=HPC_INVENTORY_TTL):
+        logger.warning(
+            f"Skipping the check of the processor images, the HPC inventory is outdated: {hpc_inventory.refreshed_at}")
+        return
+    if not hpc_inventory.sif_images:
+        logger.warning("Skipping the check of the processor images, the HPC inventory is empty")
+        return
+    required_sif_images = [OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE["ocrd"]]
+    for executable in db_workflow.executable_steps:
+        if executable in OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE:
+            required_sif_images.append(OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE[executable])
+    missing_sif_images = hpc_inventory.get_missing_sif_images(required_sif_images)
+    if missing_sif_images:
+        message = (f"The processor images required by the workflow `{db_workflow.workflow_id}` "
+                   f"are not available in the HPC: {missing_sif_images}")
+        logger.error(f"{message}")
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message)
+
+
 # TODO: Find a way to simplify that potentially by getting the metadata from OtoN directly
 #  However, what about user defined workflows then?
 async def nf_script_extract_metadata_with_handling(logger, nf_script_path: str) -> dict:
@@ -82,26 +112,11 @@ async def get_user_workflows(logger: Logger, query: Dict[str, Any]) -> List[Work
     db_workflows = await db_get_all_workflows_by_user(query)
     return [WorkflowRsrc.from_db_workflow(db_workflow) for db_workflow in db_workflows]
 
-async def push_status_request_to_rabbitmq(logger, rmq_publisher, job_id: str):
-    # Create the job status message to be sent to the RabbitMQ queue
-    try:
-        job_status_message = {"job_id": f"{job_id}"}
-        logger.debug(f"Encoding the job status RabbitMQ message: {job_status_message}")
-        encoded_wf_message = dumps(job_status_message).encode(encoding="utf-8")
-        logger.debug(f"Pushing to the RabbitMQ queue for job statuses: {RABBITMQ_QUEUE_JOB_STATUSES}")
-        rmq_publisher.publish_to_queue(queue_name=RABBITMQ_QUEUE_JOB_STATUSES, message=encoded_wf_message)
-    except Exception as error:
-        message = "Failed to push status request to RabbitMQ"
-        logger.error(f"{message}, error: {error}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=message)
-
-async def get_user_workflow_jobs(logger, rmq_publisher, query: Dict[str, Any]) -> List[WorkflowJobRsrc]:
+async def get_user_workflow_jobs(logger, query: Dict[str, Any]) -> List[WorkflowJobRsrc]:
+    # The job states are reconciled with the HPC by the broker, the listing only reads the DB
     db_workflow_jobs = await db_get_all_workflow_jobs_by_user(query=query)
     response = []
     for db_workflow_job in db_workflow_jobs:
-        job_state = db_workflow_job.job_state
-        if job_state != StateJob.SUCCESS and job_state != StateJob.FAILED:
-            await push_status_request_to_rabbitmq(logger, rmq_publisher, db_workflow_job.job_id)
         db_workflow = await db_get_workflow(db_workflow_job.workflow_id)
         db_workspace = await db_get_workspace(db_workflow_job.workspace_id)
         response.append(WorkflowJobRsrc.from_db_workflow_job(db_workflow_job, db_workflow, db_workspace))
@@ -14,6 +14,7 @@ from ocrd_validators.ocrd_zip_validator import OcrdZipValidator
 
 from operandi_server.constants import DEFAULT_FILE_GRP, DEFAULT_METS_BASENAME
 from operandi_server.exceptions import WorkspaceNotValidException
+from operandi_utils import remove_file_groups_from_workspace
 from operandi_utils.constants import StateWorkspace
 from operandi_utils.database import db_get_workspace, db_get_all_workspaces_by_user
 from operandi_utils.database.models import DBWorkspace
@@ -192,8 +193,7 @@ def remove_file_groups_with_handling(
         workspace = Resolver().workspace_from_url(
             mets_url=db_workspace.workspace_mets_path, clobber_mets=False, mets_basename=db_workspace.mets_basename,
             download=False)
-        for file_group in file_groups:
-            workspace.remove_file_group(file_group, recursive=recursive, force=force)
+        remove_file_groups_from_workspace(workspace, file_groups=file_groups, recursive=recursive, force=force)
         workspace.save_mets()
         return workspace.mets.file_groups
     except Exception as error:
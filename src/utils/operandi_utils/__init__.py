@@ -1,38 +1,53 @@
 __all__ = [
+    "calculate_file_sha256",
     "call_sync",
     "create_db_query",
+    "extract_zip_stream",
     "is_url_responsive",
     "generate_id",
     "get_batch_scripts_dir",
     "get_log_file_path_prefix",
     "get_nf_wfs_dir",
     "get_ocrd_process_wfs_dir",
+    "get_staging_dir",
+    "get_zip_compress_type",
     "make_zip_archive",
     "receive_file",
     "reconfigure_all_loggers",
+    "remove_expired_previous_dirs",
+    "remove_file_groups_from_workspace",
     "safe_init_logging",
     "StateJob",
     "StateJobSlurm",
     "StateWorkspace",
+    "swap_in_staging_dir",
+    "TransferArchivePolicy",
     "unpack_zip_archive",
     "verify_and_parse_mq_uri",
     "verify_database_uri"
 ]
 
-from operandi_utils.constants import StateJob, StateJobSlurm, StateWorkspace
+from operandi_utils.constants import StateJob, StateJobSlurm, StateWorkspace, TransferArchivePolicy
 from operandi_utils.logging import reconfigure_all_loggers, get_log_file_path_prefix
 from operandi_utils.utils import (
+    calculate_file_sha256,
     call_sync,
     create_db_query,
+    extract_zip_stream,
     is_url_responsive,
     generate_id,
     get_batch_scripts_dir,
     get_nf_wfs_dir,
     get_ocrd_process_wfs_dir,
+    get_staging_dir,
+    get_zip_compress_type,
     receive_file,
     make_zip_archive,
+    remove_expired_previous_dirs,
+    remove_file_groups_from_workspace,
     unpack_zip_archive,
     safe_init_logging,
+    swap_in_staging_dir,
     verify_and_parse_mq_uri,
     verify_database_uri
 )
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dotenv import load_dotenv
 from enum import Enum
+from os import environ
 from typing import List
 
 try:
@@ -25,6 +26,10 @@ __all__ = [
     "StateJob",
     "StateJobSlurm",
     "StateWorkspace",
+    "TRANSFER_ARCHIVE_POLICY",
+    "TRANSFER_ARCHIVE_STORED_SUFFIXES",
+    "TransferArchivePolicy",
+    "WORKSPACE_SWAP_GRACE_PERIOD",
 ]
 
 load_dotenv()
@@ -43,6 +48,26 @@ MODULE_TYPES = ["server", "harvester", "client", "broker", "worker"]
 OPERANDI_VERSION = get_distribution("operandi_utils").version
 
 
+class TransferArchivePolicy(str, Enum):
+    # Compress all archive entries, the previous default
+    DEFLATE = "deflate"
+    # Store all archive entries without compression
+    STORE = "store"
+    # Store the already compressed media files, compress only the rest (XML, METS, PAGE, logs)
+    STORE_MEDIA = "store_media"
+
+
+# The compression policy of the zip archives transferred between the Operandi server and the HPC
+TRANSFER_ARCHIVE_POLICY: TransferArchivePolicy = TransferArchivePolicy(
+    environ.get("OPERANDI_TRANSFER_ARCHIVE_POLICY", TransferArchivePolicy.STORE_MEDIA.value))
+# File suffixes stored without compression by the `store_media` policy, compressing them gains almost nothing
+TRANSFER_ARCHIVE_STORED_SUFFIXES: List[str] = environ.get(
+    "OPERANDI_TRANSFER_ARCHIVE_STORED_SUFFIXES", ".tif,.tiff,.jpg,.jpeg,.jp2,.png,.gif,.webp,.pdf,.zip,.gz,.sif"
+).lower().split(",")
+# Seconds the previous version of a workspace is kept after the results from the HPC were swapped in
+WORKSPACE_SWAP_GRACE_PERIOD: int = int(environ.get("OPERANDI_WORKSPACE_SWAP_GRACE_PERIOD", 300))
+
+
 class AccountType(str, Enum):
     ADMIN = "ADMIN"
     HARVESTER = "HARVESTER"
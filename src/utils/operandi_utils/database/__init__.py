@@ -1,10 +1,12 @@
 __all__ = [
+    "DBHPCInventory",
     "DBHPCSlurmJob",
     "DBProcessingStatsTotal",
     "DBUserAccount",
     "DBWorkflow",
     "DBWorkflowJob",
     "DBWorkspace",
+    "db_claim_hpc_slurm_jobs_state_check",
     "db_create_hpc_slurm_job",
     "db_create_page_stat_with_handling",
     "db_create_processing_stats",
@@ -12,6 +14,8 @@ __all__ = [
     "db_create_workflow",
     "db_create_workflow_job",
     "db_create_workspace",
+    "db_get_active_hpc_slurm_jobs",
+    "db_get_hpc_inventory",
     "db_get_hpc_slurm_job",
     "db_get_processing_stats",
     "db_get_all_user_accounts",
@@ -24,17 +28,22 @@ __all__ = [
     "db_get_workspace",
     "db_get_all_workspaces_by_user",
     "db_initiate_database",
+    "db_update_hpc_inventory",
     "db_update_hpc_slurm_job",
+    "db_update_hpc_slurm_jobs_states",
     "db_update_user_account",
     "db_update_workflow",
     "db_update_workflow_job",
     "db_update_workspace",
+    "sync_db_claim_hpc_slurm_jobs_state_check",
     "sync_db_create_hpc_slurm_job",
     "sync_db_create_page_stat",
     "sync_db_create_user_account",
     "sync_db_create_workflow",
     "sync_db_create_workflow_job",
     "sync_db_create_workspace",
+    "sync_db_get_active_hpc_slurm_jobs",
+    "sync_db_get_hpc_inventory",
     "sync_db_get_hpc_slurm_job",
     "sync_db_get_all_user_accounts",
     "sync_db_get_user_account",
@@ -46,7 +55,9 @@ __all__ = [
     "sync_db_get_workspace",
     "sync_db_get_all_workspaces_by_user",
     "sync_db_initiate_database",
+    "sync_db_update_hpc_inventory",
     "sync_db_update_hpc_slurm_job",
+    "sync_db_update_hpc_slurm_jobs_states",
     "sync_db_update_user_account",
     "sync_db_update_workflow",
     "sync_db_update_workflow_job",
@@ -54,15 +65,27 @@ __all__ = [
 ]
 
 from .base import db_initiate_database, sync_db_initiate_database
-from .models import DBHPCSlurmJob, DBUserAccount, DBWorkflow, DBWorkflowJob, DBWorkspace
+from .models import DBHPCInventory, DBHPCSlurmJob, DBUserAccount, DBWorkflow, DBWorkflowJob, DBWorkspace
 from .models_stats import DBProcessingStatsTotal
+from .db_hpc_inventory import (
+    db_get_hpc_inventory,
+    db_update_hpc_inventory,
+    sync_db_get_hpc_inventory,
+    sync_db_update_hpc_inventory
+)
 from .db_hpc_slurm_job import (
+    db_claim_hpc_slurm_jobs_state_check,
     db_create_hpc_slurm_job,
+    db_get_active_hpc_slurm_jobs,
     db_get_hpc_slurm_job,
     db_update_hpc_slurm_job,
+    db_update_hpc_slurm_jobs_states,
+    sync_db_claim_hpc_slurm_jobs_state_check,
     sync_db_create_hpc_slurm_job,
+    sync_db_get_active_hpc_slurm_jobs,
     sync_db_get_hpc_slurm_job,
-    sync_db_update_hpc_slurm_job
+    sync_db_update_hpc_slurm_job,
+    sync_db_update_hpc_slurm_jobs_states
 )
 from .db_user_account import (
     db_create_user_account,
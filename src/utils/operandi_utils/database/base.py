@@ -4,7 +4,7 @@ from beanie import init_beanie
 from pymongo import AsyncMongoClient
 
 from operandi_utils import call_sync
-from .models import DBHPCSlurmJob, DBUserAccount, DBWorkflow, DBWorkflowJob, DBWorkspace
+from .models import DBHPCInventory, DBHPCSlurmJob, DBUserAccount, DBWorkflow, DBWorkflowJob, DBWorkspace
 from .models_stats import (
     DBPageStat,
     DBPageStatCancelled,
@@ -23,6 +23,7 @@ async def db_initiate_database(
     logger.info(f"MongoDB URL: {db_url}")
     logger.info(f"MongoDB Name: {db_name}")
     doc_models = [
+        DBHPCInventory,
         DBHPCSlurmJob,
         DBPageStat,
         DBPageStatCancelled,
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List
+from operandi_utils import call_sync
+from .models import DBHPCInventory
+
+HPC_INVENTORY_ID = "hpc_inventory"
+
+
+async def db_get_hpc_inventory(inventory_id: str = HPC_INVENTORY_ID) -> DBHPCInventory:
+    db_hpc_inventory = await DBHPCInventory.find_one(DBHPCInventory.inventory_id == inventory_id)
+    if not db_hpc_inventory:
+        raise RuntimeError(f"No DB hpc inventory entry found for id: {inventory_id}")
+    return db_hpc_inventory
+
+
+@call_sync
+async def sync_db_get_hpc_inventory(inventory_id: str = HPC_INVENTORY_ID) -> DBHPCInventory:
+    return await db_get_hpc_inventory(inventory_id)
+
+
+async def db_update_hpc_inventory(
+    ocrd_models: List[str], sif_images: List[str], inventory_id: str = HPC_INVENTORY_ID
+) -> DBHPCInventory:
+    db_hpc_inventory = await DBHPCInventory.find_one(DBHPCInventory.inventory_id == inventory_id)
+    if not db_hpc_inventory:
+        db_hpc_inventory = DBHPCInventory(inventory_id=inventory_id)
+    db_hpc_inventory.ocrd_models = ocrd_models
+    db_hpc_inventory.sif_images = sif_images
+    db_hpc_inventory.refreshed_at = datetime.now()
+    await db_hpc_inventory.save()
+    return db_hpc_inventory
+
+
+@call_sync
+async def sync_db_update_hpc_inventory(
+    ocrd_models: List[str], sif_images: List[str], inventory_id: str = HPC_INVENTORY_ID
+) -> DBHPCInventory:
+    return await db_update_hpc_inventory(ocrd_models, sif_images, inventory_id)
@@ -1,4 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List
+from uuid import uuid4
+from beanie.operators import In, LT, NotIn, Or, Set
 from operandi_utils import call_sync, StateJobSlurm
 from .models import DBHPCSlurmJob
 
@@ -45,6 +48,58 @@ async def sync_db_get_hpc_slurm_job(workflow_job_id: str) -> DBHPCSlurmJob:
     return await db_get_hpc_slurm_job(workflow_job_id)
 
 
+async def db_get_active_hpc_slurm_jobs() -> List[DBHPCSlurmJob]:
+    terminal_states = StateJobSlurm.success_states() + StateJobSlurm.failing_states()
+    return await DBHPCSlurmJob.find_many(
+        NotIn(DBHPCSlurmJob.hpc_slurm_job_state, terminal_states), DBHPCSlurmJob.deleted == False
+    ).to_list()
+
+
+@call_sync
+async def sync_db_get_active_hpc_slurm_jobs() -> List[DBHPCSlurmJob]:
+    return await db_get_active_hpc_slurm_jobs()
+
+
+async def db_claim_hpc_slurm_jobs_state_check(workflow_job_ids: List[str], ttl_seconds: int) -> List[DBHPCSlurmJob]:
+    """
+    Claims the slurm state check of the jobs not checked in the last `ttl_seconds`, and returns only
+    the claimed jobs. The claim of each entry is atomic, hence, concurrent status checks in different
+    processes never claim the same job within the same interval.
+    """
+    now = datetime.now()
+    expired_before = now - timedelta(seconds=ttl_seconds)
+    claim = uuid4().hex
+    await DBHPCSlurmJob.find_many(
+        In(DBHPCSlurmJob.workflow_job_id, workflow_job_ids),
+        Or(DBHPCSlurmJob.state_checked_at == None, LT(DBHPCSlurmJob.state_checked_at, expired_before))
+    ).update(Set({DBHPCSlurmJob.state_checked_at: now, DBHPCSlurmJob.state_check_claim: claim}))
+    return await DBHPCSlurmJob.find_many(
+        In(DBHPCSlurmJob.workflow_job_id, workflow_job_ids), DBHPCSlurmJob.state_check_claim == claim
+    ).to_list()
+
+
+@call_sync
+async def sync_db_claim_hpc_slurm_jobs_state_check(
+    workflow_job_ids: List[str], ttl_seconds: int
+) -> List[DBHPCSlurmJob]:
+    return await db_claim_hpc_slurm_jobs_state_check(workflow_job_ids, ttl_seconds)
+
+
+async def db_update_hpc_slurm_jobs_states(workflow_job_ids_to_states: Dict[str, StateJobSlurm]) -> None:
+    # A single update query per distinct state instead of a query per slurm job
+    workflow_job_ids_by_state: Dict[StateJobSlurm, List[str]] = {}
+    for workflow_job_id, hpc_slurm_job_state in workflow_job_ids_to_states.items():
+        workflow_job_ids_by_state.setdefault(hpc_slurm_job_state, []).append(workflow_job_id)
+    for hpc_slurm_job_state, workflow_job_ids in workflow_job_ids_by_state.items():
+        await DBHPCSlurmJob.find_many(In(DBHPCSlurmJob.workflow_job_id, workflow_job_ids)).update(
+            Set({DBHPCSlurmJob.hpc_slurm_job_state: hpc_slurm_job_state}))
+
+
+@call_sync
+async def sync_db_update_hpc_slurm_jobs_states(workflow_job_ids_to_states: Dict[str, StateJobSlurm]) -> None:
+    await db_update_hpc_slurm_jobs_states(workflow_job_ids_to_states)
+
+
 async def db_update_hpc_slurm_job(find_workflow_job_id: str, **kwargs) -> DBHPCSlurmJob:
     db_hpc_slurm_job = await db_get_hpc_slurm_job(workflow_job_id=find_workflow_job_id)
     model_keys = list(db_hpc_slurm_job.__dict__.keys())
@@ -49,6 +49,8 @@ class DBHPCSlurmJob(Document):
         hpc_slurm_job_state         The state of the slurm job inside the HPC
         hpc_batch_script_path       Full path of the batch script inside the HPC
         hpc_slurm_workspace_path    Full path of the slurm workspace inside the HPC
+        state_checked_at            The date time of the last claimed slurm job state check
+        state_check_claim           Unique token of the status check that claimed the last state check
         deleted                     Whether the entry has been deleted locally from the server
         datetime                    Shows the created date time of the entry
         details                     Extra user specified details about this entry
@@ -59,6 +61,8 @@ class DBHPCSlurmJob(Document):
     hpc_slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET
     hpc_batch_script_path: Optional[str] = "UNSET"
     hpc_slurm_workspace_path: Optional[str] = "UNSET"
+    state_checked_at: Optional[datetime] = None
+    state_check_claim: Optional[str] = None
     deleted: bool = False
     datetime: Optional[datetime]
     details: Optional[str] = "HPC-Slurm-Job"
@@ -66,6 +70,24 @@ class DBHPCSlurmJob(Document):
     class Settings:
         name = "hpc_slurm_jobs"
 
+class DBHPCInventory(Document):
+    """
+    Model to store the inventory of the OCR-D models and processor images available in the HPC
+
+    Attributes:
+        inventory_id    Unique id of the inventory, a single entry is kept and refreshed
+        ocrd_models     The available models as `ocrd_processor/model` paths inside the ocrd resources dir
+        sif_images      The file names of the available processor images (SIF)
+        refreshed_at    The date time of the last listing of the HPC dirs
+    """
+    inventory_id: str
+    ocrd_models: List[str] = []
+    sif_images: List[str] = []
+    refreshed_at: Optional[datetime] = None
+
+    class Settings:
+        name = "hpc_inventories"
+
 class DBWorkflow(Document):
     """
     Model to store a workflow in the mongo-database.
@@ -1,5 +1,6 @@
-__all__ = ["NHRConnector", "NHRExecutor", "NHRTransfer"]
+__all__ = ["NHRConnectionPool", "NHRConnector", "NHRExecutor", "NHRTransfer"]
 
+from operandi_utils.hpc.nhr_connection_pool import NHRConnectionPool
 from operandi_utils.hpc.nhr_connector import NHRConnector
 from operandi_utils.hpc.nhr_executor import NHRExecutor
 from operandi_utils.hpc.nhr_transfer import NHRTransfer
@@ -18,6 +18,7 @@ hostname
 json_args="$1"
 
 ocrd_processor_images=()
+apptainer_instances=()
 mapfile -t ocrd_processor_images < <(echo "$json_args" | jq .ocrd_processor_images | tr -d '"' | tr "," "\n")
 echo "Ocrd total images in request: ${#ocrd_processor_images[@]}"
 echo "Ocrd images: "
@@ -34,7 +35,17 @@ WORKSPACE_ID=$(echo "$json_args" | jq .workspace_id | tr -d '"')
 NF_SCRIPT_ID=$(echo "$json_args" | jq .nf_script_id | tr -d '"')
 FILE_GROUPS_TO_REMOVE=$(echo "$json_args" | jq .file_groups_to_remove | tr -d '"')
 SIF_OCRD_CORE=$(echo "$json_args" | jq .sif_ocrd_core | tr -d '"')
+OCRD_MODELS=$(echo "$json_args" | jq .ocrd_models | tr -d '"')
 NF_RUN_COMMAND=$(echo "$json_args" | jq .nf_run_command | tr -d '"')
+ARCHIVE_POLICY=$(echo "$json_args" | jq .archive_policy | tr -d '"')
+ARCHIVE_STORED_SUFFIXES=$(echo "$json_args" | jq .archive_stored_suffixes | tr -d '"')
+CONTENT_STORE_DIR=$(echo "$json_args" | jq .content_store_dir | tr -d '"')
+CONTENT_MANIFEST=$(echo "$json_args" | jq .content_manifest | tr -d '"')
+RESULTS_TRANSFER_MODE=$(echo "$json_args" | jq .results_transfer_mode | tr -d '"')
+RESULTS_FILE_LIST=$(echo "$json_args" | jq .results_file_list | tr -d '"')
+NODE_CACHE_DIR=$(echo "$json_args" | jq .node_cache_dir | tr -d '"')
+NODE_CACHE_MAX_SIZE=$(echo "$json_args" | jq .node_cache_max_size | tr -d '"')
+USE_APPTAINER_INSTANCES=$(echo "$json_args" | jq .use_apptainer_instances | tr -d '"')
 
 WORKFLOW_JOB_ZIP="$SCRATCH_BASE/$WORKFLOW_JOB_ID.zip"
 
@@ -43,6 +54,7 @@ NODE_WORKFLOW_JOB_DIR="$NODE_DIR_BASE/$WORKFLOW_JOB_ID"
 NODE_WORKFLOW_JOB_ZIP="$NODE_DIR_BASE/$WORKFLOW_JOB_ID.zip"
 NODE_WORKSPACE_DIR="$NODE_DIR_BASE/$WORKFLOW_JOB_ID/$WORKSPACE_ID"
 NODE_NF_SCRIPT_PATH="$NODE_DIR_BASE/$WORKFLOW_JOB_ID/$NF_SCRIPT_ID"
+NODE_RESULTS_MARKER="$NODE_DIR_BASE/${WORKFLOW_JOB_ID}_results.marker"
 
 PROJECT_DIR_OCRD_MODELS="$PROJECT_BASE_DIR/ocrd_models"
 PROJECT_DIR_PROCESSOR_SIFS="$PROJECT_BASE_DIR/ocrd_processor_sifs"
@@ -50,11 +62,22 @@ NODE_DIR_OCRD_MODELS="$NODE_DIR_BASE/ocrd_models"
 NODE_DIR_PROCESSOR_SIFS="$NODE_DIR_BASE/ocrd_processor_sifs"
 PATH_SIF_OCRD_CORE="$NODE_DIR_PROCESSOR_SIFS/$SIF_OCRD_CORE"
 
+# The node cache persists across jobs, the images are stored by their sha256 and linked into the node dir of the job
+NODE_CACHE_DIR_PROCESSOR_SIFS="$NODE_CACHE_DIR/ocrd_processor_sifs"
+NODE_CACHE_LOCK="$NODE_CACHE_DIR/node_cache.lock"
+NODE_CACHE_LOCK_TIMEOUT=1800
+
+METS_SERVER_STARTUP_TIMEOUT=60
+
+# Instance names are unique per user on a node, the prefix keeps apart the instances of concurrent jobs
+APPTAINER_INSTANCE_PREFIX="operandi_$WORKFLOW_JOB_ID"
+
 echo ""
 echo "Project dir ocrd models: $PROJECT_DIR_OCRD_MODELS"
 echo "Project dir processor sifs: $PROJECT_DIR_PROCESSOR_SIFS"
 echo "Node dir ocrd models: $NODE_DIR_OCRD_MODELS"
 echo "Node dir processor sifs: $NODE_DIR_PROCESSOR_SIFS"
+echo "Node cache dir: $NODE_CACHE_DIR"
 echo ""
 
 echo "Node workspace dir: $NODE_WORKSPACE_DIR"
@@ -68,6 +91,7 @@ NF_RUN_COMMAND="${NF_RUN_COMMAND//PH_NF_SCRIPT_PATH/$NODE_NF_SCRIPT_PATH}"
 NF_RUN_COMMAND="${NF_RUN_COMMAND//PH_NODE_DIR_OCRD_MODELS/$NODE_DIR_OCRD_MODELS}"
 NF_RUN_COMMAND="${NF_RUN_COMMAND//PH_CMD_WRAPPER/\'}"
 NF_RUN_COMMAND="${NF_RUN_COMMAND//PH_NODE_DIR_PROCESSOR_SIFS/$NODE_DIR_PROCESSOR_SIFS}"
+NF_RUN_COMMAND="${NF_RUN_COMMAND//PH_APPTAINER_INSTANCE_PREFIX/$APPTAINER_INSTANCE_PREFIX}"
 echo ""
 echo "Nf run command without placeholders: $NF_RUN_COMMAND"
 echo ""
@@ -78,7 +102,8 @@ CMD_PRINT_OCRD_VERSION="$CMD_APPTAINER_WRAPPER ocrd --version"
 CMD_START_METS_SERVER="$CMD_APPTAINER_WRAPPER ocrd workspace -d /ws_data -U /ws_data/mets_server.sock server start > $NODE_WORKSPACE_DIR/mets_server.log 2>&1 &"
 CMD_STOP_METS_SERVER="$CMD_APPTAINER_WRAPPER ocrd workspace -d /ws_data -U /ws_data/mets_server.sock server stop"
 CMD_LIST_FILE_GROUPS="$CMD_APPTAINER_WRAPPER ocrd workspace -d /ws_data list-group"
-CMD_REMOVE_FILE_GROUP="$CMD_APPTAINER_WRAPPER ocrd workspace -d /ws_data remove-group -r -f PH_FILE_GROUP > $NODE_WORKSPACE_DIR/remove_file_groups.log 2>&1"
+CMD_START_APPTAINER_INSTANCE="apptainer instance start --bind $NODE_WORKSPACE_DIR:/ws_data --bind $NODE_DIR_OCRD_MODELS/ocrd-resources:/usr/local/share/ocrd-resources"
+CMD_REMOVE_FILE_GROUPS="$CMD_APPTAINER_WRAPPER ocrd workspace -d /ws_data remove-group -r -f"
 
 check_existence_of_dir_scratch_base(){
   if [ ! -d "${SCRATCH_BASE}" ]; then
@@ -120,10 +145,13 @@ check_existence_of_paths() {
 
 clear_data_from_computing_node() {
   echo ""
+  stop_apptainer_instances
   echo "Removing the OCR-D models directory from the computing node, path: ${NODE_DIR_OCRD_MODELS}"
   rm -rf "${NODE_DIR_OCRD_MODELS}"
+  # Only the links are removed for the images staged from the node cache, the cached images are kept for next jobs
   echo "Removing the OCR-D processor images (SIF) directory from the computing node, path: ${NODE_DIR_PROCESSOR_SIFS}"
   rm -rf "${NODE_DIR_PROCESSOR_SIFS}"
+  rm -f "${NODE_RESULTS_MARKER}"
 }
 
 transfer_to_node_storage_workflow_job_zip(){
@@ -145,17 +173,154 @@ transfer_to_node_storage_workflow_job_zip(){
 }
 
 transfer_to_node_storage_processor_models(){
-  cp -R "${PROJECT_DIR_OCRD_MODELS}" "${NODE_DIR_OCRD_MODELS}"
+  start_time=$(date +%s.%N)
+  if [ "$OCRD_MODELS" == "*" ] ; then
+    echo "Transferring all ocrd models to node local storage"
+    cp -R "${PROJECT_DIR_OCRD_MODELS}" "${NODE_DIR_OCRD_MODELS}"
+  else
+    # Only the models required by the workflow, given as `executable/resource` paths inside ocrd-resources
+    mkdir -p "${NODE_DIR_OCRD_MODELS}/ocrd-resources"
+    ocrd_models=()
+    mapfile -t ocrd_models < <(echo "$OCRD_MODELS" | tr "," "\n" | sed "/^$/d")
+    echo "Transferring ${#ocrd_models[@]} required ocrd models to node local storage"
+    for ocrd_model in "${ocrd_models[@]}"
+    do
+      node_model_dir="${NODE_DIR_OCRD_MODELS}/ocrd-resources/$(dirname "$ocrd_model")"
+      mkdir -p "$node_model_dir"
+      model_found=false
+      # The model may be stored with a file extension not given in the processor parameters
+      for model_path in "${PROJECT_DIR_OCRD_MODELS}/ocrd-resources/${ocrd_model}" "${PROJECT_DIR_OCRD_MODELS}/ocrd-resources/${ocrd_model}".*
+      do
+        if [ -e "$model_path" ]; then
+          cp -R "$model_path" "$node_model_dir/"
+          model_found=true
+        fi
+      done
+      if [ "$model_found" == "false" ]; then
+        echo "Required ocrd model not found in the project ocrd models: ${ocrd_model}"
+      fi
+    done
+  fi
   if [ ! -d "${NODE_DIR_OCRD_MODELS}" ]; then
     echo "Ocrd models directory not found at node local storage: ${NODE_DIR_OCRD_MODELS}"
     clear_data_from_computing_node
     exit 1
   else
-    echo "Successfully transferred ocrd models to node local storage: ${NODE_DIR_OCRD_MODELS}"
+    duration=$(awk -v start="$start_time" -v end="$(date +%s.%N)" 'BEGIN { printf "%.3f", end - start }')
+    echo "Successfully transferred ocrd models to node local storage: ${NODE_DIR_OCRD_MODELS}, in $duration seconds"
+  fi
+}
+
+get_processor_image_sha256(){
+  # The sha256 of a project image is kept in a sidecar file and computed again only when the image has changed.
+  # The output is the node cache key, hence, the messages are written to stderr
+  local image_path="$1"
+  local sidecar_path="${image_path}.sha256"
+  local image_stat image_sha256
+  image_stat=$(stat -c "%s %Y" "$image_path") || return 1
+  if [ -f "$sidecar_path" ] && [ "$(cut -d " " -f2- < "$sidecar_path")" == "$image_stat" ]; then
+    cut -d " " -f1 < "$sidecar_path"
+    return 0
+  fi
+  # Without a stored sidecar every job would hash the whole image again, the key is then derived from its metadata
+  if ! { : > "${sidecar_path}.$$"; } 2>/dev/null; then
+    echo "Failed to store the sha256 sidecar: ${sidecar_path}, keying the node cache on path, size and mtime" >&2
+    echo "$image_path $image_stat" | sha256sum | cut -d " " -f1
+    return 0
+  fi
+  if ! image_sha256=$(sha256sum "$image_path" | cut -d " " -f1); then
+    rm -f "${sidecar_path}.$$"
+    return 1
+  fi
+  # Concurrent jobs may write the same sidecar, the rename keeps it complete
+  if ! { echo "$image_sha256 $image_stat" > "${sidecar_path}.$$" && mv -f "${sidecar_path}.$$" "$sidecar_path"; } 2>/dev/null; then
+    echo "Failed to store the sha256 sidecar: ${sidecar_path}, the image is hashed again by the next job" >&2
+    rm -f "${sidecar_path}.$$"
+  fi
+  echo "$image_sha256"
+}
+
+lock_node_cache(){
+  # Fails when the node cache is disabled or not usable, the images are then staged for the job only
+  if [ -z "$NODE_CACHE_DIR" ] || [ "$NODE_CACHE_DIR" == "null" ]; then
+    return 1
+  fi
+  mkdir -p "$NODE_CACHE_DIR_PROCESSOR_SIFS" 2>/dev/null || return 1
+  if [ ! -w "$NODE_CACHE_DIR_PROCESSOR_SIFS" ]; then
+    return 1
+  fi
+  exec {node_cache_lock_fd}>>"$NODE_CACHE_LOCK" || return 1
+  if ! flock -w "$NODE_CACHE_LOCK_TIMEOUT" "$node_cache_lock_fd"; then
+    echo "Timed out waiting for the node cache lock: $NODE_CACHE_LOCK"
+    exec {node_cache_lock_fd}>&-
+    return 1
+  fi
+  # Leftovers of jobs killed while copying into the cache
+  rm -f "$NODE_CACHE_DIR_PROCESSOR_SIFS"/*.part
+}
+
+unlock_node_cache(){
+  flock -u "$node_cache_lock_fd"
+  exec {node_cache_lock_fd}>&-
+}
+
+evict_from_node_cache(){
+  # Removes the least recently used images until the required size fits in the node cache,
+  # the images used by running jobs are held with a shared lock and never removed
+  local required_size="$1"
+  local cache_size image_size available_size cached_image_path
+  if [ "$required_size" -gt "$NODE_CACHE_MAX_SIZE" ]; then
+    echo "The image of $required_size bytes is larger than the node cache size: $NODE_CACHE_MAX_SIZE"
+    return 1
+  fi
+  cache_size=$(du -sb "$NODE_CACHE_DIR_PROCESSOR_SIFS" | cut -f1)
+  while read -r cached_image_path; do
+    if [ $((cache_size + required_size)) -le "$NODE_CACHE_MAX_SIZE" ]; then
+      break
+    fi
+    image_size=$(stat -c %s "$cached_image_path")
+    if flock -n -x "$cached_image_path" rm -f "$cached_image_path"; then
+      echo "Evicted the least recently used image from the node cache: $cached_image_path"
+      cache_size=$((cache_size - image_size))
+    fi
+  done < <(find "$NODE_CACHE_DIR_PROCESSOR_SIFS" -maxdepth 1 -name "*.sif" -printf "%T@ %p\n" | sort -n | cut -d " " -f2-)
+  if [ $((cache_size + required_size)) -gt "$NODE_CACHE_MAX_SIZE" ]; then
+    echo "Not enough space in the node cache, the cached images are in use by other jobs"
+    return 1
+  fi
+  available_size=$(df --output=avail -B1 "$NODE_CACHE_DIR_PROCESSOR_SIFS" | tail -n 1)
+  if [ "$required_size" -gt "$available_size" ]; then
+    echo "Not enough free disk space for the node cache: $available_size bytes"
+    return 1
+  fi
+}
+
+stage_processor_image_from_node_cache(){
+  local ocrd_image_path="$1"
+  local node_ocrd_image_path="$2"
+  local image_sha256 cached_image_path
+  image_sha256=$(get_processor_image_sha256 "$ocrd_image_path") || return 1
+  cached_image_path="$NODE_CACHE_DIR_PROCESSOR_SIFS/${image_sha256}.sif"
+  if [ -f "$cached_image_path" ]; then
+    echo "Node cache hit of ocrd processor image: ${ocrd_image_path}"
+  else
+    echo "Node cache miss, transferring ocrd processor image to the node cache: ${ocrd_image_path}"
+    evict_from_node_cache "$(stat -c %s "$ocrd_image_path")" || return 1
+    if ! cp "$ocrd_image_path" "${cached_image_path}.part"; then
+      rm -f "${cached_image_path}.part"
+      return 1
+    fi
+    mv "${cached_image_path}.part" "$cached_image_path" || return 1
   fi
+  # The modification time orders the eviction, the shared lock is kept until the job finishes
+  touch "$cached_image_path"
+  exec {cached_image_lock_fd}<"$cached_image_path" || return 1
+  flock -s "$cached_image_lock_fd" || return 1
+  ln -s "$cached_image_path" "$node_ocrd_image_path"
 }
 
 transfer_to_node_storage_processor_images(){
+  start_time=$(date +%s.%N)
   if [ ! -d "${NODE_DIR_PROCESSOR_SIFS}" ]; then
     echo "Creating non-existing processor sif images dir: $NODE_DIR_PROCESSOR_SIFS"
     mkdir -p "${NODE_DIR_PROCESSOR_SIFS}"
@@ -164,6 +329,13 @@ transfer_to_node_storage_processor_images(){
     echo "Required node processor sif images dir was not found: ${NODE_DIR_PROCESSOR_SIFS}"
     exit 1
   fi
+  use_node_cache=false
+  if lock_node_cache; then
+    use_node_cache=true
+    echo "Using the node cache of processor images: ${NODE_CACHE_DIR_PROCESSOR_SIFS}"
+  else
+    echo "The node cache is not used, the processor images are transferred for this job only"
+  fi
 
   for ocrd_image in "${ocrd_processor_images[@]}"
   do
@@ -177,6 +349,13 @@ transfer_to_node_storage_processor_images(){
       echo "Skipping ${ocrd_image_path} since the same image was already copied in a previous step"
       continue
     fi
+    if [ "$use_node_cache" == "true" ]; then
+      if stage_processor_image_from_node_cache "$ocrd_image_path" "$node_ocrd_image_path"; then
+        echo "Ocrd processor image was linked from the node cache to: ${node_ocrd_image_path}"
+        continue
+      fi
+      echo "Failed to use the node cache for: ${ocrd_image}"
+    fi
     echo "Transferring ocrd processor image to the compute node: ${ocrd_image}"
     cp "${ocrd_image_path}" "${node_ocrd_image_path}"
     echo "Ocrd processor image was transferred to: ${node_ocrd_image_path}"
@@ -185,9 +364,11 @@ transfer_to_node_storage_processor_images(){
       exit 1
     fi
   done
-  echo ""
-  eval "$CMD_PRINT_OCRD_VERSION"
-  echo ""
+  if [ "$use_node_cache" == "true" ]; then
+    unlock_node_cache
+  fi
+  duration=$(awk -v start="$start_time" -v end="$(date +%s.%N)" 'BEGIN { printf "%.3f", end - start }')
+  echo "Ocrd processor images were staged on the compute node in $duration seconds"
 }
 
 unzip_workflow_job_dir_in_node() {
@@ -210,11 +391,100 @@ unzip_workflow_job_dir_in_node() {
   cd "$NODE_WORKFLOW_JOB_DIR" || exit 1
 }
 
+assemble_workspace_from_content_store() {
+  NODE_CONTENT_MANIFEST="$NODE_WORKFLOW_JOB_DIR/$CONTENT_MANIFEST"
+  if [ ! -f "$NODE_CONTENT_MANIFEST" ]; then
+    echo "No content manifest found, the workspace was transferred completely inside the zip"
+    return
+  fi
+
+  echo "Assembling the workspace files listed in $NODE_CONTENT_MANIFEST from the content store: $CONTENT_STORE_DIR"
+  files_amount=0
+  while read -r content_hash relative_path; do
+    content_path="$CONTENT_STORE_DIR/${content_hash:0:2}/$content_hash"
+    if [ ! -f "$content_path" ]; then
+      echo "Required content of $relative_path was not found in the content store: $content_path"
+      clear_data_from_computing_node
+      exit 1
+    fi
+    mkdir -p "$(dirname "$NODE_WORKFLOW_JOB_DIR/$relative_path")"
+    # The node local storage is a different file system than the scratch, hence a copy instead of a hardlink
+    cp "$content_path" "$NODE_WORKFLOW_JOB_DIR/$relative_path"
+    files_amount=$((files_amount + 1))
+  done < "$NODE_CONTENT_MANIFEST"
+  rm -f "$NODE_CONTENT_MANIFEST"
+  echo "Successfully assembled $files_amount workspace files from the content store"
+}
+
+mark_workspace_before_processing() {
+  # Files modified after the marker are the ones created or changed by the workflow
+  touch "$NODE_RESULTS_MARKER"
+}
+
+stage_workspace_in_node() {
+  run_phase "transfer_workflow_job_zip" transfer_to_node_storage_workflow_job_zip
+  run_phase "unzip_workflow_job" unzip_workflow_job_dir_in_node
+  run_phase "assemble_workspace" assemble_workspace_from_content_store
+  mark_workspace_before_processing
+}
+
+stage_data_in_node() {
+  # The workspace and the models are staged in the background while the processor images are staged
+  # in the main shell, which has to keep the shared locks of the images taken from the node cache
+  staging_log_prefix="$NODE_DIR_BASE/${WORKFLOW_JOB_ID}_staging"
+  stage_workspace_in_node > "${staging_log_prefix}_workspace.log" 2>&1 &
+  staging_workspace_pid=$!
+  run_phase "stage_models" transfer_to_node_storage_processor_models > "${staging_log_prefix}_models.log" 2>&1 &
+  staging_models_pid=$!
+  trap 'kill "$staging_workspace_pid" "$staging_models_pid" 2>/dev/null || true' EXIT
+  run_phase "stage_images" transfer_to_node_storage_processor_images
+
+  staging_failed=false
+  wait "$staging_workspace_pid" || staging_failed=true
+  wait "$staging_models_pid" || staging_failed=true
+  trap - EXIT
+  cat "${staging_log_prefix}_workspace.log" "${staging_log_prefix}_models.log"
+  rm -f "${staging_log_prefix}_workspace.log" "${staging_log_prefix}_models.log"
+  if [ "$staging_failed" == "true" ]; then
+    echo "Staging the data in the computing node has failed"
+    clear_data_from_computing_node
+    exit 1
+  fi
+  # The directory changes of the background staging are not inherited, Nextflow runs inside the workflow job dir
+  cd "$NODE_WORKFLOW_JOB_DIR" || exit 1
+  echo ""
+  eval "$CMD_PRINT_OCRD_VERSION"
+  echo ""
+}
+
+wait_for_mets_server() {
+  # Polls for the socket of the mets server instead of waiting a fixed time
+  local mets_server_pid="$1"
+  local waited_steps=0
+  until [ -S "$NODE_WORKSPACE_DIR/mets_server.sock" ]; do
+    if ! kill -0 "$mets_server_pid" 2>/dev/null; then
+      echo "The mets server has exited before becoming ready, see: $NODE_WORKSPACE_DIR/mets_server.log"
+      return 1
+    fi
+    if [ "$waited_steps" -ge $((METS_SERVER_STARTUP_TIMEOUT * 10)) ]; then
+      echo "The mets server was not ready after $METS_SERVER_STARTUP_TIMEOUT seconds"
+      return 1
+    fi
+    sleep 0.1
+    waited_steps=$((waited_steps + 1))
+  done
+}
+
 start_mets_server() {
   if [ "$USE_METS_SERVER" == "true" ] ; then
     echo "Starting the mets server for the specific workspace in the background"
+    rm -f "$NODE_WORKSPACE_DIR/mets_server.sock"
     eval "$CMD_START_METS_SERVER"
-    sleep 10
+    if ! wait_for_mets_server $!; then
+      clear_data_from_computing_node
+      exit 1
+    fi
+    echo "The mets server is ready"
   fi
 }
 
@@ -225,6 +495,36 @@ stop_mets_server() {
   fi
 }
 
+start_apptainer_instances() {
+  # One long-running instance per distinct image, the Nextflow processes are executed inside the instances
+  if [ "$USE_APPTAINER_INSTANCES" != "true" ] ; then
+    return
+  fi
+  for ocrd_image in "${ocrd_processor_images[@]}"
+  do
+    instance_name="${APPTAINER_INSTANCE_PREFIX}_${ocrd_image%.sif}"
+    if [[ " ${apptainer_instances[*]} " == *" $instance_name "* ]]; then
+      continue
+    fi
+    echo "Starting apptainer instance: $instance_name"
+    if ! $CMD_START_APPTAINER_INSTANCE "$NODE_DIR_PROCESSOR_SIFS/$ocrd_image" "$instance_name"; then
+      echo "Failed to start apptainer instance of image: $ocrd_image"
+      clear_data_from_computing_node
+      exit 1
+    fi
+    apptainer_instances+=("$instance_name")
+  done
+}
+
+stop_apptainer_instances() {
+  for instance_name in "${apptainer_instances[@]}"
+  do
+    echo "Stopping apptainer instance: $instance_name"
+    apptainer instance stop "$instance_name" || echo "Failed to stop apptainer instance: $instance_name"
+  done
+  apptainer_instances=()
+}
+
 execute_nextflow_workflow() {
   if [ "$USE_METS_SERVER" == "true" ] ; then
     echo "Executing the nextflow workflow with mets server"
@@ -252,24 +552,15 @@ list_file_groups_from_workspace() {
     echo
 }
 
-remove_file_group_from_workspace() {
-  echo "Removing file group: $1"
-  CMD_REMOVE_FILE_GROUP="${CMD_REMOVE_FILE_GROUP//PH_FILE_GROUP/$1}"
-  eval "$CMD_REMOVE_FILE_GROUP"
-  # Set the placeholder again for future invocations
-  CMD_REMOVE_FILE_GROUP="${CMD_REMOVE_FILE_GROUP//$1/PH_FILE_GROUP}"
-}
-
 remove_file_groups_from_workspace() {
   list_file_groups_from_workspace
   if [ "$1" != "" ] ; then
     echo "Splitting file groups to an array"
     file_groups=()
     mapfile -t file_groups < <(echo "$1" | tr "," "\n")
-    for file_group in "${file_groups[@]}"
-    do
-      remove_file_group_from_workspace "$file_group"
-    done
+    # A single container start and METS load for all file groups
+    echo "Removing file groups: ${file_groups[*]}"
+    $CMD_REMOVE_FILE_GROUPS "${file_groups[@]}" > "$NODE_WORKSPACE_DIR/remove_file_groups.log" 2>&1
     list_file_groups_from_workspace
     case $? in
       0) echo "The file groups have been removed successfully" ;;
@@ -280,15 +571,79 @@ remove_file_groups_from_workspace() {
   fi
 }
 
+# Mirrors the transfer archive policy of operandi_utils, media files are already compressed
+zip_policy_options() {
+  case "$ARCHIVE_POLICY" in
+    deflate) ;;
+    store) echo "-0" ;;
+    *) echo "-n $ARCHIVE_STORED_SUFFIXES" ;;
+  esac
+}
+
+# Writes the duration of a job phase as a single machine readable line to the job log
+report_phase_duration() {
+  local phase_name="$1"
+  local start_time="$2"
+  local duration
+  duration=$(awk -v start="$start_time" -v end="$(date +%s.%N)" 'BEGIN { printf "%.3f", end - start }')
+  echo "PHASE_DURATION {\"phase\": \"$phase_name\", \"seconds\": $duration}"
+}
+
+run_phase() {
+  local phase_name="$1"
+  local phase_start_time
+  shift
+  phase_start_time=$(date +%s.%N)
+  "$@"
+  report_phase_duration "$phase_name" "$phase_start_time"
+}
+
+report_zip_stats() {
+  local zip_path="$1"
+  local bytes_in="$2"
+  local start_time="$3"
+  local duration
+  duration=$(awk -v start="$start_time" -v end="$(date +%s.%N)" 'BEGIN { printf "%.3f", end - start }')
+  echo "Zip archive stats of $zip_path: policy=$ARCHIVE_POLICY, bytes_in=$bytes_in, bytes_out=$(stat -c %s "$zip_path"), duration=$duration"
+}
+
+find_workspace_files_changed() {
+  find . -type f -newer "$NODE_RESULTS_MARKER" ! -name "*.sock" ! -name "$WORKSPACE_ID.zip" ! -name "workspace_zipping.log" "$@"
+}
+
+zip_workspace_delta() {
+  # The server still has the unchanged files, only the files created or changed by the workflow
+  # (new file groups, the updated METS) are zipped, together with the list of all resulting files
+  cd "$NODE_WORKSPACE_DIR" || exit 1
+  find . -type f ! -name "*.sock" ! -name "$RESULTS_FILE_LIST" | sed "s|^\./||" > "$RESULTS_FILE_LIST"
+  echo "Zipping the files changed by the workflow out of $(wc -l < "$RESULTS_FILE_LIST") workspace files"
+  # shellcheck disable=SC2046
+  find_workspace_files_changed | zip $(zip_policy_options) "$WORKSPACE_ID.zip" -@ > "workspace_zipping.log"
+  bytes_in=$(find_workspace_files_changed -printf "%s\n" | awk '{ total += $1 } END { print total + 0 }')
+}
+
 zip_results() {
   # Delete symlinks created for the Nextflow workers
   find "$NODE_WORKFLOW_JOB_DIR" -type l -delete
   # Create a zip of the ocrd workspace dir
-  cd "$NODE_WORKSPACE_DIR" && zip -r "$WORKSPACE_ID.zip" "." -x "*.sock" > "workspace_zipping.log"
+  start_time=$(date +%s.%N)
+  if [ "$RESULTS_TRANSFER_MODE" == "delta" ] ; then
+    zip_workspace_delta
+  else
+    # shellcheck disable=SC2046
+    cd "$NODE_WORKSPACE_DIR" && zip -r $(zip_policy_options) "$WORKSPACE_ID.zip" "." -x "*.sock" > "workspace_zipping.log"
+    bytes_in=$(du -sb --apparent-size --exclude="$WORKSPACE_ID.zip" "$NODE_WORKSPACE_DIR" | cut -f1)
+  fi
+  report_zip_stats "$NODE_WORKSPACE_DIR/$WORKSPACE_ID.zip" "$bytes_in" "$start_time"
   # Create a zip of the Nextflow run results by excluding the ocrd workspace dir
-  cd "$NODE_WORKFLOW_JOB_DIR" && zip -r "$NODE_WORKFLOW_JOB_ZIP" "." -x "$WORKSPACE_ID**" > "workflow_job_zipping.log"
-
-  case $? in
+  start_time=$(date +%s.%N)
+  # shellcheck disable=SC2046
+  cd "$NODE_WORKFLOW_JOB_DIR" && zip -r $(zip_policy_options) "$NODE_WORKFLOW_JOB_ZIP" "." -x "$WORKSPACE_ID**" > "workflow_job_zipping.log"
+  zip_return_code=$?
+  bytes_in=$(du -sb --apparent-size --exclude="$WORKSPACE_ID" "$NODE_WORKFLOW_JOB_DIR" | cut -f1)
+  report_zip_stats "$NODE_WORKFLOW_JOB_ZIP" "$bytes_in" "$start_time"
+
+  case $zip_return_code in
     0) echo "The results have been zipped successfully" ;;
     *) echo "The zipping of results has failed" >&2 clear_data_from_computing_node exit 1 ;;
   esac
@@ -311,14 +666,15 @@ transfer_from_node_storage_result_zips(){
 # Main loop for workflow job execution
 check_existence_of_paths
 echo ""
-transfer_to_node_storage_workflow_job_zip
-unzip_workflow_job_dir_in_node
-transfer_to_node_storage_processor_models
-transfer_to_node_storage_processor_images
-start_mets_server
-execute_nextflow_workflow
-stop_mets_server
-remove_file_groups_from_workspace "$FILE_GROUPS_TO_REMOVE"
-zip_results
-transfer_from_node_storage_result_zips
-clear_data_from_computing_node
+job_start_time=$(date +%s.%N)
+run_phase "stage_data" stage_data_in_node
+run_phase "start_mets_server" start_mets_server
+run_phase "start_apptainer_instances" start_apptainer_instances
+run_phase "nextflow_workflow" execute_nextflow_workflow
+run_phase "stop_apptainer_instances" stop_apptainer_instances
+run_phase "stop_mets_server" stop_mets_server
+run_phase "remove_file_groups" remove_file_groups_from_workspace "$FILE_GROUPS_TO_REMOVE"
+run_phase "zip_results" zip_results
+run_phase "transfer_result_zips" transfer_from_node_storage_result_zips
+run_phase "clear_node_data" clear_data_from_computing_node
+report_phase_duration "total" "$job_start_time"
@@ -0,0 +1,6 @@
+#!/bin/bash
+
+# $0 - This bash script
+# $1 - Comma separated slurm job ids
+
+sacct -j "$1" --parsable2 --noheader --format=jobid,state,exitcode
@@ -1,5 +1,75 @@
+from random import uniform
+from threading import Lock
+from time import monotonic
+
 from paramiko import SFTPClient, SSHClient, Transport
 
+from .constants import (
+    HPC_CIRCUIT_BREAKER_FAILURE_THRESHOLD, HPC_CIRCUIT_BREAKER_RESET_TIMEOUT, HPC_RETRY_BACKOFF_BASE,
+    HPC_RETRY_BACKOFF_MAX)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops new connection attempts to the HPC frontend server after several consecutive failures.
+    While open, requests are rejected without touching the network. After the reset timeout a single
+    trial request is let through (half-open), its success closes the circuit, its failure opens it again.
+
+    Attributes:
+        failure_threshold: the amount of consecutive failures that open the circuit
+        reset_timeout: seconds the circuit stays open before a trial request is allowed
+        consecutive_failures: the amount of failures since the last success
+    """
+    def __init__(
+        self, failure_threshold: int = HPC_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = HPC_CIRCUIT_BREAKER_RESET_TIMEOUT
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures: int = 0
+        self._opened_at: float = 0
+        self._lock = Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.consecutive_failures >= self.failure_threshold
+
+    def remaining_open_time(self) -> float:
+        if not self.is_open:
+            return 0
+        return max(0.0, self._opened_at + self.reset_timeout - monotonic())
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if not self.is_open:
+                return True
+            if monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open, let a single trial request through and hold the others back until the next timeout
+            self._opened_at = monotonic()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.is_open:
+                self._opened_at = monotonic()
+
+
+def get_backoff_delay(
+    attempt: int, base: float = HPC_RETRY_BACKOFF_BASE, max_delay: float = HPC_RETRY_BACKOFF_MAX
+) -> float:
+    # Exponential backoff with full jitter, spreads the retries of concurrent workers
+    return uniform(0, min(max_delay, base * 2 ** attempt))
+
 
 def is_sftp_conn_responsive(logger, sftp_client: SFTPClient) -> bool:
     if not sftp_client:
@@ -1,18 +1,44 @@
+from os import environ
+
 __all__ = [
+    "HPC_APPTAINER_INSTANCES",
     "HPC_BATCH_SUBMIT_WORKFLOW_JOB",
+    "HPC_CIRCUIT_BREAKER_FAILURE_THRESHOLD",
+    "HPC_CIRCUIT_BREAKER_RESET_TIMEOUT",
+    "HPC_CONTENT_MANIFEST",
+    "HPC_CONTENT_STORE_DIR",
+    "HPC_CONTENT_STORE_ENABLED",
+    "HPC_INVENTORY_REFRESH_INTERVAL",
+    "HPC_INVENTORY_TTL",
     "HPC_JOB_DEADLINE_TIME_REGULAR",
     "HPC_JOB_DEADLINE_TIME_TEST",
     "HPC_NHR_JOB_DEFAULT_PARTITION",
     "HPC_NHR_JOB_TEST_PARTITION",
+    "HPC_NODE_CACHE_DIR",
+    "HPC_NODE_CACHE_MAX_SIZE",
     "HPC_JOB_QOS_DEFAULT",
     "HPC_JOB_QOS_LONG",
     "HPC_JOB_QOS_SHORT",
     "HPC_JOB_QOS_VERY_LONG",
+    "HPC_RESULTS_FILE_LIST",
+    "HPC_RESULTS_TRANSFER_MODE",
+    "HPC_RESULTS_TRANSFER_MODES",
     "HPC_SSH_CONNECTION_TRY_TIMES",
+    "HPC_SSH_KEEPALIVE_INTERVAL",
+    "HPC_SSH_POOL_SIZE",
+    "HPC_TRANSFER_CHUNK_SIZE",
+    "HPC_TRANSFER_PACK_BUFFER_SIZE",
+    "HPC_TRANSFER_PARALLEL_MIN_SIZE",
+    "HPC_TRANSFER_RETRY_TIMES",
+    "HPC_TRANSFER_STREAMS",
+    "HPC_UNZIP_THREADS",
     "HPC_NHR_PROJECT",
     "HPC_NHR_CLUSTERS",
+    "HPC_RETRY_BACKOFF_BASE",
+    "HPC_RETRY_BACKOFF_MAX",
     "HPC_WRAPPER_SUBMIT_WORKFLOW_JOB",
-    "HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATUS"
+    "HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATUS",
+    "HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATES"
 ]
 
 HPC_NHR_PROJECT: str = "project_pwieder_ocr_nhr"
@@ -44,6 +70,29 @@ HPC_NHR_CLUSTERS = {
 HPC_BATCH_SUBMIT_WORKFLOW_JOB: str = f"batch_submit_workflow_job.sh"
 HPC_WRAPPER_SUBMIT_WORKFLOW_JOB: str = f"wrapper_submit_workflow_job.sh"
 HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATUS: str = f"wrapper_check_workflow_job_status.sh"
+HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATES: str = f"wrapper_check_workflow_job_states.sh"
+
+# The content addressed store of workspace files inside the slurm workspaces dir, files are stored by their sha256
+HPC_CONTENT_STORE_DIR: str = "content_store"
+# The manifest inside the slurm workspace zip listing the `sha256 relative/path` of the files to take from the store
+HPC_CONTENT_MANIFEST: str = "content_manifest.txt"
+# Upload only the workspace files missing in the content store instead of the whole workspace
+HPC_CONTENT_STORE_ENABLED: bool = environ.get("OPERANDI_HPC_CONTENT_STORE_ENABLED", "true").lower() in ("true", "1")
+# `full` transfers the complete workspace back from the HPC, `delta` only the files created or changed by the workflow
+HPC_RESULTS_TRANSFER_MODES = ("full", "delta")
+HPC_RESULTS_TRANSFER_MODE: str = environ.get("OPERANDI_HPC_RESULTS_TRANSFER_MODE", "full").lower()
+if HPC_RESULTS_TRANSFER_MODE not in HPC_RESULTS_TRANSFER_MODES:
+    raise ValueError(
+        f"Invalid OPERANDI_HPC_RESULTS_TRANSFER_MODE: {HPC_RESULTS_TRANSFER_MODE}, "
+        f"expected one of: {', '.join(HPC_RESULTS_TRANSFER_MODES)}")
+# The list inside a delta result zip of all files in the resulting workspace, the unchanged ones are taken locally
+HPC_RESULTS_FILE_LIST: str = "results_file_list.txt"
+# A persistent dir on the compute nodes caching the processor images across jobs, disabled when empty
+HPC_NODE_CACHE_DIR: str = environ.get("OPERANDI_HPC_NODE_CACHE_DIR", "")
+# The size in bytes of the node cache, the least recently used images are evicted above it
+HPC_NODE_CACHE_MAX_SIZE: int = int(environ.get("OPERANDI_HPC_NODE_CACHE_MAX_SIZE", 100 * 1024 * 1024 * 1024))
+# Run the processors inside one long-running apptainer instance per image instead of a container per invocation
+HPC_APPTAINER_INSTANCES: bool = environ.get("OPERANDI_HPC_APPTAINER_INSTANCES", "false").lower() in ("true", "1")
 
 HPC_JOB_DEADLINE_TIME_REGULAR = "48:00:00"
 HPC_JOB_DEADLINE_TIME_TEST = "00:30:00"
@@ -56,3 +105,29 @@ HPC_JOB_QOS_DEFAULT = "48h"  # The default deadline for non-specified QOS is 48h
 HPC_JOB_QOS_LONG = "7d"
 HPC_JOB_QOS_VERY_LONG = "14d"
 HPC_SSH_CONNECTION_TRY_TIMES = 30
+# The amount of SSH connections kept alive by a single connection pool
+HPC_SSH_POOL_SIZE = int(environ.get("OPERANDI_HPC_SSH_POOL_SIZE", 2))
+# Seconds between keepalive packets on idle SSH transports, 0 disables them
+HPC_SSH_KEEPALIVE_INTERVAL = int(environ.get("OPERANDI_HPC_SSH_KEEPALIVE_INTERVAL", 30))
+# The amount of parallel sftp streams of a single transfer, 1 disables the parallel transfers
+HPC_TRANSFER_STREAMS = int(environ.get("OPERANDI_HPC_TRANSFER_STREAMS", 4))
+# The size of the byte ranges of a file distributed between the parallel streams
+HPC_TRANSFER_CHUNK_SIZE = int(environ.get("OPERANDI_HPC_TRANSFER_CHUNK_SIZE", 32 * 1024 * 1024))
+# Smaller files are transferred with a single stream, the parallel streams do not pay off for them
+HPC_TRANSFER_PARALLEL_MIN_SIZE = int(environ.get("OPERANDI_HPC_TRANSFER_PARALLEL_MIN_SIZE", 128 * 1024 * 1024))
+# The max amount of bytes of a packed slurm workspace kept in memory while waiting to be uploaded
+HPC_TRANSFER_PACK_BUFFER_SIZE = int(environ.get("OPERANDI_HPC_TRANSFER_PACK_BUFFER_SIZE", 64 * 1024 * 1024))
+# The amount of tries of a transfer, each try resumes from the last verified offset of the partial file
+HPC_TRANSFER_RETRY_TIMES = int(environ.get("OPERANDI_HPC_TRANSFER_RETRY_TIMES", 10))
+# Seconds of the exponential backoff between retries, the delay is randomized between 0 and the backoff
+HPC_RETRY_BACKOFF_BASE = 2
+HPC_RETRY_BACKOFF_MAX = 120
+# Consecutive failed connection attempts after which no further attempts are made for the reset timeout (seconds)
+HPC_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 3
+HPC_CIRCUIT_BREAKER_RESET_TIMEOUT = 60
+# The amount of threads decompressing and writing the entries of a result zip while it is downloaded
+HPC_UNZIP_THREADS = int(environ.get("OPERANDI_HPC_UNZIP_THREADS", 4))
+# Seconds after which the cached inventory of the HPC models and processor images is considered outdated
+HPC_INVENTORY_TTL = int(environ.get("OPERANDI_HPC_INVENTORY_TTL", 900))
+# Seconds between two listings of the HPC models and processor images, shorter than the TTL
+HPC_INVENTORY_REFRESH_INTERVAL = int(environ.get("OPERANDI_HPC_INVENTORY_REFRESH_INTERVAL", 300))
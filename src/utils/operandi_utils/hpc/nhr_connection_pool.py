@@ -0,0 +1,189 @@
+from contextlib import contextmanager
+from logging import Logger
+from os import getpid
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Set
+
+from paramiko import AutoAddPolicy, PKey, RSAKey, SFTPClient, SSHClient
+
+from .connection_utils import CircuitBreaker, CircuitOpenError, is_ssh_conn_responsive
+from .constants import HPC_NHR_CLUSTERS, HPC_SSH_KEEPALIVE_INTERVAL, HPC_SSH_POOL_SIZE
+
+
+class NHRConnectionPool:
+    """
+    Keeps a fixed amount of authenticated SSH connections to the HPC frontend server alive.
+    The connections are handed out in a round-robin manner and are held by the callers until released.
+    A connection is validated before being handed out and is replaced with a new one only when the
+    validation fails. The replaced connection is closed once no caller holds it anymore, the new one
+    is opened outside the pool lock, hence, only the callers of the same slot wait for the handshake.
+
+    Attributes:
+        pool_size: the amount of SSH connections kept alive
+        connections_opened: the amount of SSH handshakes performed so far
+        connections_reused: the amount of times an already alive connection was handed out
+        connections_failed: the amount of alive connections detected as broken
+        circuit_breaker: stops the connection attempts while the frontend server keeps failing
+    """
+    def __init__(
+        self, logger: Logger, project_username: str, key_path: Path, key_pass: Optional[str] = None,
+        host: str = HPC_NHR_CLUSTERS["EmmyPhase2"]["host"], port: int = 22, pool_size: int = HPC_SSH_POOL_SIZE,
+        keepalive_interval: int = HPC_SSH_KEEPALIVE_INTERVAL
+    ) -> None:
+        if pool_size < 1:
+            raise ValueError(f"The connection pool size must be at least 1, got: {pool_size}")
+        self.logger = logger
+        self.project_username = project_username
+        self.key_path = key_path
+        self.key_pass = key_pass
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.keepalive_interval = keepalive_interval
+
+        self.connections_opened: int = 0
+        self.connections_reused: int = 0
+        self.connections_failed: int = 0
+        self.circuit_breaker = CircuitBreaker()
+
+        self._pkey: Optional[PKey] = None
+        self._clients: List[Optional[SSHClient]] = [None] * self.pool_size
+        self._next_index: int = 0
+        self._lock = Lock()
+        # Serializes the validation and the reconnection of each slot
+        self._slot_locks: List[Lock] = [Lock() for _ in range(self.pool_size)]
+        # The amount of callers holding each connection
+        self._holders: Dict[SSHClient, int] = {}
+        # The replaced connections still held by callers, closed with their last release
+        self._retired: Set[SSHClient] = set()
+        # The pid of the process that owns the connections, forked child processes must not reuse the sockets
+        self._owner_pid: int = getpid()
+
+    def _load_private_key(self) -> PKey:
+        if not self._pkey:
+            self.logger.debug(f"Loading the hpc frontend server private key file from path: {self.key_path}")
+            self._pkey = RSAKey.from_private_key_file(str(self.key_path), self.key_pass)
+        return self._pkey
+
+    def _open_connection(self) -> SSHClient:
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError(
+                f"The hpc frontend server {self.host} is considered down, not connecting for the next "
+                f"{self.circuit_breaker.remaining_open_time():.0f} seconds")
+        ssh_client = SSHClient()
+        ssh_client.set_missing_host_key_policy(AutoAddPolicy())
+        self.logger.info(
+            f"Connecting to hpc frontend server {self.host}:{self.port} with username: {self.project_username}")
+        try:
+            ssh_client.connect(
+                hostname=self.host, port=self.port, username=self.project_username, pkey=self._load_private_key(),
+                passphrase=self.key_pass)
+        except Exception as error:
+            self.circuit_breaker.record_failure()
+            ssh_client.close()
+            raise error
+        self.circuit_breaker.record_success()
+        if self.keepalive_interval:
+            ssh_client.get_transport().set_keepalive(self.keepalive_interval)
+        self.logger.debug(f"Successfully connected to the hpc frontend server")
+        return ssh_client
+
+    def _reset_after_fork(self) -> None:
+        # The inherited sockets belong to the parent process, just forget them without closing
+        self.logger.debug(f"Connection pool inherited from process {self._owner_pid}, dropping the connections")
+        self._clients = [None] * self.pool_size
+        self._next_index = 0
+        self._lock = Lock()
+        self._slot_locks = [Lock() for _ in range(self.pool_size)]
+        self._holders = {}
+        self._retired = set()
+        self._owner_pid = getpid()
+
+    def acquire(self) -> SSHClient:
+        """
+        Returns a responsive SSH client from the pool, a new connection is opened only if needed.
+        The client is held by the caller until it is passed to `release`.
+        """
+        if self._owner_pid != getpid():
+            self._reset_after_fork()
+        with self._lock:
+            index = self._next_index
+            self._next_index = (self._next_index + 1) % self.pool_size
+        with self._slot_locks[index]:
+            ssh_client = self._clients[index]
+            if ssh_client:
+                if is_ssh_conn_responsive(self.logger, ssh_client):
+                    with self._lock:
+                        self.connections_reused += 1
+                        self._holders[ssh_client] = self._holders.get(ssh_client, 0) + 1
+                    return ssh_client
+                self.logger.warning(f"Pooled ssh connection {index} is not responsive, reconnecting")
+                with self._lock:
+                    self.connections_failed += 1
+                    self._clients[index] = None
+                    # Other callers may still use the sessions of the broken connection
+                    close_now = not self._holders.get(ssh_client, 0)
+                    if not close_now:
+                        self._retired.add(ssh_client)
+                if close_now:
+                    ssh_client.close()
+            ssh_client = self._open_connection()
+            with self._lock:
+                self.connections_opened += 1
+                self._clients[index] = ssh_client
+                self._holders[ssh_client] = 1
+            return ssh_client
+
+    def release(self, ssh_client: SSHClient) -> None:
+        with self._lock:
+            holders = self._holders.get(ssh_client, 0)
+            if not holders:
+                return
+            if holders > 1:
+                self._holders[ssh_client] = holders - 1
+                return
+            del self._holders[ssh_client]
+            if ssh_client not in self._retired:
+                return
+            self._retired.discard(ssh_client)
+        ssh_client.close()
+
+    @contextmanager
+    def lease(self) -> Iterator[SSHClient]:
+        ssh_client = self.acquire()
+        try:
+            yield ssh_client
+        finally:
+            self.release(ssh_client)
+
+    @contextmanager
+    def sftp_session(self) -> Iterator[SFTPClient]:
+        with self.lease() as ssh_client:
+            sftp = ssh_client.open_sftp()
+            try:
+                yield sftp
+            finally:
+                sftp.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            ssh_clients = [ssh_client for ssh_client in self._clients if ssh_client] + list(self._retired)
+            self._clients = [None] * self.pool_size
+            self._holders = {}
+            self._retired = set()
+        for ssh_client in ssh_clients:
+            ssh_client.close()
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            connections_held = sum(self._holders.values())
+        return {
+            "pool_size": self.pool_size,
+            "connections_alive": len([client for client in self._clients if client]),
+            "connections_held": connections_held,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "connections_failed": self.connections_failed,
+            "circuit_breaker_open": int(self.circuit_breaker.is_open)
+        }
@@ -2,13 +2,11 @@ from logging import Logger
 from os import environ
 from os.path import join
 from pathlib import Path
+from time import sleep
 from typing import Optional
 
-from paramiko import AutoAddPolicy, RSAKey, SSHClient
-
-from .constants import HPC_NHR_CLUSTERS
-
-SSH_RECONNECT_TRIES = 5
+from .constants import HPC_CONTENT_STORE_DIR, HPC_NHR_CLUSTERS
+from .nhr_connection_pool import NHRConnectionPool
 
 class NHRConnector:
     def __init__(
@@ -18,6 +16,7 @@ class NHRConnector:
         project_env: Optional[str] = environ.get("OPERANDI_HPC_PROJECT_NAME", None),
         key_path: Optional[str] = environ.get("OPERANDI_HPC_SSH_KEYPATH", None),
         key_pass: Optional[str] = environ.get("OPERANDI_HPC_SSH_KEYPASS", None),
+        connection_pool: Optional[NHRConnectionPool] = None
     ) -> None:
         if not project_username:
             raise ValueError("Environment variable is probably not set: OPERANDI_HPC_PROJECT_USERNAME")
@@ -30,23 +29,32 @@ class NHRConnector:
         self.key_path = Path(key_path)
         self.key_pass = key_pass
         self.check_keyfile_existence(key_path=self.key_path)
-        self.logger.debug(f"Retrieving hpc frontend server private key file from path: {self.key_path}")
-        self._ssh_client = None
-        self._ssh_reconnect_tries = SSH_RECONNECT_TRIES
-        self._ssh_reconnect_tries_remaining = self._ssh_reconnect_tries
+        if not connection_pool:
+            connection_pool = NHRConnectionPool(
+                logger=self.logger, project_username=self.project_username, key_path=self.key_path,
+                key_pass=self.key_pass, host=HPC_NHR_CLUSTERS["EmmyPhase2"]["host"])
+        self.connection_pool: NHRConnectionPool = connection_pool
         # TODO: Make the sub cluster options selectable
         self.project_root_dir: str = HPC_NHR_CLUSTERS["EmmyPhase2"]["vast-nhr"]
         self.project_root_dir_with_env: str = join(self.project_root_dir, project_env)
         self.batch_scripts_dir: str = join(self.project_root_dir, project_env, "batch_scripts")
         self.slurm_workspaces_dir: str = join(self.project_root_dir, project_env, "slurm_workspaces")
+        self.content_store_dir: str = join(self.slurm_workspaces_dir, HPC_CONTENT_STORE_DIR)
 
-    @property
-    def ssh_client(self):
-        if self._ssh_client:
-            self._ssh_client.close()
-            self._ssh_client = None
-        self._ssh_client = self.connect_to_hpc_nhr_frontend_server(host=HPC_NHR_CLUSTERS["EmmyPhase2"]["host"])
-        return self._ssh_client
+    # Execute blocking commands and wait for an output and return code
+    def execute_blocking(self, command, timeout=None, environment=None, stdin_input: Optional[str] = None):
+        # A responsive pooled connection is reused, the pool reconnects only on failure
+        with self.connection_pool.lease() as ssh_client:
+            stdin, stdout, stderr = ssh_client.exec_command(command=command, timeout=timeout, environment=environment)
+            if stdin_input is not None:
+                stdin.write(stdin_input)
+                stdin.channel.shutdown_write()
+            while not stdout.channel.exit_status_ready():
+                sleep(1)
+                continue
+            output, err = stdout.readlines(), stderr.readlines()
+            return_code = stdout.channel.recv_exit_status()
+        return output, err, return_code
 
     @staticmethod
     def check_keyfile_existence(key_path: Path):
@@ -54,13 +62,3 @@ class NHRConnector:
             raise FileNotFoundError(f"HPC private key path does not exists: {key_path}")
         if not key_path.is_file():
             raise FileNotFoundError(f"HPC private key path is not a file: {key_path}")
-
-    def connect_to_hpc_nhr_frontend_server(self, host: str, port: int = 22) -> SSHClient:
-        ssh_client = SSHClient()
-        ssh_client.set_missing_host_key_policy(AutoAddPolicy())
-        hpc_pkey = RSAKey.from_private_key_file(str(self.key_path), self.key_pass)
-        self.logger.info(f"Connecting to hpc frontend server {host}:{port} with username: {self.project_username}")
-        ssh_client.connect(
-            hostname=host, port=port, username=self.project_username, pkey=hpc_pkey, passphrase=self.key_pass)
-        self.logger.debug(f"Successfully connected to the hpc frontend server")
-        return ssh_client
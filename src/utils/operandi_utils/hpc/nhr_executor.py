@@ -3,27 +3,38 @@ from logging import getLogger
 from os.path import join
 from pathlib import Path
 from time import sleep
-from typing import List
+from typing import Dict, List, Optional
 
-from operandi_utils.constants import StateJobSlurm, OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE
+from operandi_utils.constants import (
+    StateJobSlurm, OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE, TRANSFER_ARCHIVE_POLICY, TRANSFER_ARCHIVE_STORED_SUFFIXES)
 from .constants import (
-    HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_DEFAULT, HPC_NHR_JOB_DEFAULT_PARTITION, HPC_BATCH_SUBMIT_WORKFLOW_JOB,
-    HPC_WRAPPER_SUBMIT_WORKFLOW_JOB, HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATUS
+    HPC_APPTAINER_INSTANCES, HPC_CONTENT_MANIFEST, HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_DEFAULT,
+    HPC_NHR_JOB_DEFAULT_PARTITION, HPC_BATCH_SUBMIT_WORKFLOW_JOB, HPC_WRAPPER_SUBMIT_WORKFLOW_JOB,
+    HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATUS,
+    HPC_INVENTORY_TTL, HPC_NODE_CACHE_DIR, HPC_NODE_CACHE_MAX_SIZE, HPC_RESULTS_FILE_LIST, HPC_RESULTS_TRANSFER_MODE,
+    HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATES
 )
+from .nhr_connection_pool import NHRConnectionPool
 from .nhr_connector import NHRConnector
 from .nhr_executor_cmd_wrappers import cmd_nextflow_run
-from .nhr_executor_utils import parse_slurm_job_state_from_output
+from .nhr_executor_utils import (
+    find_nf_script_ocrd_models, parse_hpc_inventory_from_output, parse_slurm_job_state_from_output,
+    parse_slurm_job_states_from_output)
+from .nhr_inventory import HPCInventory
 
 CHECK_SLURM_JOB_TRY_TIMES = 10
+# The max amount of slurm job ids passed to a single sacct call, keeps the command line length bounded
+CHECK_SLURM_JOBS_BATCH_SIZE = 500
 CHECK_SLURM_JOB_WAIT_TIME = 30
 POLL_SLURM_JOB_TIMEOUT = 300
 POLL_SLURM_JOB_CHECK_INTERVAL = 10
 
 class NHRExecutor(NHRConnector):
-    def __init__(self) -> None:
+    def __init__(self, connection_pool: Optional[NHRConnectionPool] = None) -> None:
         logger = getLogger(name=self.__class__.__name__)
-        super().__init__(logger)
-        _ = self.ssh_client  # forces a connection
+        super().__init__(logger, connection_pool=connection_pool)
+        self.inventory = HPCInventory()
+        self.connection_pool.release(self.connection_pool.acquire())  # forces a connection
 
     def make_remote_batch_scripts_executable(self):
         hpc_slurm_job_dir = f"{self.batch_scripts_dir}"
@@ -34,16 +45,6 @@ class NHRExecutor(NHRConnector):
         self.logger.info(f"Command err: {err}")
         self.logger.info(f"Command return code: {return_code}")
 
-    # Execute blocking commands and wait for an output and return code
-    def execute_blocking(self, command, timeout=None, environment=None):
-        stdin, stdout, stderr = self.ssh_client.exec_command(command=command, timeout=timeout, environment=environment)
-        while not stdout.channel.exit_status_ready():
-            sleep(1)
-            continue
-        output, err = stdout.readlines(), stderr.readlines()
-        return_code = stdout.channel.recv_exit_status()
-        return output, err, return_code
-
     def remove_workflow_job_dir(self, workflow_job_id: str):
         hpc_slurm_job_dir = f"{self.slurm_workspaces_dir}/{workflow_job_id}"
         command = f"bash -lc 'rm -rf {hpc_slurm_job_dir}'"
@@ -53,15 +54,37 @@ class NHRExecutor(NHRConnector):
         self.logger.info(f"Command err: {err}")
         self.logger.info(f"Command return code: {return_code}")
 
-    def check_if_model_exists(self, ocrd_processor: str, model: str) -> bool:
-        model_path = f"{self.project_root_dir}/ocrd_models/ocrd-resources/{ocrd_processor}/{model}"
-        command = f"bash -lc 'ls -la {model_path}'"
+    def list_hpc_inventory(self) -> HPCInventory:
+        """
+        Lists the ocrd models and the processor images with a single remote command. A failed or empty
+        listing raises an exception and keeps the previously cached inventory untouched.
+        """
+        ocrd_resources_dir = f"{self.project_root_dir}/ocrd_models/ocrd-resources"
+        processor_sifs_dir = f"{self.project_root_dir}/ocrd_processor_sifs"
+        command = (
+            f"bash -lc 'find {ocrd_resources_dir} -mindepth 2 -maxdepth 2 -printf \"model %P\\n\" && "
+            f"find {processor_sifs_dir} -mindepth 1 -maxdepth 1 -name \"*.sif\" -printf \"sif %P\\n\"'")
         self.logger.info(f"About to execute a force command: {command}")
         output, err, return_code = self.execute_blocking(command)
-        self.logger.info(f"Command output: {output}")
         self.logger.info(f"Command err: {err}")
         self.logger.info(f"Command return code: {return_code}")
-        return not bool(return_code)
+        if return_code:
+            raise Exception(f"Failed to list the HPC inventory, return code: {return_code}, error: {err}")
+        ocrd_models, sif_images = parse_hpc_inventory_from_output(output)
+        if not sif_images:
+            raise Exception(f"Failed to list the HPC inventory, no processor images found in: {processor_sifs_dir}")
+        self.inventory.update(ocrd_models=ocrd_models, sif_images=sif_images)
+        self.logger.info(f"Listed HPC inventory, models: {len(ocrd_models)}, processor images: {len(sif_images)}")
+        return self.inventory
+
+    def check_if_model_exists(self, ocrd_processor: str, model: str) -> bool:
+        # Answered from the cached inventory, the HPC is listed again only when the cache is outdated
+        if not self.inventory.is_fresh(ttl=HPC_INVENTORY_TTL):
+            try:
+                self.list_hpc_inventory()
+            except Exception as error:
+                self.logger.warning(f"Using the previously cached HPC inventory, listing has failed: {error}")
+        return self.inventory.has_model(ocrd_processor=ocrd_processor, model=model)
 
     def trigger_slurm_job(
         self, workflow_job_id: str, nextflow_script_path: Path, input_file_grp: str,
@@ -93,13 +116,19 @@ class NHRExecutor(NHRConnector):
         nf_run_command = cmd_nextflow_run(
             sif_core=sif_ocrd_core, input_file_grp=input_file_grp,
             mets_basename=mets_basename, use_mets_server=use_mets_server, nf_executable_steps=nf_executable_steps,
-            ws_pages_amount=ws_pages_amount, cpus=cpus, ram=ram, forks=nf_process_forks
+            ws_pages_amount=ws_pages_amount, cpus=cpus, ram=ram, forks=nf_process_forks,
+            use_apptainer_instances=HPC_APPTAINER_INSTANCES
         )
 
+        # Only the models used by the workflow are staged on the compute node, all of them if undeterminable
+        ocrd_models = find_nf_script_ocrd_models(nextflow_script_path)
+        self.logger.info(f"Ocrd models required by the workflow: {ocrd_models}")
+
         ocrd_processor_images = ",".join([OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE[exe] for exe in nf_executable_steps])
         ocrd_processor_images = f"{sif_ocrd_core},{ocrd_processor_images}"
         regular_args = {
             "ocrd_processor_images": ocrd_processor_images,
+            "ocrd_models": "*" if ocrd_models is None else ",".join(ocrd_models),
             "project_base_dir": self.project_root_dir,
             "scratch_base_dir": self.slurm_workspaces_dir,
             "use_mets_server": "true" if use_mets_server else "false",
@@ -108,7 +137,17 @@ class NHRExecutor(NHRConnector):
             "nf_script_id": nextflow_script_path.name,
             "file_groups_to_remove": file_groups_to_remove,
             "sif_ocrd_core": sif_ocrd_core,
-            "nf_run_command": nf_run_command
+            "nf_run_command": nf_run_command,
+            "archive_policy": TRANSFER_ARCHIVE_POLICY.value,
+            # The suffixes format expected by the `-n` option of zip
+            "archive_stored_suffixes": ":".join(TRANSFER_ARCHIVE_STORED_SUFFIXES),
+            "content_store_dir": self.content_store_dir,
+            "content_manifest": HPC_CONTENT_MANIFEST,
+            "results_transfer_mode": HPC_RESULTS_TRANSFER_MODE,
+            "results_file_list": HPC_RESULTS_FILE_LIST,
+            "node_cache_dir": HPC_NODE_CACHE_DIR,
+            "node_cache_max_size": HPC_NODE_CACHE_MAX_SIZE,
+            "use_apptainer_instances": "true" if HPC_APPTAINER_INSTANCES else "false"
         }
         force_command += f" '{dumps(sbatch_args)}' '{dumps(regular_args)}'"
 
@@ -148,6 +187,32 @@ class NHRExecutor(NHRConnector):
         self.logger.info(f"Current slurm job state of {slurm_job_id}: {slurm_job_state}")
         return slurm_job_state
 
+    def check_slurm_job_states(
+        self, slurm_job_ids: List[str], batch_size: int = CHECK_SLURM_JOBS_BATCH_SIZE
+    ) -> Dict[str, StateJobSlurm]:
+        """
+        Checks the states of many slurm jobs with a single sacct call per `batch_size` job ids.
+        Job ids not known to sacct (yet) are reported as `StateJobSlurm.UNSET`.
+        """
+        slurm_job_states: Dict[str, StateJobSlurm] = {}
+        for index in range(0, len(slurm_job_ids), batch_size):
+            batch_ids = slurm_job_ids[index:index + batch_size]
+            force_command = f"{join(self.batch_scripts_dir, HPC_WRAPPER_CHECK_WORKFLOW_JOB_STATES)}"
+            force_command += f" {','.join(batch_ids)}"
+            output, err, return_code = self.execute_blocking(force_command)
+            if return_code > 0:
+                self.logger.info(f"Executed force command: {force_command}")
+                self.logger.info(f"Force command return code: {return_code}")
+                self.logger.info(f"Force command err: {err}")
+                self.logger.info(f"Force command output: {output}")
+            parsed_states, msg = parse_slurm_job_states_from_output(output)
+            if StateJobSlurm.UNSET in parsed_states.values():
+                self.logger.warning(msg)
+            for slurm_job_id in batch_ids:
+                slurm_job_states[slurm_job_id] = parsed_states.get(slurm_job_id, StateJobSlurm.UNSET)
+        self.logger.info(f"Checked the states of {len(slurm_job_ids)} slurm jobs")
+        return slurm_job_states
+
     def poll_till_end_slurm_job_state(
         self, slurm_job_id: str, interval: int = POLL_SLURM_JOB_CHECK_INTERVAL, timeout: int = POLL_SLURM_JOB_TIMEOUT
     ) -> bool:
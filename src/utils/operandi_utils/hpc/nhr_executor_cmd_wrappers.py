@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import List
 from operandi_utils.constants import OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE
 
@@ -8,11 +9,24 @@ PH_NODE_DIR_PROCESSOR_SIFS = "PH_NODE_DIR_PROCESSOR_SIFS"
 PH_NF_SCRIPT_PATH = "PH_NF_SCRIPT_PATH"
 PH_HPC_WS_DIR = "PH_HPC_WS_DIR"
 PH_CMD_WRAPPER = "PH_CMD_WRAPPER"
+PH_APPTAINER_INSTANCE_PREFIX = "PH_APPTAINER_INSTANCE_PREFIX"
+
+
+def get_apptainer_instance_name(sif_image: str) -> str:
+    # The batch script starts the instances with the same names, the prefix is unique for each workflow job
+    return f"{PH_APPTAINER_INSTANCE_PREFIX}_{Path(sif_image).stem}"
+
+
+def get_apptainer_target(sif_image: str, use_apptainer_instance: bool) -> str:
+    if use_apptainer_instance:
+        return f"instance://{get_apptainer_instance_name(sif_image)}"
+    return f"{PH_NODE_DIR_PROCESSOR_SIFS}/{sif_image}"
 
 
 def cmd_nextflow_run(
     sif_core: str, input_file_grp: str, mets_basename: str, use_mets_server: bool,
-    nf_executable_steps: List[str], ws_pages_amount: int, cpus: int, ram: int, forks: int
+    nf_executable_steps: List[str], ws_pages_amount: int, cpus: int, ram: int, forks: int,
+    use_apptainer_instances: bool = False
 ) -> str:
     nf_run_command = f"nextflow run {PH_NF_SCRIPT_PATH} -ansi-log false -with-report -with-trace"
     nf_run_command += f" --input_file_group {input_file_grp}"
@@ -22,17 +36,23 @@ def cmd_nextflow_run(
     nf_run_command += f" --workspace_dir /ws_data"
     nf_run_command += f" --pages {ws_pages_amount}"
 
-    bind_ocrd_models = f"{PH_NODE_DIR_OCRD_MODELS}/ocrd-resources:/usr/local/share/ocrd-resources"
-    apptainer_cmd = f"apptainer exec --bind {PH_HPC_WS_DIR}:/ws_data --bind {bind_ocrd_models}"
+    if use_apptainer_instances:
+        # The batch script starts the instances with the binds of the workspace and the models
+        apptainer_cmd = "apptainer exec"
+    else:
+        bind_ocrd_models = f"{PH_NODE_DIR_OCRD_MODELS}/ocrd-resources:/usr/local/share/ocrd-resources"
+        apptainer_cmd = f"apptainer exec --bind {PH_HPC_WS_DIR}:/ws_data --bind {bind_ocrd_models}"
     # Mets caching is disabled for the core, to avoid the cache error
     # when merging mets files https://github.com/OCR-D/core/issues/1297
-    core_command = f"{apptainer_cmd} --env OCRD_METS_CACHING=false {PH_NODE_DIR_PROCESSOR_SIFS}/{sif_core}"
+    core_target = get_apptainer_target(sif_core, use_apptainer_instances)
+    core_command = f"{apptainer_cmd} --env OCRD_METS_CACHING=false {core_target}"
     nf_run_command += f" --env_wrapper_cmd_core {PH_CMD_WRAPPER}{core_command}{PH_CMD_WRAPPER}"
 
     index = 0
     sif_images = [OCRD_PROCESSOR_EXECUTABLE_TO_IMAGE[exe] for exe in nf_executable_steps]
     for sif_image in sif_images:
-        step_command = f"{apptainer_cmd} --env OCRD_METS_CACHING=true {PH_NODE_DIR_PROCESSOR_SIFS}/{sif_image}"
+        step_target = get_apptainer_target(sif_image, use_apptainer_instances)
+        step_command = f"{apptainer_cmd} --env OCRD_METS_CACHING=true {step_target}"
         nf_run_command += f" --env_wrapper_cmd_step{index} {PH_CMD_WRAPPER}{step_command}{PH_CMD_WRAPPER}"
         index += 1
     nf_run_command += f" --cpus {cpus}"
@@ -1,5 +1,13 @@
-from typing import List, Tuple
+from json import loads
+from pathlib import Path
+from re import compile as re_compile
+from typing import Dict, List, Optional, Tuple
 from operandi_utils.constants import StateJobSlurm
+from operandi_utils.oton.constants import OCRD_ALL_JSON
+from operandi_utils.oton.process_call_arguments import ProcessorCallArguments
+
+# Matches the processor calls inside the nextflow script, e.g.: `ocrd-tesserocr-recognize ... -p '{"model": "Fraktur"}'`
+NF_PROCESSOR_CALL_PATTERN = re_compile(r"\b(ocrd-[\w-]+)\s+-.*?(?:-p\s+'(\{.*\})')?\s*$")
 
 
 def parse_slurm_job_state_from_output(output: List[str]) -> Tuple[StateJobSlurm, str]:
@@ -18,3 +26,95 @@ def parse_slurm_job_state_from_output(output: List[str]) -> Tuple[StateJobSlurm,
     except ValueError:
         return StateJobSlurm.UNSET, f"Unknown parsed state: {parsed_state} from output: {output}"
     return state_job_slurm, "Parsed state recognized"
+
+
+def parse_slurm_job_states_from_output(output: List[str]) -> Tuple[Dict[str, StateJobSlurm], str]:
+    """
+    Parses the states of many slurm jobs from the output of a single sacct call in parsable format.
+
+    Example output for reference:
+    sacct -j 6313216,6313217 --parsable2 --noheader --format=jobid,state,exitcode
+        6313216|OUT_OF_MEMORY|0:125
+        6313216.batch|OUT_OF_MEMORY|0:125
+        6313216.extern|COMPLETED|0:0
+        6313217|PENDING|0:0
+
+    The state of the `.batch` step is preferred over the state of the job allocation since it reflects
+    the state of the batch script itself. Other steps (e.g., `.extern`) are ignored. Jobs with unknown
+    states are reported as `StateJobSlurm.UNSET`.
+    """
+    if not output:
+        return {}, "No output available, something is odd."
+    job_states: Dict[str, str] = {}
+    batch_states: Dict[str, str] = {}
+    for line in output:
+        columns = line.strip().split("|")
+        if len(columns) < 2 or not columns[0] or columns[0] == "JobID":
+            continue
+        job_id, _, step = columns[0].partition(".")
+        # States such as `CANCELLED by 12345` contain extra information after the state
+        parsed_state = columns[1].split(" ")[0] if columns[1] else ""
+        if not step:
+            job_states[job_id] = parsed_state
+        elif step == "batch":
+            batch_states[job_id] = parsed_state
+    job_states.update(batch_states)
+
+    slurm_job_states: Dict[str, StateJobSlurm] = {}
+    unknown_states: List[str] = []
+    for job_id, parsed_state in job_states.items():
+        try:
+            slurm_job_states[job_id] = StateJobSlurm(parsed_state)
+        except ValueError:
+            slurm_job_states[job_id] = StateJobSlurm.UNSET
+            unknown_states.append(f"{job_id}: {parsed_state}")
+    if unknown_states:
+        return slurm_job_states, f"Unknown parsed states: {unknown_states} from output: {output}"
+    return slurm_job_states, "Parsed states recognized"
+
+
+def parse_hpc_inventory_from_output(output: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Parses the OCR-D models and the processor images from the output of the single inventory listing.
+
+    Example output for reference:
+        model ocrd-tesserocr-recognize/Fraktur.traineddata
+        model ocrd-calamari-recognize/qurator-gt4histocr-1.0
+        sif ocrd_core.sif
+    """
+    ocrd_models: List[str] = []
+    sif_images: List[str] = []
+    for line in output or []:
+        entry_type, _, entry_path = line.strip().partition(" ")
+        if not entry_path:
+            continue
+        if entry_type == "model":
+            ocrd_models.append(entry_path)
+        elif entry_type == "sif":
+            sif_images.append(entry_path)
+    return ocrd_models, sif_images
+
+
+def find_nf_script_ocrd_models(nf_script_path: Path) -> Optional[List[str]]:
+    """
+    Returns the models required by the processor calls of the nextflow script as `executable/resource` paths inside
+    the ocrd resources dir. Returns None if the models cannot be determined, e.g., for processors unknown to the
+    ocrd tool json, then all models have to be provided.
+    """
+    required_models: List[str] = []
+    with open(nf_script_path, mode="r") as nf_file:
+        for line in nf_file:
+            match = NF_PROCESSOR_CALL_PATTERN.search(line)
+            if not match:
+                continue
+            executable, parameters = match.group(1), match.group(2)
+            if executable not in OCRD_ALL_JSON:
+                return None
+            try:
+                processor_call = ProcessorCallArguments(
+                    executable=executable[len("ocrd-"):], parameters=loads(parameters) if parameters else None)
+                processor_models = processor_call.get_required_models()
+            except ValueError:
+                return None
+            required_models.extend(model for model in processor_models if model not in required_models)
+    return required_models
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+
+from .constants import HPC_INVENTORY_TTL
+
+
+class HPCInventory:
+    """
+    In-memory cache of the OCR-D models and processor images (SIF) available in the HPC project dir.
+    It is filled from a single remote listing or from the DB entry of the last listing, existence
+    checks are answered from the cache without connecting to the HPC.
+
+    Attributes:
+        ocrd_models:  the available models as `ocrd_processor/model` paths inside the ocrd resources dir
+        sif_images:   the file names of the available processor images
+        refreshed_at: the date time of the remote listing the cache is based on, None if never listed
+    """
+    def __init__(self) -> None:
+        self.ocrd_models: Set[str] = set()
+        self.sif_images: Set[str] = set()
+        self.refreshed_at: Optional[datetime] = None
+
+    def update(
+        self, ocrd_models: Iterable[str], sif_images: Iterable[str], refreshed_at: Optional[datetime] = None
+    ) -> None:
+        self.ocrd_models = set(ocrd_models)
+        self.sif_images = set(sif_images)
+        self.refreshed_at = refreshed_at or datetime.now()
+
+    def is_fresh(self, ttl: int = HPC_INVENTORY_TTL) -> bool:
+        if not self.refreshed_at:
+            return False
+        return datetime.now() - self.refreshed_at < timedelta(seconds=ttl)
+
+    def has_model(self, ocrd_processor: str, model: str) -> bool:
+        return f"{ocrd_processor}/{model}" in self.ocrd_models
+
+    def get_missing_sif_images(self, sif_images: Iterable[str]) -> List[str]:
+        return sorted(set(sif_images) - self.sif_images)
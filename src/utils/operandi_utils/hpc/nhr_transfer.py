@@ -1,153 +1,662 @@
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
 from logging import getLogger
-from os import listdir, makedirs, symlink
+from os import link, listdir, makedirs, symlink, walk
 from os.path import isdir, split
 from pathlib import Path
-from shutil import rmtree, copytree
-from stat import S_ISDIR
-from tempfile import mkdtemp
-from time import sleep
-from typing import Tuple
-
-from operandi_utils import make_zip_archive, unpack_zip_archive, get_batch_scripts_dir
+from queue import Empty, Full, Queue
+from shutil import copy2, rmtree
+from stat import S_IMODE, S_ISDIR
+from threading import Event
+from time import sleep, time
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from uuid import uuid4
+from zipfile import ZipFile, ZipInfo
+
+from paramiko import SFTPClient, SSHClient, SSHException
+
+from operandi_utils import (
+    calculate_file_sha256, extract_zip_stream, get_batch_scripts_dir, get_staging_dir, get_zip_compress_type,
+    swap_in_staging_dir, unpack_zip_archive)
+from operandi_utils.constants import TRANSFER_ARCHIVE_POLICY, TransferArchivePolicy
+from .connection_utils import get_backoff_delay, is_sftp_conn_responsive
+from .constants import (
+    HPC_CONTENT_MANIFEST, HPC_CONTENT_STORE_ENABLED, HPC_RESULTS_FILE_LIST, HPC_TRANSFER_CHUNK_SIZE,
+    HPC_TRANSFER_PACK_BUFFER_SIZE, HPC_TRANSFER_PARALLEL_MIN_SIZE, HPC_TRANSFER_RETRY_TIMES, HPC_TRANSFER_STREAMS,
+    HPC_UNZIP_THREADS)
+from .nhr_connection_pool import NHRConnectionPool
 from .nhr_connector import NHRConnector
 
 SFTP_RECONNECT_TRIES = 5
-TRY_TIMES = 100
-SLEEP_TIME = 3
+# The size of the write buffer used when streaming archives into remote files
+STREAM_BUFFER_SIZE = 1024 * 1024
+# Seconds between two checks whether the other end of a slurm workspace pipe has aborted
+PIPE_ABORT_CHECK_INTERVAL = 1
+
+# OSErrors are recoverable only when the transport is inactive, otherwise they are remote file errors (e.g., missing files)
+SFTP_RECOVERABLE_ERRORS = (EOFError, SSHException)
+
+T = TypeVar("T")
+
+
+class _StreamWriter:
+    """
+    Write-only, non-seekable view of a file object. Makes the zip writer emit the entries strictly
+    sequentially (with data descriptors) instead of seeking back to patch the local headers.
+    """
+    def __init__(self, fileobj: BinaryIO) -> None:
+        self._fileobj = fileobj
+        self.bytes_written: int = 0
+
+    def write(self, data: bytes) -> int:
+        self._fileobj.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._fileobj.flush()
+
+
+class SlurmWorkspacePipe:
+    """
+    Bounded in-memory pipe between packing a slurm workspace zip and uploading it. The packing thread
+    writes the zip into the pipe and the uploading thread writes the chunks into the remote file, so a
+    workspace is packed while the previous one is still being uploaded without a local copy of the zip.
+    Either end aborts the pipe on failure, which makes the other end fail instead of blocking.
+    """
+    def __init__(
+        self, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path,
+        buffer_size: int = HPC_TRANSFER_PACK_BUFFER_SIZE, chunk_size: int = STREAM_BUFFER_SIZE
+    ) -> None:
+        self.ocrd_workspace_dir = ocrd_workspace_dir
+        self.workflow_job_id = workflow_job_id
+        self.nextflow_script_path = nextflow_script_path
+        self.chunk_size = chunk_size
+        self.content_manifest: Dict[str, str] = {}
+        self.content_files: Dict[str, Path] = {}
+        self._chunks: Queue = Queue(maxsize=max(1, buffer_size // chunk_size))
+        self._buffer = bytearray()
+        self._manifest_ready = Event()
+        self._aborted = Event()
+        self._abort_error: Optional[Exception] = None
+
+    def set_content_manifest(self, content_manifest: Dict[str, str], content_files: Dict[str, Path]) -> None:
+        self.content_manifest = content_manifest
+        self.content_files = content_files
+        self._manifest_ready.set()
+
+    def wait_content_manifest(self) -> None:
+        while not self._manifest_ready.wait(timeout=PIPE_ABORT_CHECK_INTERVAL):
+            self._raise_if_aborted()
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        if len(self._buffer) >= self.chunk_size:
+            self._put_chunk(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._buffer:
+            self._put_chunk(bytes(self._buffer))
+            self._buffer.clear()
+        # Marks the end of the zip
+        self._put_chunk(b"")
+
+    def abort(self, error: Exception) -> None:
+        self._abort_error = error
+        self._aborted.set()
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            self._raise_if_aborted()
+            try:
+                chunk = self._chunks.get(timeout=PIPE_ABORT_CHECK_INTERVAL)
+            except Empty:
+                continue
+            if not chunk:
+                return
+            yield chunk
+
+    def _put_chunk(self, chunk: bytes) -> None:
+        while True:
+            self._raise_if_aborted()
+            try:
+                self._chunks.put(chunk, timeout=PIPE_ABORT_CHECK_INTERVAL)
+                return
+            except Full:
+                continue
+
+    def _raise_if_aborted(self) -> None:
+        if self._aborted.is_set():
+            raise RuntimeError(f"The slurm workspace pipe of job {self.workflow_job_id} was aborted: {self._abort_error}")
+
 
 class NHRTransfer(NHRConnector):
-    def __init__(self) -> None:
+    def __init__(self, connection_pool: Optional[NHRConnectionPool] = None) -> None:
         logger = getLogger(name=self.__class__.__name__)
-        super().__init__(logger)
-        self._sftp_client = None
+        super().__init__(logger, connection_pool=connection_pool)
+        self._sftp_client: Optional[SFTPClient] = None
+        # The pooled connection carrying the sftp session, held until the session is closed
+        self._sftp_ssh_client: Optional[SSHClient] = None
         self._sftp_reconnect_tries = SFTP_RECONNECT_TRIES
-        self._sftp_reconnect_tries_remaining = self._sftp_reconnect_tries
         _ = self.sftp_client  # forces a connection
 
     @property
-    def sftp_client(self):
-        if self._sftp_client:
-            self._sftp_client.close()
-            self._ssh_client = None
-        self._sftp_client = self.ssh_client.open_sftp()
+    def sftp_client(self) -> SFTPClient:
+        # The SFTP session is long-lived, it is reopened only when it is no longer responsive
+        if self._sftp_client and is_sftp_conn_responsive(self.logger, self._sftp_client):
+            return self._sftp_client
+        self.close_sftp_client()
+        ssh_client = self.connection_pool.acquire()
+        try:
+            self._sftp_client = ssh_client.open_sftp()
+        except Exception as error:
+            self.connection_pool.release(ssh_client)
+            raise error
+        self._sftp_ssh_client = ssh_client
+        self.logger.debug("Opened a new sftp session")
         return self._sftp_client
 
-    def upload_batch_scripts(self):
-        batch_scripts_dir = get_batch_scripts_dir()
-        for current_file in batch_scripts_dir.iterdir():
-            if current_file.is_file() and current_file.suffix == ".sh":
-                remote_dst = f"{self.batch_scripts_dir}/{current_file.name}"
-                self.logger.info(f"Uploading batch script: {current_file} to {remote_dst}")
-                self._upload_file_with_retries(local_src=current_file, remote_dst=remote_dst)
-            else:
-                self.logger.info(f"Skipping batch scripts path: {current_file}")
+    def close_sftp_client(self) -> None:
+        if self._sftp_client:
+            try:
+                self._sftp_client.close()
+            except SFTP_RECOVERABLE_ERRORS + (OSError,) as error:
+                self.logger.debug(f"Ignoring error while closing the broken sftp session: {error}")
+            self._sftp_client = None
+        if self._sftp_ssh_client:
+            self.connection_pool.release(self._sftp_ssh_client)
+            self._sftp_ssh_client = None
+
+    def _is_sftp_error_recoverable(self, error: Exception) -> bool:
+        if isinstance(error, SFTP_RECOVERABLE_ERRORS):
+            return True
+        if not isinstance(error, OSError):
+            return False
+        channel = self._sftp_client.get_channel() if self._sftp_client else None
+        transport = channel.get_transport() if channel else None
+        return not transport or not transport.is_active()
 
-    def create_slurm_workspace_zip(
-        self, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path,
-        tempdir_prefix: str = "slurm_workspace-"
-    ) -> Path:
-        self.logger.info(f"Entering pack_slurm_workspace")
-        self.logger.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
-        self.logger.info(f"workflow_job_id: {workflow_job_id}")
-        self.logger.info(f"nextflow_script_path: {nextflow_script_path}")
-        self.logger.info(f"tempdir_prefix: {tempdir_prefix}")
+    def _with_sftp_recovery(self, operation: Callable[[SFTPClient], T]) -> T:
+        """
+        Executes the operation with the shared sftp session. If the session breaks during the
+        operation (EOF, ssh errors or socket errors of an inactive transport) it is reopened and the
+        operation is executed again.
+        """
+        tries = self._sftp_reconnect_tries
+        while True:
+            try:
+                return operation(self.sftp_client)
+            except SFTP_RECOVERABLE_ERRORS + (OSError,) as error:
+                if not self._is_sftp_error_recoverable(error):
+                    raise error
+                tries -= 1
+                if tries <= 0:
+                    raise error
+                self.logger.warning(f"The sftp session failed: {error}, reopening the session")
+                self.close_sftp_client()
 
-        # Parse the nextflow file name from the script path
-        nextflow_filename = nextflow_script_path.name
-        self.logger.info(f"Nextflow file name to be used: {nextflow_filename}")
-        # Parse the ocrd workspace id from the dir path
+    def _list_remote_batch_scripts(self) -> Dict[str, Tuple[str, int]]:
+        """
+        Returns the sha256 and the mode of the remote batch scripts by name, listed with a single remote command.
+        """
+        command = (
+            f"bash -c 'mkdir -p {self.batch_scripts_dir} && cd {self.batch_scripts_dir} && for script in *.sh; do "
+            f"[ -f \"$script\" ] && echo \"$(stat -c %a \"$script\") $(sha256sum \"$script\")\"; done; true'")
+        output, err, return_code = self.execute_blocking(command)
+        if return_code:
+            raise Exception(f"Failed to list the remote batch scripts: {self.batch_scripts_dir}, error: {err}")
+        remote_scripts: Dict[str, Tuple[str, int]] = {}
+        for line in output:
+            # Example line: `775 <sha256>  batch_submit_workflow_job.sh`
+            line_parts = line.split(maxsplit=2)
+            if len(line_parts) == 3:
+                remote_scripts[line_parts[2].strip()] = (line_parts[1], int(line_parts[0], 8))
+        return remote_scripts
+
+    def sync_batch_scripts(self) -> List[str]:
+        """
+        Uploads only the batch scripts whose sha256 differs from the remote ones, and sets the mode of each
+        script to the mode of its local counterpart. Returns the names of the uploaded scripts.
+        """
+        remote_scripts = self._list_remote_batch_scripts()
+        uploaded_scripts = []
+        for local_script in sorted(get_batch_scripts_dir().iterdir()):
+            if not local_script.is_file() or local_script.suffix != ".sh":
+                continue
+            local_hash = calculate_file_sha256(local_script)
+            local_mode = S_IMODE(local_script.stat().st_mode)
+            remote_dst = f"{self.batch_scripts_dir}/{local_script.name}"
+            remote_hash, remote_mode = remote_scripts.get(local_script.name, (None, None))
+            if remote_hash == local_hash:
+                if remote_mode != local_mode:
+                    self.logger.info(f"Setting the mode {oct(local_mode)} of batch script: {remote_dst}")
+                    self._with_sftp_recovery(lambda sftp: sftp.chmod(remote_dst, local_mode))
+                continue
+            self.logger.info(f"Uploading changed batch script: {local_script} to {remote_dst}")
+            self._with_sftp_recovery(
+                lambda sftp: self._put_batch_script(sftp, local_script, remote_dst, local_mode))
+            uploaded_scripts.append(local_script.name)
+        self.logger.info(f"Synced the batch scripts, uploaded: {uploaded_scripts}")
+        return uploaded_scripts
+
+    @staticmethod
+    def _put_batch_script(sftp: SFTPClient, local_src: Path, remote_dst: str, mode: int) -> None:
+        # Replaced with a rename, a batch script being executed by a running job keeps reading the previous file
+        remote_partial = f"{remote_dst}.part-{uuid4().hex}"
+        sftp.put(localpath=str(local_src), remotepath=remote_partial)
+        sftp.chmod(remote_partial, mode)
+        sftp.posix_rename(remote_partial, remote_dst)
+
+    @staticmethod
+    def _iter_slurm_workspace_entries(
+        ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path
+    ) -> Iterator[Tuple[Optional[Path], str]]:
+        """
+        Yields the local paths and the archive names of the slurm workspace entries. The layout matches the
+        slurm workspace dir expected by the batch script: `{workflow_job_id}/{nextflow script}` and
+        `{workflow_job_id}/{workspace_id}/...`. Symlinks are followed, as with copying the tree.
+        The top level workflow job dir has no local counterpart, hence no local path.
+        """
+        yield None, f"{workflow_job_id}/"
+        yield nextflow_script_path, f"{workflow_job_id}/{nextflow_script_path.name}"
         ocrd_workspace_id = ocrd_workspace_dir.name
-        self.logger.info(f"OCR-D workspace id to be used: {ocrd_workspace_id}")
-
-        tempdir = mkdtemp(prefix=tempdir_prefix)
-        self.logger.info(f"Created a temp dir name: {tempdir}")
-        temp_workflow_job_dir = Path(tempdir, workflow_job_id)
-        makedirs(temp_workflow_job_dir)
-        self.logger.info(f"Created a slurm workspace dir: {temp_workflow_job_dir}")
-
-        dst_script_path = Path(temp_workflow_job_dir, nextflow_filename)
-        symlink(src=nextflow_script_path, dst=dst_script_path)
-        self.logger.info(f"Symlink created from src: {nextflow_script_path}, to dst: {dst_script_path}")
-
-        dst_workspace_path = Path(temp_workflow_job_dir, ocrd_workspace_id)
-        copytree(src=ocrd_workspace_dir, dst=dst_workspace_path)
-        self.logger.info(f"Copied tree from src: {ocrd_workspace_dir}, to dst: {dst_workspace_path}")
-
-        dst_zip_path = Path(f"{temp_workflow_job_dir}.zip")
-        make_zip_archive(source=temp_workflow_job_dir, destination=dst_zip_path)
-        self.logger.info(f"Zip archive created from src: {temp_workflow_job_dir}, to dst: {dst_zip_path}")
-        return dst_zip_path
+        for dir_path, dir_names, file_names in walk(ocrd_workspace_dir, followlinks=True):
+            dir_names.sort()
+            relative_dir = Path(dir_path).relative_to(ocrd_workspace_dir)
+            arc_dir = Path(workflow_job_id, ocrd_workspace_id, relative_dir).as_posix()
+            yield Path(dir_path), f"{arc_dir}/"
+            for file_name in sorted(file_names):
+                yield Path(dir_path, file_name), f"{arc_dir}/{file_name}"
+
+    def _write_slurm_workspace_zip(
+        self, zip_fileobj: BinaryIO, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path,
+        policy: TransferArchivePolicy = TRANSFER_ARCHIVE_POLICY, content_manifest: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Writes the slurm workspace zip entry by entry into the file object, without a local copy of the workspace.
+        The entries are compressed according to the transfer archive policy. Returns the archive stats.
+        The files listed in the content manifest (archive name -> sha256) are not archived, instead the manifest
+        is added and the batch script takes the files from the content store.
+        """
+        content_manifest = content_manifest or {}
+        start_time = time()
+        bytes_in = 0
+        stream_writer = _StreamWriter(zip_fileobj)
+        with ZipFile(stream_writer, mode="w") as zip_file:
+            for local_path, arc_name in self._iter_slurm_workspace_entries(
+                ocrd_workspace_dir, workflow_job_id, nextflow_script_path
+            ):
+                if not local_path:
+                    dir_info = ZipInfo(arc_name)
+                    dir_info.external_attr = (0o40775 << 16) | 0x10  # unix dir mode and the MS-DOS directory flag
+                    zip_file.writestr(dir_info, b"")
+                elif local_path.is_dir():
+                    zip_file.write(filename=local_path, arcname=arc_name)
+                elif arc_name in content_manifest:
+                    continue
+                else:
+                    zip_file.write(
+                        filename=local_path, arcname=arc_name, compress_type=get_zip_compress_type(local_path, policy))
+                    bytes_in += local_path.stat().st_size
+            if content_manifest:
+                manifest_lines = [
+                    f"{content_hash} {arc_name[len(workflow_job_id) + 1:]}\n"
+                    for arc_name, content_hash in content_manifest.items()]
+                zip_file.writestr(f"{workflow_job_id}/{HPC_CONTENT_MANIFEST}", "".join(manifest_lines))
+        return {
+            "policy": policy.value, "bytes_in": bytes_in, "bytes_out": stream_writer.bytes_written,
+            "duration": round(time() - start_time, 3)
+        }
 
     def put_slurm_workspace(self, local_src_slurm_zip: Path, workflow_job_id: str) -> Path:
         self.logger.info(f"Workflow job id to be used: {workflow_job_id}")
         hpc_dst_slurm_zip = Path(self.slurm_workspaces_dir, f"{workflow_job_id}.zip")
-        _ = self.sftp_client  # Force reconnect of the SFTP Client
         self.put_file(local_src=local_src_slurm_zip, remote_dst=hpc_dst_slurm_zip)
         self.logger.info(f"Put file from local src: {local_src_slurm_zip}, to remote dst: {hpc_dst_slurm_zip}")
         self.logger.info(f"Leaving put_slurm_workspace, returning: {hpc_dst_slurm_zip}")
         # Zip path inside the HPC environment
         return hpc_dst_slurm_zip
 
-    def pack_and_put_slurm_workspace(
+    def stream_slurm_workspace(
         self, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path,
-        tempdir_prefix: str = "slurm_workspace-"
-    ) -> Tuple[Path, Path]:
-        self.logger.info(f"Entering put_slurm_workspace")
+        buffer_size: int = STREAM_BUFFER_SIZE, content_manifest: Optional[Dict[str, str]] = None
+    ) -> Path:
+        """
+        Packs the slurm workspace directly into the remote zip file. The zip entries are written into the
+        sftp file handle as they are compressed, only a bounded write buffer is kept in memory and no
+        local copies or temporary archives are created.
+        """
+        self.logger.info(f"Entering stream_slurm_workspace")
         self.logger.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
         self.logger.info(f"workflow_job_id: {workflow_job_id}")
         self.logger.info(f"nextflow_script_path: {nextflow_script_path}")
-        self.logger.info(f"tempdir_prefix: {tempdir_prefix}")
+        hpc_dst_slurm_zip = Path(self.slurm_workspaces_dir, f"{workflow_job_id}.zip")
+        self.mkdir_p(remote_path=str(hpc_dst_slurm_zip.parent))
+
+        def _stream(sftp: SFTPClient) -> Dict[str, Any]:
+            with sftp.open(str(hpc_dst_slurm_zip), mode="wb", bufsize=buffer_size) as remote_file:
+                # Do not wait for the server acknowledgement of each written chunk
+                remote_file.set_pipelined(True)
+                return self._write_slurm_workspace_zip(
+                    remote_file, ocrd_workspace_dir, workflow_job_id, nextflow_script_path,
+                    content_manifest=content_manifest)
+
+        archive_stats = self._with_sftp_recovery(_stream)
+        duration = max(archive_stats["duration"], 0.001)
+        self.logger.info(
+            f"Streamed {archive_stats['bytes_out']} bytes of slurm workspace to remote dst: {hpc_dst_slurm_zip}, "
+            f"in {duration:.2f} seconds ({archive_stats['bytes_out'] / duration / 1024 ** 2:.2f} MiB/s)")
+        self.logger.info(f"Zip archive stats: {archive_stats}")
+        # Zip path inside the HPC environment
+        return hpc_dst_slurm_zip
+
+    def _create_content_manifest(
+        self, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path
+    ) -> Tuple[Dict[str, str], Dict[str, Path]]:
+        """
+        Hashes the workspace files. Returns the content manifest (archive name -> sha256),
+        and the local path of a file for each distinct sha256.
+        """
+        content_manifest: Dict[str, str] = {}
+        content_files: Dict[str, Path] = {}
+        for local_path, arc_name in self._iter_slurm_workspace_entries(
+            ocrd_workspace_dir, workflow_job_id, nextflow_script_path
+        ):
+            # Only the workspace files are kept in the content store, not the directories or the nextflow script
+            if not local_path or not arc_name.startswith(f"{workflow_job_id}/{ocrd_workspace_dir.name}/"):
+                continue
+            if local_path.is_dir():
+                continue
+            content_hash = calculate_file_sha256(local_path)
+            content_manifest[arc_name] = content_hash
+            content_files.setdefault(content_hash, local_path)
+        return content_manifest, content_files
 
-        local_src_slurm_zip = self.create_slurm_workspace_zip(
+    def find_missing_contents(self, content_hashes: List[str]) -> List[str]:
+        """
+        Returns the hashes missing in the remote content store, checked with a single remote command.
+        """
+        if not content_hashes:
+            return []
+        command = (
+            f"bash -c 'cd {self.content_store_dir} 2> /dev/null || {{ cat; exit 0; }}; "
+            f"while read -r hash; do [ -f \"${{hash:0:2}}/$hash\" ] || echo \"$hash\"; done'")
+        output, err, return_code = self.execute_blocking(command, stdin_input="\n".join(content_hashes) + "\n")
+        if return_code:
+            raise Exception(f"Failed to check the content store: {content_hashes}, error: {err}")
+        return [line.strip() for line in output if line.strip()]
+
+    def put_content(self, local_src: Path, content_hash: str) -> None:
+        remote_dir = f"{self.content_store_dir}/{content_hash[:2]}"
+        remote_dst = f"{remote_dir}/{content_hash}"
+        # The content is renamed only after being fully uploaded, partial uploads are never seen by the batch script
+        remote_partial = f"{remote_dst}.part-{uuid4().hex}"
+        self.mkdir_p(remote_path=remote_dir)
+
+        def _put(sftp: SFTPClient) -> None:
+            sftp.put(localpath=str(local_src), remotepath=remote_partial)
+            sftp.posix_rename(remote_partial, remote_dst)
+
+        self._with_sftp_recovery(_put)
+
+    def put_missing_contents(self, ocrd_workspace_dir: Path, content_files: Dict[str, Path]) -> None:
+        start_time = time()
+        missing_hashes = set(self.find_missing_contents(list(content_files.keys())))
+        bytes_total, bytes_uploaded = 0, 0
+        for content_hash, local_path in content_files.items():
+            file_size = local_path.stat().st_size
+            bytes_total += file_size
+            if content_hash in missing_hashes:
+                self.put_content(local_src=local_path, content_hash=content_hash)
+                bytes_uploaded += file_size
+        self.logger.info(
+            f"Content store sync of workspace: {ocrd_workspace_dir.name}, "
+            f"distinct contents: {len(content_files)}, uploaded contents: {len(missing_hashes)}, "
+            f"uploaded bytes: {bytes_uploaded}/{bytes_total}, in {time() - start_time:.2f} seconds")
+
+    def sync_slurm_workspace(self, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path) -> Path:
+        """
+        Uploads only the workspace files missing in the content addressed store of the HPC, the streamed
+        slurm workspace zip carries a manifest instead of the files and the batch script assembles the
+        workspace from the store. Workspaces submitted again with another workflow upload almost nothing.
+        """
+        self.logger.info(f"Entering sync_slurm_workspace")
+        content_manifest, content_files = self._create_content_manifest(
+            ocrd_workspace_dir, workflow_job_id, nextflow_script_path)
+        self.put_missing_contents(ocrd_workspace_dir=ocrd_workspace_dir, content_files=content_files)
+        return self.stream_slurm_workspace(
             ocrd_workspace_dir=ocrd_workspace_dir, workflow_job_id=workflow_job_id,
-            nextflow_script_path=nextflow_script_path, tempdir_prefix=tempdir_prefix)
-        self.logger.info(f"Created slurm workspace zip: {local_src_slurm_zip}")
+            nextflow_script_path=nextflow_script_path, content_manifest=content_manifest)
 
-        hpc_dst = self.put_slurm_workspace(local_src_slurm_zip=local_src_slurm_zip, workflow_job_id=workflow_job_id)
+    def pack_and_put_slurm_workspace(
+        self, ocrd_workspace_dir: Path, workflow_job_id: str, nextflow_script_path: Path,
+        use_content_store: bool = HPC_CONTENT_STORE_ENABLED
+    ) -> Path:
+        if use_content_store:
+            hpc_dst = self.sync_slurm_workspace(
+                ocrd_workspace_dir=ocrd_workspace_dir, workflow_job_id=workflow_job_id,
+                nextflow_script_path=nextflow_script_path)
+        else:
+            hpc_dst = self.stream_slurm_workspace(
+                ocrd_workspace_dir=ocrd_workspace_dir, workflow_job_id=workflow_job_id,
+                nextflow_script_path=nextflow_script_path)
         self.logger.info(f"Leaving pack_and_put_slurm_workspace")
-        Path(local_src_slurm_zip).unlink(missing_ok=True)
-        return local_src_slurm_zip, hpc_dst
-
-    def _upload_file_with_retries(
-        self, local_src, remote_dst, try_times: int = TRY_TIMES, sleep_time: int = SLEEP_TIME
-    ):
-        if try_times < 0 or sleep_time < 0:
-            self.logger.warning("Negative value passed as a parameter to any of the time options, using defaults.")
-            try_times = TRY_TIMES
-            sleep_time = SLEEP_TIME
-        tries = try_times
-        while tries > 0:
-            try:
-                self.put_file(local_src=str(local_src), remote_dst=str(remote_dst))
-                break
-            except Exception as error:
-                tries -= 1
-                if tries <= 0:
-                    raise Exception(f"Error uploading file: {error}, local_src:{local_src}, remote_dst:{remote_dst}")
-                sleep(sleep_time)
-                continue
+        return hpc_dst
+
+    def pack_slurm_workspace(
+        self, zip_pipe: SlurmWorkspacePipe, use_content_store: bool = HPC_CONTENT_STORE_ENABLED
+    ) -> None:
+        """
+        Packs the slurm workspace into the pipe, the zip is uploaded by `put_slurm_workspace_from_pipe`
+        in another thread. With the content store enabled, the files are hashed here as well.
+        No connection to the HPC is used.
+        """
+        try:
+            if use_content_store:
+                zip_pipe.set_content_manifest(*self._create_content_manifest(
+                    zip_pipe.ocrd_workspace_dir, zip_pipe.workflow_job_id, zip_pipe.nextflow_script_path))
+            else:
+                zip_pipe.set_content_manifest(content_manifest={}, content_files={})
+            archive_stats = self._write_slurm_workspace_zip(
+                zip_pipe, zip_pipe.ocrd_workspace_dir, zip_pipe.workflow_job_id, zip_pipe.nextflow_script_path,
+                content_manifest=zip_pipe.content_manifest)
+            zip_pipe.close()
+        except Exception as error:
+            zip_pipe.abort(error)
+            raise error
+        self.logger.info(f"Packed slurm workspace of job: {zip_pipe.workflow_job_id}, zip archive stats: {archive_stats}")
 
-    def _download_file_with_retries(
-        self, remote_src, local_dst, try_times: int = TRY_TIMES, sleep_time: int = SLEEP_TIME
-    ):
-        if try_times < 0 or sleep_time < 0:
-            self.logger.warning("Negative value passed as a parameter to any of the time options, using defaults.")
-            try_times = TRY_TIMES
-            sleep_time = SLEEP_TIME
-        tries = try_times
-        while tries > 0:
+    def put_slurm_workspace_from_pipe(self, zip_pipe: SlurmWorkspacePipe, buffer_size: int = STREAM_BUFFER_SIZE) -> Path:
+        """
+        Uploads the missing contents to the content store, if any, and writes the zip packed into the pipe
+        into the remote zip file. A pipe cannot be consumed twice, hence, if the sftp session breaks during
+        the upload, the packing is aborted and the workspace is streamed again with `sync_slurm_workspace`,
+        or with `stream_slurm_workspace` if the content store is not used.
+        """
+        workflow_job_id = zip_pipe.workflow_job_id
+        hpc_dst_slurm_zip = Path(self.slurm_workspaces_dir, f"{workflow_job_id}.zip")
+        try:
+            zip_pipe.wait_content_manifest()
+            if zip_pipe.content_files:
+                self.put_missing_contents(
+                    ocrd_workspace_dir=zip_pipe.ocrd_workspace_dir, content_files=zip_pipe.content_files)
+            self.mkdir_p(remote_path=str(hpc_dst_slurm_zip.parent))
+            start_time = time()
+            bytes_out = 0
+            with self.sftp_client.open(str(hpc_dst_slurm_zip), mode="wb", bufsize=buffer_size) as remote_file:
+                remote_file.set_pipelined(True)
+                for chunk in zip_pipe:
+                    remote_file.write(chunk)
+                    bytes_out += len(chunk)
+        except Exception as error:
+            zip_pipe.abort(error)
+            if not self._is_sftp_error_recoverable(error):
+                raise error
+            self.logger.warning(f"The sftp session failed while uploading the packed slurm workspace: {error}")
+            self.close_sftp_client()
+            # The session may have broken before all missing contents were in the store, they are checked again
+            if zip_pipe.content_files:
+                return self.sync_slurm_workspace(
+                    ocrd_workspace_dir=zip_pipe.ocrd_workspace_dir, workflow_job_id=workflow_job_id,
+                    nextflow_script_path=zip_pipe.nextflow_script_path)
+            return self.stream_slurm_workspace(
+                ocrd_workspace_dir=zip_pipe.ocrd_workspace_dir, workflow_job_id=workflow_job_id,
+                nextflow_script_path=zip_pipe.nextflow_script_path)
+        duration = max(time() - start_time, 0.001)
+        self.logger.info(
+            f"Uploaded {bytes_out} bytes of packed slurm workspace to remote dst: {hpc_dst_slurm_zip}, "
+            f"in {duration:.2f} seconds ({bytes_out / duration / 1024 ** 2:.2f} MiB/s)")
+        # Zip path inside the HPC environment
+        return hpc_dst_slurm_zip
+
+    def _run_with_retries(self, transfer: Callable[[], None], description: str, try_times: int) -> None:
+        """
+        Retries the transfer with an exponential backoff with jitter. While the circuit breaker of the
+        connection pool is open, the frontend server is considered down and is not contacted at all.
+        """
+        if try_times < 1:
+            self.logger.warning(f"Invalid amount of tries: {try_times}, using the default: {HPC_TRANSFER_RETRY_TIMES}")
+            try_times = HPC_TRANSFER_RETRY_TIMES
+        for attempt in range(try_times):
+            open_time = self.connection_pool.circuit_breaker.remaining_open_time()
+            if open_time:
+                self.logger.warning(f"The hpc frontend server is considered down, waiting {open_time:.0f} seconds")
+                sleep(open_time)
             try:
-                self.get_file(remote_src=str(remote_src), local_dst=str(local_dst))
-                break
+                transfer()
+                return
             except Exception as error:
-                tries -= 1
-                if tries <= 0:
-                    raise Exception(f"Error downloading file: {error}, remote_src:{remote_src}, local_dst:{local_dst}")
-                sleep(sleep_time)
-                continue
+                if attempt + 1 >= try_times:
+                    raise Exception(f"Error {description}: {error}")
+                delay = get_backoff_delay(attempt)
+                self.logger.warning(
+                    f"Failed {description}, try {attempt + 1}/{try_times}: {error}. Retrying in {delay:.1f} seconds")
+                sleep(delay)
+
+    def _download_file_with_retries(self, remote_src, local_dst, try_times: int = HPC_TRANSFER_RETRY_TIMES):
+        self._run_with_retries(
+            transfer=lambda: self.get_file_resumable(remote_src=remote_src, local_dst=local_dst),
+            description=f"downloading file, remote_src: {remote_src}, local_dst: {local_dst}", try_times=try_times)
+
+    def get_remote_sha256(self, remote_path, size: Optional[int] = None) -> str:
+        # When the size is given, only the hash of the first bytes of the file is calculated
+        command = f"sha256sum '{remote_path}'" if size is None else f"head -c {size} '{remote_path}' | sha256sum"
+        output, err, return_code = self.execute_blocking(command)
+        if return_code or not output:
+            raise Exception(f"Failed to calculate the sha256 of remote file: {remote_path}, error: {err}")
+        return output[0].split()[0]
+
+    def _get_verified_offset(self, local_path, remote_path, partial_size: int, file_size: int, local_hash) -> int:
+        """
+        Returns the offset to continue from, i.e., the size of the partial file if its bytes match the source.
+        The local hash is updated with the verified bytes, so the complete file is never read twice locally.
+        """
+        if not partial_size or partial_size > file_size:
+            return 0
+        with open(local_path, mode="rb") as local_file:
+            remaining = partial_size
+            while remaining > 0:
+                data = local_file.read(min(STREAM_BUFFER_SIZE, remaining))
+                local_hash.update(data)
+                remaining -= len(data)
+        if local_hash.hexdigest() != self.get_remote_sha256(remote_path, size=partial_size):
+            self.logger.warning(f"The partial file does not match the source, restarting the transfer from zero")
+            return 0
+        return partial_size
+
+    def put_file_resumable(self, local_src, remote_dst) -> None:
+        """
+        Uploads into a partial remote file that is renamed only after the sha256 of both sides matched. A failed
+        upload is continued from the last verified offset of the partial file instead of from zero.
+        Smaller files are uploaded with the plain path, a retry from zero is cheaper than the remote checksums.
+        """
+        file_size = Path(local_src).stat().st_size
+        if file_size < HPC_TRANSFER_PARALLEL_MIN_SIZE:
+            self.put_file(local_src=local_src, remote_dst=remote_dst)
+            return
+        remote_partial = f"{remote_dst}.part"
+        self.mkdir_p(remote_path=str(Path(remote_dst).parent.absolute()))
+        try:
+            partial_size = self._with_sftp_recovery(lambda sftp: sftp.stat(remote_partial).st_size)
+        except IOError:
+            partial_size = 0
+        local_hash = sha256()
+        offset = self._get_verified_offset(local_src, remote_partial, partial_size, file_size, local_hash)
+        if not offset:
+            local_hash = sha256()
+        start_time = time()
+        if not offset and HPC_TRANSFER_STREAMS > 1 and file_size >= HPC_TRANSFER_PARALLEL_MIN_SIZE:
+            self.put_file_parallel(local_src=local_src, remote_dst=remote_partial, verify=True)
+        else:
+            if offset:
+                self.logger.info(f"Resuming the upload of {remote_dst} from offset: {offset}/{file_size}")
+
+            def _put_from_offset(sftp: SFTPClient) -> None:
+                with open(local_src, mode="rb") as local_file, \
+                        sftp.open(remote_partial, mode="ab" if offset else "wb") as remote_file:
+                    remote_file.set_pipelined(True)
+                    local_file.seek(offset)
+                    for data in iter(lambda: local_file.read(STREAM_BUFFER_SIZE), b""):
+                        remote_file.write(data)
+                        local_hash.update(data)
+
+            # No session recovery inside, a broken transfer is resumed by the next try from the verified offset
+            _put_from_offset(self.sftp_client)
+            remote_sha256 = self.get_remote_sha256(remote_partial)
+            if local_hash.hexdigest() != remote_sha256:
+                self._with_sftp_recovery(lambda sftp: sftp.remove(remote_partial))
+                raise Exception(f"Checksum mismatch of uploaded file: {remote_dst}, removed the partial file")
+            self._log_transfer_metrics("Uploaded", remote_dst, file_size - offset, 1, start_time)
+        self._with_sftp_recovery(lambda sftp: sftp.posix_rename(remote_partial, str(remote_dst)))
+
+    def get_file_resumable(self, remote_src, local_dst) -> None:
+        """
+        Downloads into a partial local file that is renamed only after the sha256 of both sides matched. A failed
+        download is continued from the last verified offset of the partial file instead of from zero.
+        Smaller files are downloaded with the plain path, a retry from zero is cheaper than the remote checksums.
+        """
+        file_size = self._with_sftp_recovery(lambda sftp: sftp.stat(str(remote_src)).st_size)
+        if file_size < HPC_TRANSFER_PARALLEL_MIN_SIZE:
+            makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
+            self._with_sftp_recovery(lambda sftp: sftp.get(remotepath=str(remote_src), localpath=str(local_dst)))
+            return
+        local_partial = Path(f"{local_dst}.part")
+        makedirs(name=local_partial.parent.absolute(), exist_ok=True)
+        partial_size = local_partial.stat().st_size if local_partial.exists() else 0
+        local_hash = sha256()
+        offset = self._get_verified_offset(local_partial, remote_src, partial_size, file_size, local_hash)
+        if not offset:
+            local_hash = sha256()
+        start_time = time()
+        if not offset and HPC_TRANSFER_STREAMS > 1 and file_size >= HPC_TRANSFER_PARALLEL_MIN_SIZE:
+            self.get_file_parallel(remote_src=remote_src, local_dst=local_partial, verify=True)
+        else:
+            if offset:
+                self.logger.info(f"Resuming the download of {remote_src} from offset: {offset}/{file_size}")
+
+            def _get_from_offset(sftp: SFTPClient) -> None:
+                with sftp.open(str(remote_src), mode="rb") as remote_file, \
+                        open(local_partial, mode="ab" if offset else "wb") as local_file:
+                    remote_file.seek(offset)
+                    remote_file.prefetch(file_size)
+                    for data in iter(lambda: remote_file.read(STREAM_BUFFER_SIZE), b""):
+                        local_file.write(data)
+                        local_hash.update(data)
+
+            # No session recovery inside, a broken transfer is resumed by the next try from the verified offset
+            _get_from_offset(self.sftp_client)
+            if local_hash.hexdigest() != self.get_remote_sha256(remote_src):
+                local_partial.unlink(missing_ok=True)
+                raise Exception(f"Checksum mismatch of downloaded file: {remote_src}, removed the partial file")
+            self._log_transfer_metrics("Downloaded", remote_src, file_size - offset, 1, start_time)
+        local_partial.replace(local_dst)
 
     def download_slurm_job_log_file(self, slurm_job_id: str, local_wf_job_dir: Path) -> Path:
-        _ = self.sftp_client  # Force reconnect of the SFTP Client
         workflow_job_id = Path(local_wf_job_dir).name
         get_src = Path(self.slurm_workspaces_dir, workflow_job_id, f"slurm-job-{slurm_job_id}.txt")
         get_dst = Path(local_wf_job_dir, f"slurm-job-{slurm_job_id}.txt")
@@ -157,77 +666,102 @@ class NHRTransfer(NHRConnector):
         self.logger.info(f"Successfully downloaded slurm job log to: {get_dst}")
         return get_dst
 
-    def _download_workflow_job_zip(self, local_wf_job_dir: Path) -> Path:
-        workflow_job_id = Path(local_wf_job_dir).name
-        get_src = Path(self.slurm_workspaces_dir, workflow_job_id, f"wf_{workflow_job_id}.zip")
-        get_dst = Path(local_wf_job_dir.parent.absolute(), f"{workflow_job_id}.zip")
-        self.logger.info(f"Downloading workflow job zip from HPC source: {get_src}")
-        self.logger.info(f"Downloading workflow job zip to local destination: {get_dst}")
-        self._download_file_with_retries(remote_src=get_src, local_dst=get_dst)
-        self.logger.info(f"Successfully downloaded zip of workflow job id: {workflow_job_id}")
-        return get_dst
-
-    def _unzip_workflow_job_dir(self, local_wf_job_zip: Path, local_wf_job_dir: Path, remove_zip: bool = True) -> Path:
-        unpack_src = local_wf_job_zip
-        unpack_dst = local_wf_job_dir
-        self.logger.info(f"Unzipping source workflow job zip path: {unpack_src}")
-        self.logger.info(f"Unzipping workflow job zip to destination: {unpack_dst}")
+    def _unzip_archive(self, local_zip: Path, local_dst: Path, remove_zip: bool = True) -> Path:
+        self.logger.info(f"Unzipping source zip path: {local_zip}")
+        self.logger.info(f"Unzipping zip to destination: {local_dst}")
         try:
-            unpack_zip_archive(source=unpack_src, destination=unpack_dst)
+            unpack_zip_archive(source=local_zip, destination=local_dst)
         except Exception as error:
-            if remove_zip:
-                Path(unpack_src).unlink(missing_ok=True)
-                self.logger.info(f"Removed the temp workflow job zip: {unpack_src}")
             raise Exception(
-                f"Error when unpacking workflow job zip: {error}, unpack_src: {unpack_src}, unpack_dst: {unpack_dst}")
-        self.logger.info(f"Unpacked workflow job zip from src: {unpack_src}, to dst: {unpack_dst}")
-        if remove_zip:
-            Path(unpack_src).unlink(missing_ok=True)
-            self.logger.info(f"Removed the temp workflow job zip: {unpack_src}")
-        return unpack_dst
-
-    def _download_workspace_zip(self, local_ocrd_ws_dir: Path, local_wf_job_dir: Path) -> Path:
-        workflow_job_id = Path(local_wf_job_dir).name
-        workspace_id = Path(local_ocrd_ws_dir).name
-        get_src = Path(self.slurm_workspaces_dir, workflow_job_id, f"ws_{workspace_id}.zip")
-        get_dst = Path(local_ocrd_ws_dir.parent.absolute(), f"{workspace_id}.zip")
-        self.logger.info(f"Downloading workspace zip from HPC source: {get_src}")
-        self.logger.info(f"Downloading workspace zip to local destination: {get_dst}")
-        self._download_file_with_retries(remote_src=get_src, local_dst=get_dst)
-        self.logger.info(f"Successfully downloaded zip of workspace id: {workspace_id}")
-        return get_dst
+                f"Error when unpacking zip: {error}, unpack_src: {local_zip}, unpack_dst: {local_dst}")
+        finally:
+            if remove_zip:
+                Path(local_zip).unlink(missing_ok=True)
+                self.logger.info(f"Removed the temp zip: {local_zip}")
+        self.logger.info(f"Unpacked zip from src: {local_zip}, to dst: {local_dst}")
+        return local_dst
 
-    def _unzip_workspace_dir(self, local_ws_dir_zip: Path, local_ocrd_ws_dir: Path, remove_zip: bool = True):
-        unpack_src = local_ws_dir_zip
-        unpack_dst = local_ocrd_ws_dir
+    def stream_and_unpack_zip(self, remote_src, local_dst, threads: int = HPC_UNZIP_THREADS) -> None:
+        """
+        Extracts the remote zip while its bytes arrive, the zip is never stored locally. The read requests are
+        pipelined (prefetched) and the entries are decompressed and written by a pool of threads.
+        """
+        with self.connection_pool.sftp_session() as sftp, \
+                sftp.open(str(remote_src), mode="rb", bufsize=STREAM_BUFFER_SIZE) as remote_file:
+            remote_file.prefetch()
+            archive_stats = extract_zip_stream(fileobj=remote_file, destination=local_dst, threads=threads)
+        duration = max(archive_stats["duration"], 0.001)
+        self.logger.info(
+            f"Streamed and unpacked {archive_stats['bytes_in']} bytes of {remote_src} to {local_dst}, in "
+            f"{duration:.2f} seconds ({archive_stats['bytes_in'] / duration / 1024 ** 2:.2f} MiB/s)")
+        self.logger.info(f"Unpacked zip archive stats: {archive_stats}")
+
+    def _get_and_unpack_zip(self, remote_src: Path, local_zip: Path, local_dst: Path) -> None:
         try:
-            unpack_zip_archive(source=unpack_src, destination=unpack_dst)
+            self.stream_and_unpack_zip(remote_src=remote_src, local_dst=local_dst)
+            return
         except Exception as error:
-            if remove_zip:
-                Path(unpack_src).unlink(missing_ok=True)
-                self.logger.info(f"Removed the temp workspace zip: {unpack_src}")
-            raise Exception(
-                f"Error when unpacking workspace zip: {error}, unpack_src: {unpack_src}, unpack_dst: {unpack_dst}")
-        self.logger.info(f"Unpacked workspace zip from src: {unpack_src}, to dst: {unpack_dst}")
+            self.logger.warning(
+                f"Streaming extraction of {remote_src} has failed: {error}, downloading the zip before unpacking")
+        self._download_file_with_retries(remote_src=remote_src, local_dst=local_zip)
+        self._unzip_archive(local_zip=local_zip, local_dst=local_dst, remove_zip=True)
 
-        if remove_zip:
-            Path(unpack_src).unlink(missing_ok=True)
-            self.logger.info(f"Removed the temp workspace zip: {unpack_src}")
+    def _merge_delta_results(self, delta_dir: Path, ocrd_workspace_dir: Path) -> None:
+        """
+        Completes the delta results with the files the workflow left unchanged, they are hard linked from the
+        current local workspace. Files of the local workspace missing in the results file list are not taken over.
+        """
+        results_file_list = Path(delta_dir, HPC_RESULTS_FILE_LIST)
+        linked_amount = 0
+        with open(results_file_list, mode="r") as file_list:
+            for relative_path in file_list.read().splitlines():
+                delta_file = Path(delta_dir, relative_path)
+                if not relative_path or delta_file.exists():
+                    continue
+                local_file = Path(ocrd_workspace_dir, relative_path)
+                if not local_file.is_file():
+                    raise FileNotFoundError(f"Unchanged file of the delta results is missing locally: {local_file}")
+                makedirs(delta_file.parent, exist_ok=True)
+                try:
+                    link(local_file, delta_file)
+                except OSError:
+                    copy2(local_file, delta_file)
+                linked_amount += 1
+        results_file_list.unlink()
+        self.logger.info(f"Merged the delta results with {linked_amount} unchanged files of: {ocrd_workspace_dir}")
 
     def get_and_unpack_slurm_workspace(self, ocrd_workspace_dir: Path, workflow_job_dir: Path):
-        _ = self.sftp_client  # Force reconnect of the SFTP Client
-        wf_job_zip_path = self._download_workflow_job_zip(local_wf_job_dir=workflow_job_dir)
-        self._unzip_workflow_job_dir(wf_job_zip_path, workflow_job_dir, True)
+        workflow_job_id = Path(workflow_job_dir).name
+        workspace_id = Path(ocrd_workspace_dir).name
 
-        # TODO: This is still not optimal. Consider to back up instead of removing before downloading.
-        # Remove the workspace dir from the local storage,
-        # before transferring the results to avoid potential
-        # overwrite errors or duplications
-        rmtree(ocrd_workspace_dir, ignore_errors=True)
-        self.logger.info(f"Removed tree dirs: {ocrd_workspace_dir}")
+        # The results are unpacked into a sibling staging dir and swapped in with a rename once complete,
+        # the current workspace stays available during the transfer and is left intact if the transfer fails
+        staging_dir = get_staging_dir(ocrd_workspace_dir)
+        try:
+            # Both archives are transferred and unpacked concurrently, each through its own sftp session
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="results_download") as executor:
+                wf_job_future = executor.submit(
+                    self._get_and_unpack_zip,
+                    remote_src=Path(self.slurm_workspaces_dir, workflow_job_id, f"wf_{workflow_job_id}.zip"),
+                    local_zip=Path(workflow_job_dir.parent.absolute(), f"{workflow_job_id}.zip"),
+                    local_dst=workflow_job_dir)
+                ws_future = executor.submit(
+                    self._get_and_unpack_zip,
+                    remote_src=Path(self.slurm_workspaces_dir, workflow_job_id, f"ws_{workspace_id}.zip"),
+                    local_zip=Path(ocrd_workspace_dir.parent.absolute(), f"{workspace_id}.zip"),
+                    local_dst=staging_dir)
+                wf_job_future.result()
+                ws_future.result()
+            if Path(staging_dir, HPC_RESULTS_FILE_LIST).exists():
+                self._merge_delta_results(delta_dir=staging_dir, ocrd_workspace_dir=ocrd_workspace_dir)
+        except Exception as error:
+            rmtree(staging_dir, ignore_errors=True)
+            self.logger.error(f"Failed to get the results, the workspace was left unchanged: {ocrd_workspace_dir}")
+            raise error
 
-        ws_zip_path = self._download_workspace_zip(ocrd_workspace_dir, workflow_job_dir)
-        self._unzip_workspace_dir(ws_zip_path, ocrd_workspace_dir)
+        previous_dir = swap_in_staging_dir(staging_dir=staging_dir, target_dir=ocrd_workspace_dir)
+        self.logger.info(f"Swapped in the results workspace: {ocrd_workspace_dir}, previous version: {previous_dir}")
+        # The previous version is removed by the periodic cleanup of the download worker after the grace period
 
         # Remove the workspace dir from the local workflow job dir,
         # and then create a symlink of the workspace dir inside the
@@ -242,49 +776,187 @@ class NHRTransfer(NHRConnector):
         self.logger.info(f"Leaving get_and_unpack_slurm_workspace")
 
     def mkdir_p(self, remote_path, mode=0o766):
+        return self._with_sftp_recovery(lambda sftp: self._mkdir_p(sftp, remote_path, mode))
+
+    def _mkdir_p(self, sftp: SFTPClient, remote_path, mode=0o766):
         if remote_path == '/':
-            self._sftp_client.chdir('/')  # absolute path so change directory to root
+            sftp.chdir('/')  # absolute path so change directory to root
             return False
         if remote_path == '':
             return False  # top-level relative directory must exist
         try:
-            self._sftp_client.chdir(remote_path)  # subdirectory exists
+            sftp.chdir(remote_path)  # subdirectory exists
         except IOError as error:
             dir_name, base_name = split(remote_path.rstrip('/'))
-            self.mkdir_p(dir_name)  # make parent directories
-            self._sftp_client.mkdir(path=base_name, mode=mode)  # subdirectory missing, so created it
-            self._sftp_client.chdir(base_name)
+            self._mkdir_p(sftp, dir_name)  # make parent directories
+            sftp.mkdir(path=base_name, mode=mode)  # subdirectory missing, so created it
+            sftp.chdir(base_name)
             return True
 
+    def _transfer_in_parallel(
+        self, operation: Callable[[SFTPClient, Any], None], work_items: List[Any], streams: int
+    ) -> None:
+        """
+        Distributes the work items between the streams, each stream has its own sftp session
+        opened on the pooled connections, hence its own flow control window.
+        """
+        def _run_stream(stream_items: List[Any]) -> None:
+            with self.connection_pool.sftp_session() as sftp:
+                for work_item in stream_items:
+                    operation(sftp, work_item)
+
+        streams = max(1, min(streams, len(work_items)))
+        with ThreadPoolExecutor(max_workers=streams, thread_name_prefix="sftp_stream") as executor:
+            futures = [executor.submit(_run_stream, work_items[index::streams]) for index in range(streams)]
+            for future in futures:
+                future.result()
+
+    def _split_in_chunks(self, file_size: int, chunk_size: int) -> List[Tuple[int, int]]:
+        return [(offset, min(chunk_size, file_size - offset)) for offset in range(0, file_size, chunk_size)]
+
+    def _log_transfer_metrics(self, direction: str, remote_path, bytes_amount: int, streams: int, start_time: float):
+        duration = max(time() - start_time, 0.001)
+        self.logger.info(
+            f"{direction} {bytes_amount} bytes of {remote_path} with {streams} streams, in {duration:.2f} seconds "
+            f"({bytes_amount / duration / 1024 ** 2:.2f} MiB/s)")
+
+    def verify_checksum(self, local_path, remote_path) -> None:
+        local_sha256 = calculate_file_sha256(local_path)
+        remote_sha256 = self.get_remote_sha256(remote_path)
+        if local_sha256 != remote_sha256:
+            raise Exception(
+                f"Checksum mismatch of local file: {local_path} ({local_sha256}), "
+                f"and remote file: {remote_path} ({remote_sha256})")
+        self.logger.info(f"Verified sha256 of {remote_path}: {remote_sha256}")
+
+    def put_file_parallel(
+        self, local_src, remote_dst, streams: int = HPC_TRANSFER_STREAMS, chunk_size: int = HPC_TRANSFER_CHUNK_SIZE,
+        verify: bool = True
+    ) -> None:
+        """
+        Uploads the byte ranges of the local file in parallel streams, each writing at its offsets of the remote file.
+        """
+        start_time = time()
+        file_size = Path(local_src).stat().st_size
+        self.mkdir_p(remote_path=str(Path(remote_dst).parent.absolute()))
+        # Create or truncate the remote file once, the streams only write into it
+        self._with_sftp_recovery(lambda sftp: sftp.open(str(remote_dst), mode="wb").close())
+
+        def _put_chunk(sftp: SFTPClient, chunk: Tuple[int, int]) -> None:
+            offset, length = chunk
+            with open(local_src, mode="rb") as local_file, sftp.open(str(remote_dst), mode="r+b") as remote_file:
+                remote_file.set_pipelined(True)
+                local_file.seek(offset)
+                remote_file.seek(offset)
+                while length > 0:
+                    data = local_file.read(min(STREAM_BUFFER_SIZE, length))
+                    remote_file.write(data)
+                    length -= len(data)
+
+        self._transfer_in_parallel(_put_chunk, self._split_in_chunks(file_size, chunk_size), streams)
+        self._log_transfer_metrics("Uploaded", remote_dst, file_size, streams, start_time)
+        if verify:
+            self.verify_checksum(local_path=local_src, remote_path=remote_dst)
+
+    def get_file_parallel(
+        self, remote_src, local_dst, streams: int = HPC_TRANSFER_STREAMS, chunk_size: int = HPC_TRANSFER_CHUNK_SIZE,
+        verify: bool = True
+    ) -> None:
+        """
+        Downloads the byte ranges of the remote file in parallel streams, each writing at its offsets of the local file.
+        """
+        start_time = time()
+        makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
+        file_size = self._with_sftp_recovery(lambda sftp: sftp.stat(str(remote_src)).st_size)
+        with open(local_dst, mode="wb") as local_file:
+            local_file.truncate(file_size)
+
+        def _get_chunk(sftp: SFTPClient, chunk: Tuple[int, int]) -> None:
+            offset, length = chunk
+            with sftp.open(str(remote_src), mode="rb") as remote_file, open(local_dst, mode="r+b") as local_file:
+                local_file.seek(offset)
+                # The read requests of the chunk are pipelined
+                for data in remote_file.readv([(offset, length)]):
+                    local_file.write(data)
+
+        self._transfer_in_parallel(_get_chunk, self._split_in_chunks(file_size, chunk_size), streams)
+        self._log_transfer_metrics("Downloaded", remote_src, file_size, streams, start_time)
+        if verify:
+            self.verify_checksum(local_path=local_dst, remote_path=remote_src)
+
     def get_file(self, remote_src, local_dst):
+        if HPC_TRANSFER_STREAMS > 1:
+            file_size = self._with_sftp_recovery(lambda sftp: sftp.stat(str(remote_src)).st_size)
+            if file_size >= HPC_TRANSFER_PARALLEL_MIN_SIZE:
+                self.get_file_parallel(remote_src=remote_src, local_dst=local_dst)
+                return
         makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
-        self._sftp_client.get(remotepath=str(remote_src), localpath=str(local_dst))
+        self._with_sftp_recovery(lambda sftp: sftp.get(remotepath=str(remote_src), localpath=str(local_dst)))
 
-    def get_dir(self, remote_src, local_dst, mode=0o766):
+    def get_dir(self, remote_src, local_dst, mode=0o766, parallel: bool = False, streams: int = HPC_TRANSFER_STREAMS):
         """
         Downloads the contents of the remote source directory to the local destination directory.
         The remote source directory needs to exist.
         All subdirectories in source are created under destination.
+        In parallel mode, the files are downloaded by parallel streams, one file at a time per stream.
         """
+        if parallel:
+            start_time = time()
+            remote_files = self._list_remote_files(remote_src=remote_src, local_dst=local_dst, mode=mode)
+            self._transfer_in_parallel(
+                lambda sftp, item: sftp.get(remotepath=str(item[0]), localpath=str(item[1])), remote_files, streams)
+            bytes_amount = sum(Path(item_dst).stat().st_size for _, item_dst in remote_files)
+            self._log_transfer_metrics("Downloaded", remote_src, bytes_amount, streams, start_time)
+            return
         makedirs(name=local_dst, mode=mode, exist_ok=True)
-        for item in self._sftp_client.listdir(str(remote_src)):
+        for item in self._with_sftp_recovery(lambda sftp: sftp.listdir(str(remote_src))):
             item_src = Path(remote_src, item)
             item_dst = Path(local_dst, item)
-            if S_ISDIR(self._sftp_client.lstat(str(item_src)).st_mode):
+            if S_ISDIR(self._with_sftp_recovery(lambda sftp: sftp.lstat(str(item_src))).st_mode):
                 self.get_dir(remote_src=item_src, local_dst=item_dst, mode=mode)
             else:
                 self.get_file(remote_src=item_src, local_dst=item_dst)
 
+    def _list_remote_files(self, remote_src, local_dst, mode=0o766) -> List[Tuple[Path, Path]]:
+        # Creates the local dirs and returns the remote files with their local destinations
+        makedirs(name=local_dst, mode=mode, exist_ok=True)
+        remote_files = []
+        for item in self._with_sftp_recovery(lambda sftp: sftp.listdir_attr(str(remote_src))):
+            item_src = Path(remote_src, item.filename)
+            item_dst = Path(local_dst, item.filename)
+            if S_ISDIR(item.st_mode):
+                remote_files += self._list_remote_files(remote_src=item_src, local_dst=item_dst, mode=mode)
+            else:
+                remote_files.append((item_src, item_dst))
+        return remote_files
+
     def put_file(self, local_src, remote_dst):
+        if HPC_TRANSFER_STREAMS > 1 and Path(local_src).stat().st_size >= HPC_TRANSFER_PARALLEL_MIN_SIZE:
+            self.put_file_parallel(local_src=local_src, remote_dst=remote_dst)
+            return
         self.mkdir_p(remote_path=str(Path(remote_dst).parent.absolute()))
-        self._sftp_client.put(localpath=str(local_src), remotepath=str(remote_dst))
+        self._with_sftp_recovery(lambda sftp: sftp.put(localpath=str(local_src), remotepath=str(remote_dst)))
 
-    def put_dir(self, local_src, remote_dst, mode=0o766):
+    def put_dir(self, local_src, remote_dst, mode=0o766, parallel: bool = False, streams: int = HPC_TRANSFER_STREAMS):
         """
         Uploads the contents of the local source directory to the remote destination directory.
         The remote destination directory needs to exist.
         All subdirectories in source are created under destination.
+        In parallel mode, the files are uploaded by parallel streams, one file at a time per stream.
         """
+        if parallel:
+            start_time = time()
+            local_files = []
+            # The remote dirs are created upfront, mkdir_p changes the working dir of the sftp session
+            for dir_path, _, file_names in walk(str(local_src)):
+                remote_dir = Path(remote_dst, Path(dir_path).relative_to(local_src))
+                self.mkdir_p(remote_path=str(remote_dir), mode=mode)
+                local_files += [(Path(dir_path, file_name), Path(remote_dir, file_name)) for file_name in file_names]
+            self._transfer_in_parallel(
+                lambda sftp, item: sftp.put(localpath=str(item[0]), remotepath=str(item[1])), local_files, streams)
+            bytes_amount = sum(Path(item_src).stat().st_size for item_src, _ in local_files)
+            self._log_transfer_metrics("Uploaded", remote_dst, bytes_amount, streams, start_time)
+            return
         self.mkdir_p(remote_path=str(remote_dst), mode=mode)
         for item in listdir(str(local_src)):
             item_src = Path(local_src, item)
@@ -292,5 +964,4 @@ class NHRTransfer(NHRConnector):
             if isdir(item_src):
                 self.put_dir(local_src=item_src, remote_dst=item_dst, mode=mode)
             else:
-                self._sftp_client.chdir(str(remote_dst))
                 self.put_file(local_src=item_src, remote_dst=item_dst)
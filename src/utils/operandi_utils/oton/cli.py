@@ -1,4 +1,5 @@
 import click
+from operandi_utils.oton.constants import OTON_MERGE_STRATEGIES, OTON_MERGE_STRATEGY_SEQUENTIAL
 from operandi_utils.oton.oton_converter import OTONConverter
 from operandi_utils.oton.ocrd_validator import OCRDValidator
 
@@ -18,14 +19,23 @@ def cli():
 @click.option('-M', '--with_mets_server', type=bool, default=False,
               help='Whether the Nextflow file will use a mets server or not. '
                    'If a Mets server is not used, then splitting and merging the mets files will be used.')
-def convert(input_path: str, output_path: str, environment: str, with_mets_server):
+@click.option('-C', '--chunk_size', type=str, default=None,
+              help='Split the pages into chunks of that many pages (or `auto`) instead of a single range per fork. '
+                   'Idle forks take the next chunk, which balances workspaces with pages of different sizes.')
+@click.option('-S', '--merge_strategy', type=click.Choice(OTON_MERGE_STRATEGIES),
+              default=OTON_MERGE_STRATEGY_SEQUENTIAL, show_default=True,
+              help='How the mets file chunks are merged when a mets server is not used. Sequential merges each chunk '
+                   'once it is ready, tree merges all chunks pairwise in parallel at the end.')
+def convert(
+    input_path: str, output_path: str, environment: str, with_mets_server, chunk_size: str, merge_strategy: str
+):
     print(f"Converting from: {input_path}")
     print(f"Converting to: {output_path}")
     environments = ["local", "docker", "apptainer"]
     if environment not in environments:
         print(f"Invalid environment value: {environment}. Must be one of: {environments}")
         exit(1)
-    OTONConverter().convert_oton(input_path, output_path, environment, with_mets_server)
+    OTONConverter().convert_oton(input_path, output_path, environment, with_mets_server, chunk_size, merge_strategy)
     print(f"Success: Converting workflow from ocrd process to Nextflow with {environment} processor calls. "
           f"The Nextflow workflow will utilize a mets server: {with_mets_server}")
 
@@ -1,6 +1,7 @@
 from json import load
 from os import environ
 from importlib import resources
+from typing import List
 
 BS: str = '{}'
 SPACES = '    '
@@ -15,6 +16,13 @@ ocrd_all_file = resources.files("operandi_utils.oton") / "ocrd-all-tool.json"
 with ocrd_all_file.open("r", encoding="utf-8") as f:
     OCRD_ALL_JSON = load(f)
 
+# Processors of a module reading the models from a shared resources dir, with the models they always load.
+# All tesserocr processors read the tessdata kept in the resources dir of the recognizer.
+OCRD_MODULE_RESOURCES = {
+    "ocrd-tesserocr-": (
+        "ocrd-tesserocr-recognize", ["eng.traineddata", "osd.traineddata", "equ.traineddata", "configs"])
+}
+
 OTON_LOG_LEVEL = environ.get("OTON_LOG_LEVEL", "INFO")
 OTON_LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s:%(funcName)s: %(lineno)s: %(message)s'
 
@@ -30,5 +38,19 @@ PARAMS_KEY_RAM: str = 'params.ram'
 PARAMS_KEY_FORKS: str = 'params.forks'
 PARAMS_KEY_CPUS_PER_FORK: str = 'params.cpus_per_fork'
 PARAMS_KEY_RAM_PER_FORK: str = 'params.ram_per_fork'
+PARAMS_KEY_CHUNK_SIZE: str = 'params.chunk_size'
+PARAMS_KEY_CHUNKS: str = 'params.chunks'
+
+# With page chunks the pages are split into more ranges than forks, idle forks take the next waiting chunk.
+# The auto chunk size splits into this many chunks per fork, e.g., 4 chunks per fork with the default
+OTON_CHUNK_SIZE_AUTO: str = 'auto'
+OTON_AUTO_CHUNKS_PER_FORK: int = 4
+
+# How the mets file chunks are merged back into the main mets file when a mets server is not used.
+# Sequential merges every chunk once its last processor finishes, tree waits for all chunks and
+# merges them pairwise in parallel, log2(chunks) rounds, with a single final merge into the main mets file
+OTON_MERGE_STRATEGY_SEQUENTIAL: str = 'sequential'
+OTON_MERGE_STRATEGY_TREE: str = 'tree'
+OTON_MERGE_STRATEGIES: List[str] = [OTON_MERGE_STRATEGY_SEQUENTIAL, OTON_MERGE_STRATEGY_TREE]
 
 WORKFLOW_COMMENT = f"// This workflow was automatically generated by the operandi_utils.oton module"
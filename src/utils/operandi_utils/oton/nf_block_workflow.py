@@ -1,6 +1,8 @@
 from logging import getLevelName, getLogger
 from typing import List
-from operandi_utils.oton.constants import OTON_LOG_LEVEL, PARAMS_KEY_INPUT_FILE_GRP, PARAMS_KEY_FORKS, SPACES
+from operandi_utils.oton.constants import (
+    OTON_LOG_LEVEL, OTON_MERGE_STRATEGY_SEQUENTIAL, OTON_MERGE_STRATEGY_TREE, PARAMS_KEY_INPUT_FILE_GRP,
+    PARAMS_KEY_FORKS, SPACES)
 from operandi_utils.oton.nf_block_process import NextflowBlockProcess
 
 class NextflowBlockWorkflow:
@@ -9,12 +11,17 @@ class NextflowBlockWorkflow:
         nf_processes: List[NextflowBlockProcess],
         nf_split_block: NextflowBlockProcess,
         nf_merge_mets: NextflowBlockProcess,
-        with_mets_server: bool = False
+        with_mets_server: bool = False,
+        page_ranges_key: str = PARAMS_KEY_FORKS,
+        merge_strategy: str = OTON_MERGE_STRATEGY_SEQUENTIAL
     ):
         self.logger = getLogger(__name__)
         self.logger.setLevel(getLevelName(OTON_LOG_LEVEL))
 
         self.with_mets_server = with_mets_server
+        # The parameter holding the amount of page ranges, the forks or the page chunks
+        self.page_ranges_key = page_ranges_key
+        self.merge_strategy = merge_strategy
         self.workflow_name = workflow_name
         self.workflow_calls: List[str] = []
         self.produce_workflow_calls(nf_processes, nf_split_block, nf_merge_mets)
@@ -25,7 +32,7 @@ class NextflowBlockWorkflow:
         nf_split_page_ranges: NextflowBlockProcess,
         nf_merge_mets: NextflowBlockProcess
     ):
-        self.workflow_calls.append(f"ch_range_multipliers = Channel.of(0..{PARAMS_KEY_FORKS}.intValue()-1)\n")
+        self.workflow_calls.append(f"ch_range_multipliers = Channel.of(0..{self.page_ranges_key}.intValue()-1)\n")
         self.workflow_calls.append(f"{nf_split_page_ranges.nf_process_name}(ch_range_multipliers)\n")
         previous_nfp = None
         for block_process in nf_blocks_process:
@@ -45,7 +52,11 @@ class NextflowBlockWorkflow:
             workflow_call += ")\n"
             previous_nfp = block_process.nf_process_name
             self.workflow_calls.append(workflow_call)
-        if not self.with_mets_server:
+        if not self.with_mets_server and self.merge_strategy == OTON_MERGE_STRATEGY_TREE:
+            # All mets file chunks are collected and passed to a single merging instance
+            self.workflow_calls.append(
+                f"{nf_merge_mets.nf_process_name}({previous_nfp}.out[0].collect(), {previous_nfp}.out[1].collect())\n")
+        elif not self.with_mets_server:
             self.workflow_calls.append(
                 f"{nf_merge_mets.nf_process_name}({previous_nfp}.out[0], {previous_nfp}.out[1])\n")
 
@@ -1,12 +1,14 @@
 from logging import getLevelName, getLogger
-from typing import List
+from typing import List, Optional
 
 from operandi_utils.oton.ocrd_validator import ProcessorCallArguments
 from operandi_utils.oton.constants import (
     BS, CONST_DIR_IN, CONST_DIR_OUT, CONST_PAGE_RANGE, CONST_METS_PATH, OTON_LOG_LEVEL, SPACES, WORKFLOW_COMMENT,
     PARAMS_KEY_INPUT_FILE_GRP, PARAMS_KEY_METS_PATH, PARAMS_KEY_WORKSPACE_DIR, PARAMS_KEY_ENV_WRAPPER_CMD_CORE,
     PARAMS_KEY_ENV_WRAPPER_CMD_STEP, PARAMS_KEY_FORKS, PARAMS_KEY_PAGES, PARAMS_KEY_CPUS, PARAMS_KEY_CPUS_PER_FORK,
-    PARAMS_KEY_RAM, PARAMS_KEY_RAM_PER_FORK, PARAMS_KEY_METS_SOCKET_PATH,
+    PARAMS_KEY_RAM, PARAMS_KEY_RAM_PER_FORK, PARAMS_KEY_METS_SOCKET_PATH, PARAMS_KEY_CHUNK_SIZE, PARAMS_KEY_CHUNKS,
+    OTON_AUTO_CHUNKS_PER_FORK, OTON_CHUNK_SIZE_AUTO, OTON_MERGE_STRATEGIES, OTON_MERGE_STRATEGY_SEQUENTIAL,
+    OTON_MERGE_STRATEGY_TREE
 )
 from operandi_utils.oton.nf_block_process import NextflowBlockProcess
 from operandi_utils.oton.nf_block_workflow import NextflowBlockWorkflow
@@ -23,10 +25,16 @@ class NextflowFileExecutable:
         self.nf_process_merging_mets = None
         self.nf_blocks_process: List[NextflowBlockProcess] = []
         self.nf_blocks_workflow: List[NextflowBlockWorkflow] = []
+        # The parameter holding the amount of page ranges to split the workspace into
+        self.page_ranges_key: str = PARAMS_KEY_FORKS
+        self.merge_strategy: str = OTON_MERGE_STRATEGY_SEQUENTIAL
 
-    def build_parameters(self, environment: str, with_mets_server: bool):
+    def build_parameters(self, environment: str, with_mets_server: bool, chunk_size: Optional[str] = None):
         if environment not in self.supported_environments:
             raise ValueError(f"Invalid environment value: {environment}. Must be one of: {self.supported_environments}")
+        if chunk_size is not None and chunk_size != OTON_CHUNK_SIZE_AUTO and \
+                not (str(chunk_size).isdigit() and int(chunk_size) > 0):
+            raise ValueError(f"Invalid chunk size value: {chunk_size}. Must be a positive integer or: auto")
 
         self.nf_lines_parameters[PARAMS_KEY_INPUT_FILE_GRP] = '"null"'
         self.nf_lines_parameters[PARAMS_KEY_METS_PATH] = '"null"'
@@ -51,6 +59,16 @@ class NextflowFileExecutable:
                 f'sprintf("%dGB", ({PARAMS_KEY_RAM}.toInteger() / {PARAMS_KEY_FORKS}.toInteger()).intValue())'
             self.nf_lines_parameters[PARAMS_KEY_ENV_WRAPPER_CMD_CORE] = '"null"'
 
+        if chunk_size is not None:
+            # The pages are split into more chunks than forks, each fork takes the next chunk once it is idle
+            self.nf_lines_parameters[PARAMS_KEY_CHUNK_SIZE] = f'"{chunk_size}"'
+            auto_chunks = f'{PARAMS_KEY_FORKS}.toInteger() * {OTON_AUTO_CHUNKS_PER_FORK}'
+            auto_chunks = f'Math.min({PARAMS_KEY_PAGES}.toInteger(), {auto_chunks})'
+            sized_chunks = f'Math.ceil({PARAMS_KEY_PAGES}.toInteger() / {PARAMS_KEY_CHUNK_SIZE}.toInteger()).intValue()'
+            self.nf_lines_parameters[PARAMS_KEY_CHUNKS] = \
+                f'Math.max(1, {PARAMS_KEY_CHUNK_SIZE} == "{OTON_CHUNK_SIZE_AUTO}" ? {auto_chunks} : {sized_chunks})'
+            self.page_ranges_key = PARAMS_KEY_CHUNKS
+
     # TODO: Refactor later
     def build_split_page_ranges_process(self, environment: str, with_mets_server: bool) -> NextflowBlockProcess:
         block = NextflowBlockProcess(
@@ -75,7 +93,7 @@ class NextflowFileExecutable:
         PH_RANGE_MULTIPLIER = '${range_multiplier}'
         bash_cmd_ocrd_ws = (
             f"ocrd workspace -d ${BS[0]}{PARAMS_KEY_WORKSPACE_DIR}{BS[1]} list-page -f comma-separated "
-            f"-D ${BS[0]}{PARAMS_KEY_FORKS}{BS[1]} -C {PH_RANGE_MULTIPLIER}"
+            f"-D ${BS[0]}{self.page_ranges_key}{BS[1]} -C {PH_RANGE_MULTIPLIER}"
         )
         bash_cmd_copy_mets_chunk = f"cp -p ${BS[0]}{PARAMS_KEY_METS_PATH}{BS[1]} \\$mets_file_chunk"
 
@@ -102,7 +120,14 @@ class NextflowFileExecutable:
         return block
 
     # TODO: Refactor later
-    def build_merge_mets_process(self, environment: str, with_mets_server: bool) -> NextflowBlockProcess:
+    def build_merge_mets_process(
+        self, environment: str, with_mets_server: bool, merge_strategy: str = OTON_MERGE_STRATEGY_SEQUENTIAL
+    ) -> NextflowBlockProcess:
+        if merge_strategy not in OTON_MERGE_STRATEGIES:
+            raise ValueError(f"Invalid merge strategy value: {merge_strategy}. Must be one of: {OTON_MERGE_STRATEGIES}")
+        self.merge_strategy = merge_strategy
+        if merge_strategy == OTON_MERGE_STRATEGY_TREE:
+            return self.build_tree_merge_mets_process(environment=environment, with_mets_server=with_mets_server)
         block = NextflowBlockProcess(
             ProcessorCallArguments(executable="merging-mets"),
             index_pos=0,
@@ -141,13 +166,70 @@ class NextflowFileExecutable:
         self.nf_process_merging_mets = block
         return block
 
+    def build_tree_merge_mets_process(self, environment: str, with_mets_server: bool) -> NextflowBlockProcess:
+        block = NextflowBlockProcess(
+            ProcessorCallArguments(executable="merging-mets"),
+            index_pos=0,
+            with_mets_server=with_mets_server
+        )
+        block.nf_process_name = "merging_mets"
+        block.ocrd_command_bash = ""
+        block.ocrd_command_bash_placeholders = ""
+
+        block.add_directive(directive='debug', value='true')
+        # A single instance receives all mets file chunks at once, the pairwise merges run in parallel inside it
+        block.add_directive(directive='maxForks', value='1')
+        if environment == "apptainer":
+            block.add_directive(directive='cpus', value=PARAMS_KEY_CPUS)
+            block.add_directive(directive='memory', value=f'sprintf("%dGB", {PARAMS_KEY_RAM}.toInteger())')
+
+        block.add_parameter_input(parameter="mets_file_chunks", parameter_type="val")
+        block.add_parameter_input(parameter="page_ranges", parameter_type="val")
+
+        env_wrapper = ""
+        if environment == "apptainer" or environment == "docker":
+            env_wrapper = f"${BS[0]}{PARAMS_KEY_ENV_WRAPPER_CMD_CORE}{BS[1]} "
+        bash_cmd_ocrd_ws = f"{env_wrapper}ocrd workspace -d ${BS[0]}{PARAMS_KEY_WORKSPACE_DIR}{BS[1]}"
+        # In each round the chunk at i + step is merged into the chunk at i, the pairs of a round are disjoint
+        script_lines = [
+            "mets_chunks=(${mets_file_chunks.join(' ')})",
+            "page_ranges=(${page_ranges.join(' ')})",
+            "chunks_amount=\\${#mets_chunks[@]}",
+            "step=1",
+            "while [ \\$step -lt \\$chunks_amount ]; do",
+            f"{SPACES}merging_pids=()",
+            f"{SPACES}for ((i = 0; i + step < chunks_amount; i += 2 * step)); do",
+            f"{SPACES}{SPACES}{bash_cmd_ocrd_ws} -m \\${BS[0]}mets_chunks[i]{BS[1]} merge --force --no-copy-files "
+            f"\\${BS[0]}mets_chunks[i + step]{BS[1]} --page-id \\${BS[0]}page_ranges[i + step]{BS[1]} &",
+            f"{SPACES}{SPACES}merging_pids+=(\\$!)",
+            f'{SPACES}{SPACES}page_ranges[i]="\\${BS[0]}page_ranges[i]{BS[1]},\\${BS[0]}page_ranges[i + step]{BS[1]}"',
+            f"{SPACES}done",
+            f'{SPACES}for merging_pid in "\\${BS[0]}merging_pids[@]{BS[1]}"; do',
+            f"{SPACES}{SPACES}wait \\$merging_pid",
+            f"{SPACES}done",
+            f"{SPACES}step=\\$((step * 2))",
+            "done",
+            f"{bash_cmd_ocrd_ws} merge --force --no-copy-files \\${BS[0]}mets_chunks[0]{BS[1]} "
+            f"--page-id \\${BS[0]}page_ranges[0]{BS[1]}",
+            f"{env_wrapper}rm \\${BS[0]}mets_chunks[@]{BS[1]}"
+        ]
+        script = f'{SPACES}{SPACES}"""\n'
+        for script_line in script_lines:
+            script += f"{SPACES}{SPACES}{script_line}\n"
+        script += f'{SPACES}{SPACES}"""\n'
+        block.script = script
+        self.nf_process_merging_mets = block
+        return block
+
     def build_nextflow_processes(
-        self, ocrd_processors: List[ProcessorCallArguments], environment: str, with_mets_server: bool = False
+        self, ocrd_processors: List[ProcessorCallArguments], environment: str, with_mets_server: bool = False,
+        merge_strategy: str = OTON_MERGE_STRATEGY_SEQUENTIAL
     ):
         index = 0
         env_wrapper = True if environment == "docker" or environment == "apptainer" else False
         self.build_split_page_ranges_process(environment=environment, with_mets_server=with_mets_server)
-        self.build_merge_mets_process(environment=environment, with_mets_server=with_mets_server)
+        self.build_merge_mets_process(
+            environment=environment, with_mets_server=with_mets_server, merge_strategy=merge_strategy)
         for processor in ocrd_processors:
             nf_process_block = NextflowBlockProcess(
                 processor, index, with_mets_server=with_mets_server, env_wrapper=env_wrapper)
@@ -188,7 +270,9 @@ class NextflowFileExecutable:
             nf_processes=self.nf_blocks_process,
             nf_split_block=self.nf_process_split_range,
             nf_merge_mets=self.nf_process_merging_mets,
-            with_mets_server=with_mets_server
+            with_mets_server=with_mets_server,
+            page_ranges_key=self.page_ranges_key,
+            merge_strategy=self.merge_strategy
         )
         self.nf_blocks_workflow.append(nf_workflow_block)
 
@@ -1,3 +1,6 @@
+from typing import Optional
+
+from operandi_utils.oton.constants import OTON_MERGE_STRATEGY_SEQUENTIAL
 from operandi_utils.oton.nf_file_executable import NextflowFileExecutable
 from operandi_utils.oton.ocrd_validator import OCRDValidator
 
@@ -11,13 +14,17 @@ class OTONConverter:
         input_path: str,
         output_path: str,
         environment: str = "apptainer",
-        with_mets_server: bool = True
+        with_mets_server: bool = True,
+        chunk_size: Optional[str] = None,
+        merge_strategy: str = OTON_MERGE_STRATEGY_SEQUENTIAL
     ):
         list_processor_call_arguments = self.ocrd_validator.validate(input_path)
         nf_file_executable = NextflowFileExecutable()
-        nf_file_executable.build_parameters(environment=environment, with_mets_server=with_mets_server)
+        nf_file_executable.build_parameters(
+            environment=environment, with_mets_server=with_mets_server, chunk_size=chunk_size)
         nf_file_executable.build_nextflow_processes(
-            ocrd_processors=list_processor_call_arguments, environment=environment, with_mets_server=with_mets_server)
+            ocrd_processors=list_processor_call_arguments, environment=environment, with_mets_server=with_mets_server,
+            merge_strategy=merge_strategy)
         nf_file_executable.build_main_workflow(with_mets_server=with_mets_server)
         nf_file_executable.produce_nextflow_file(output_path, with_mets_server)
         return nf_file_executable
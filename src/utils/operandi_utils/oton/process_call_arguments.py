@@ -1,9 +1,9 @@
 from json import dumps as json_dumps
 from logging import getLevelName, getLogger
-from typing import Optional
+from typing import List, Optional
 from operandi_utils.oton.constants import (
-    BS, CONST_DIR_IN, CONST_DIR_OUT, CONST_METS_PATH, CONST_PAGE_RANGE, OCRD_ALL_JSON, OTON_LOG_LEVEL,
-    PARAMS_KEY_METS_SOCKET_PATH, PARAMS_KEY_WORKSPACE_DIR
+    BS, CONST_DIR_IN, CONST_DIR_OUT, CONST_METS_PATH, CONST_PAGE_RANGE, OCRD_ALL_JSON, OCRD_MODULE_RESOURCES,
+    OTON_LOG_LEVEL, PARAMS_KEY_METS_SOCKET_PATH, PARAMS_KEY_WORKSPACE_DIR
 )
 
 # This class is based on ocrd.task_sequence.ProcessorTask
@@ -76,3 +76,38 @@ class ProcessorCallArguments:
         if 'output_file_grp' in self.ocrd_tool_json and not self.output_file_grps:
             self.logger.error(f"Processor '{self.executable}' requires 'output_file_grp' but none was provided.")
             raise ValueError(f"Processor '{self.executable}' requires 'output_file_grp' but none was provided.")
+
+    def get_required_models(self) -> List[str]:
+        """
+        Returns the models used by the processor call as `executable/resource` paths inside the ocrd resources dir.
+        The model parameters are the ones declaring a `content-type` in the ocrd tool json, their values are taken
+        from the call parameters or the defaults and matched against the resources declared by the processor.
+        Values with absolute paths are not part of the ocrd resources dir and are skipped.
+        """
+        if not self.ocrd_tool_json:
+            raise ValueError(f"Ocrd tool JSON of '{self.executable}' not found!")
+        resources_dir, required_resources = self.executable, []
+        for executable_prefix, (module_resources_dir, module_resources) in OCRD_MODULE_RESOURCES.items():
+            if self.executable.startswith(executable_prefix):
+                resources_dir, required_resources = module_resources_dir, module_resources
+        resources_tool_json = OCRD_ALL_JSON.get(resources_dir, self.ocrd_tool_json)
+        resource_names = [resource["name"] for resource in resources_tool_json.get("resources", [])]
+        required_models = [f"{resources_dir}/{resource_name}" for resource_name in required_resources]
+        for param_name, param_spec in self.ocrd_tool_json.get("parameters", {}).items():
+            if "content-type" not in param_spec:
+                continue
+            param_value = self.parameters.get(param_name, param_spec.get("default", None))
+            if not param_value or not isinstance(param_value, str) or param_value.startswith("/"):
+                continue
+            # Several models can be combined, e.g., `Fraktur+Latin` of tesseract
+            model_names = [param_value] if param_value in resource_names else param_value.split("+")
+            for model_name in model_names:
+                # The resource name may carry a file extension not given in the parameter, e.g., `.traineddata`
+                matching_names = [name for name in resource_names if name.startswith(f"{model_name}.")]
+                if model_name in resource_names or not matching_names:
+                    matching_names = [model_name]
+                for matching_name in matching_names:
+                    required_model = f"{resources_dir}/{matching_name}"
+                    if required_model not in required_models:
+                        required_models.append(required_model)
+        return required_models
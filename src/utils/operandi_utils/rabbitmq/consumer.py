@@ -1,7 +1,8 @@
 from logging import getLogger
-from typing import Any, Union
+from typing import Any, Callable, Optional, Union
 
 from pika import PlainCredentials
+from pika.exceptions import ChannelClosedByBroker
 
 from operandi_utils.constants import LOG_LEVEL_RMQ_CONSUMER
 from .connector import RMQConnector
@@ -68,11 +69,45 @@ class RMQConsumer(RMQConnector):
         if self._channel and self._channel.is_open:
             self._channel.start_consuming()
 
+    def stop_consuming(self) -> None:
+        if self._channel and self._channel.is_open:
+            self._channel.stop_consuming()
+
+    def set_prefetch_count(self, prefetch_count: int) -> None:
+        RMQConnector.set_qos(self._channel, prefetch_count=prefetch_count)
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        # The only connection method that is safe to be called from other threads,
+        # the callback is executed by the consuming loop in the thread of the connection
+        self._connection.add_callback_threadsafe(callback)
+
+    def schedule_callback(self, delay: float, callback: Callable[[], None]) -> None:
+        # The callback is executed by the consuming loop of the blocking connection in the same thread
+        if self._connection and self._connection.is_open:
+            self._connection.call_later(delay, callback)
+
     def get_waiting_message_count(self) -> Union[int, None]:
         if self._channel and self._channel.is_open:
             return self._channel.get_waiting_message_count()
         return None
 
+    def get_queue_message_count(self, queue_name: str) -> Optional[int]:
+        """
+        Returns the amount of messages ready for delivery in the queue on the RabbitMQ server.
+        Unlike `get_waiting_message_count`, which counts only the messages already buffered by this channel,
+        this reflects the real queue depth. Returns None if the queue does not exist.
+        """
+        if not (self._channel and self._channel.is_open):
+            return None
+        try:
+            declare_ok = self._channel.queue_declare(queue=queue_name, passive=True)
+        except ChannelClosedByBroker as error:
+            # The broker closes the channel when a passively declared queue does not exist
+            self.logger.warning(f"Failed to get the message count of queue: {queue_name}, {error}")
+            self._channel = RMQConnector.open_blocking_channel(self._connection)
+            return None
+        return declare_ok.method.message_count
+
     def __on_consumer_cancelled(self, frame: Any) -> None:
         self.logger.warning(f"The consumer was cancelled remotely in frame: {frame}")
         if self._channel:
@@ -1,22 +1,46 @@
+from ctypes import CDLL, c_char_p, c_int, c_uint, get_errno
 from datetime import datetime
+from errno import EINVAL, ENOSYS, ENOTSUP
 from functools import wraps
+from hashlib import sha256
 from io import DEFAULT_BUFFER_SIZE
-from os import sep
-from os.path import basename, dirname
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import fsencode, makedirs, rename, scandir, sep, strerror, walk
+from os.path import dirname, getsize
 from pathlib import Path
 from pika import URLParameters
 from pymongo import uri_parser as mongo_uri_parser
 from re import match as re_match
 from requests import get as requests_get
 from requests.exceptions import RequestException
-from shutil import make_archive, move, unpack_archive
+from shutil import rmtree, unpack_archive
+from struct import Struct, pack, unpack
+from time import time
 from uuid import uuid4
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+from zlib import MAX_WBITS, crc32, decompressobj
 
+from ocrd_models.constants import NAMESPACES as OCRD_NAMESPACES
 from ocrd_utils import initLogging
 
+from operandi_utils.constants import (
+    TRANSFER_ARCHIVE_POLICY, TRANSFER_ARCHIVE_STORED_SUFFIXES, TransferArchivePolicy, WORKSPACE_SWAP_GRACE_PERIOD)
+
 logging_initialized = False
 
+ZIP_LOCAL_HEADER = Struct("<IHHHHHIIIHH")
+ZIP_LOCAL_HEADER_SIGNATURE = 0x04034b50
+ZIP_DATA_DESCRIPTOR_SIGNATURE = 0x08074b50
+ZIP_STREAM_CHUNK_SIZE = 1024 * 1024
+# Entries of at least this compressed size are extracted by the reading thread, chunk by chunk
+ZIP_STREAM_INLINE_MIN_SIZE = 64 * 1024 * 1024
+# Linux renameat2 arguments for atomically exchanging two paths
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+# The names of the previous versions of swapped dirs: `.<dir name>.previous_<creation time>_<uuid4>`
+PREVIOUS_DIR_NAME_PATTERN = r"^\..+\.previous_(\d+)_[0-9a-f-]{36}$"
+
 def safe_init_logging():
     """
     A wrapper around ocrd_utils.initLogging. It assures that ocrd_utils.initLogging is only called once.
@@ -93,18 +117,372 @@ def receive_file(response, download_path, chunk_size: int = DEFAULT_BUFFER_SIZE,
                 filePtr.write(chunk)
                 filePtr.flush()
 
-def make_zip_archive(source, destination):
-    base = basename(destination)
-    name = base.split('.')[0]
-    zip_format = base.split('.')[1]
-    archive_from = dirname(source)
-    archive_to = basename(str(source).strip(sep))
-    make_archive(base_name=name, format=zip_format, root_dir=archive_from, base_dir=archive_to)
-    move(src=f"{name}.{zip_format}", dst=destination)
+def calculate_file_sha256(file_path, chunk_size: int = 1024 * 1024) -> str:
+    file_hash = sha256()
+    with open(file_path, mode="rb") as file_ptr:
+        for chunk in iter(lambda: file_ptr.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def get_zip_compress_type(file_path, policy: TransferArchivePolicy = TRANSFER_ARCHIVE_POLICY) -> int:
+    if policy == TransferArchivePolicy.STORE:
+        return ZIP_STORED
+    is_media_file = Path(file_path).suffix.lower() in TRANSFER_ARCHIVE_STORED_SUFFIXES
+    if policy == TransferArchivePolicy.STORE_MEDIA and is_media_file:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+def make_zip_archive(source, destination, policy: TransferArchivePolicy = TRANSFER_ARCHIVE_POLICY) -> Dict[str, Any]:
+    """
+    Creates a zip archive of the source dir at the destination path, the entries are prefixed with the source
+    dir name. The entries are compressed according to the transfer archive policy. Returns the archive stats.
+    """
+    start_time = time()
+    archive_from = dirname(str(source).rstrip(sep))
+    bytes_in = 0
+    with ZipFile(destination, mode="w") as zip_file:
+        for dir_path, dir_names, file_names in walk(source, followlinks=True):
+            dir_names.sort()
+            zip_file.write(filename=dir_path, arcname=Path(dir_path).relative_to(archive_from))
+            for file_name in sorted(file_names):
+                file_path = Path(dir_path, file_name)
+                zip_file.write(
+                    filename=file_path, arcname=file_path.relative_to(archive_from),
+                    compress_type=get_zip_compress_type(file_path, policy))
+                bytes_in += getsize(file_path)
+    return {
+        "policy": policy.value, "bytes_in": bytes_in, "bytes_out": getsize(destination),
+        "duration": round(time() - start_time, 3)
+    }
 
 def unpack_zip_archive(source, destination):
     unpack_archive(filename=source, extract_dir=destination)
 
+def get_staging_dir(target_dir) -> Path:
+    # A sibling of the target, so the swap is a rename inside the same file system
+    return Path(Path(target_dir).parent, f".{Path(target_dir).name}.staging_{uuid4()}")
+
+def _load_renameat2():
+    try:
+        renameat2 = CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError):
+        # Not Linux or glibc older than 2.28
+        return None
+    renameat2.argtypes = [c_int, c_char_p, c_int, c_char_p, c_uint]
+    renameat2.restype = c_int
+    return renameat2
+
+_renameat2 = _load_renameat2()
+
+def exchange_paths(path_a, path_b) -> bool:
+    """
+    Atomically exchanges two existing paths with renameat2(RENAME_EXCHANGE), both paths exist at any time.
+    Returns False if the exchange is not supported by the platform or the file system.
+    """
+    if not _renameat2:
+        return False
+    if _renameat2(AT_FDCWD, fsencode(str(path_a)), AT_FDCWD, fsencode(str(path_b)), RENAME_EXCHANGE) == 0:
+        return True
+    error_number = get_errno()
+    if error_number in (EINVAL, ENOSYS, ENOTSUP):
+        return False
+    raise OSError(error_number, strerror(error_number), str(path_a), None, str(path_b))
+
+def swap_in_staging_dir(staging_dir, target_dir) -> Optional[Path]:
+    """
+    Replaces the target dir with the staging dir. Where supported, both are exchanged atomically, so the
+    target dir never disappears, otherwise the target dir is renamed aside before renaming the staging dir.
+    Returns the path the previous version of the target dir was moved to, or None if there was none.
+    """
+    target_dir = Path(target_dir)
+    previous_dir = None
+    if target_dir.exists():
+        previous_dir = Path(target_dir.parent, f".{target_dir.name}.previous_{int(time())}_{uuid4()}")
+        if exchange_paths(staging_dir, target_dir):
+            # The staging dir path now holds the previous version
+            rename(staging_dir, previous_dir)
+            return previous_dir
+        rename(target_dir, previous_dir)
+    try:
+        rename(staging_dir, target_dir)
+    except Exception as error:
+        if previous_dir:
+            rename(previous_dir, target_dir)
+        raise error
+    return previous_dir
+
+def remove_expired_previous_dirs(parent_dir, grace_period: int = WORKSPACE_SWAP_GRACE_PERIOD) -> List[Path]:
+    """
+    Removes the previous versions of the dirs inside the parent dir left by `swap_in_staging_dir`, the ones
+    older than the grace period. The rest are kept for the next call. Returns the paths of the removed dirs.
+    """
+    removed_dirs = []
+    try:
+        with scandir(parent_dir) as entries:
+            entry_names = [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return removed_dirs
+    for entry_name in entry_names:
+        previous_dir_match = re_match(PREVIOUS_DIR_NAME_PATTERN, entry_name)
+        if not previous_dir_match or int(previous_dir_match.group(1)) + grace_period > time():
+            continue
+        previous_dir = Path(parent_dir, entry_name)
+        rmtree(previous_dir, ignore_errors=True)
+        removed_dirs.append(previous_dir)
+    return removed_dirs
+
+
+def remove_file_groups_from_workspace(workspace, file_groups: List[str], recursive: bool = True, force: bool = True):
+    """
+    Removes several file groups of an ocrd workspace with a single pass over the page references of the METS,
+    instead of searching the whole METS again for each removed file. Saving the METS is left to the caller.
+    """
+    missing_file_groups = set(file_groups) - set(workspace.mets.file_groups)
+    if missing_file_groups and not force:
+        raise ValueError(f"No such file groups: {', '.join(sorted(missing_file_groups))}")
+    file_groups = [file_group for file_group in file_groups if file_group not in missing_file_groups]
+
+    file_ids = set()
+    local_filenames = []
+    for file_group in file_groups:
+        ocrd_files = list(workspace.mets.find_files(fileGrp=file_group))
+        if ocrd_files and not recursive:
+            raise ValueError(f"File group is not empty and recursive is not set: {file_group}")
+        for ocrd_file in ocrd_files:
+            file_ids.add(ocrd_file.ID)
+            if ocrd_file.local_filename:
+                local_filenames.append(ocrd_file.local_filename)
+    workspace_dir = Path(workspace.directory)
+    # Checked before the METS is changed, a failure leaves the METS untouched
+    missing_local_files = [
+        local_filename for local_filename in local_filenames if not Path(workspace_dir, local_filename).exists()]
+    if missing_local_files and not force:
+        raise FileNotFoundError(f"No such local files: {', '.join(missing_local_files)}")
+
+    mets_root = workspace.mets._tree.getroot()
+    for el_fptr in list(mets_root.iterfind(".//mets:fptr", namespaces=OCRD_NAMESPACES)):
+        if el_fptr.get("FILEID") not in file_ids:
+            continue
+        el_page_div = el_fptr.getparent()
+        el_page_div.remove(el_fptr)
+        # Same as ocrd, the pages left without files are removed as well
+        if not len(el_page_div):
+            el_page_div.getparent().remove(el_page_div)
+    for el_file_grp in list(mets_root.iterfind("mets:fileSec/mets:fileGrp", namespaces=OCRD_NAMESPACES)):
+        if el_file_grp.get("USE") in file_groups:
+            el_file_grp.getparent().remove(el_file_grp)
+    # The METS caches of ocrd, if enabled, are filled again from the changed tree
+    if getattr(workspace.mets, "_cache_flag", False):
+        workspace.mets._refresh_caches()
+
+    for local_filename in local_filenames:
+        Path(workspace_dir, local_filename).unlink(missing_ok=True)
+    # Only the dirs left empty are removed, the ones named after the file groups and the ones of the removed files
+    file_dirs = {Path(workspace_dir, file_group) for file_group in file_groups}
+    file_dirs.update(Path(workspace_dir, local_filename).parent for local_filename in local_filenames)
+    for file_dir in file_dirs:
+        if file_dir != workspace_dir and file_dir.is_dir() and not any(file_dir.iterdir()):
+            file_dir.rmdir()
+
+class _PushbackReader:
+    # Allows returning the bytes read past the end of a deflate stream to the reader
+    def __init__(self, fileobj) -> None:
+        self._fileobj = fileobj
+        self._pushed_back = b""
+        self.bytes_read = 0
+
+    def read(self, size: int) -> bytes:
+        if self._pushed_back:
+            data, self._pushed_back = self._pushed_back[:size], self._pushed_back[size:]
+        else:
+            data = self._fileobj.read(size)
+            self.bytes_read += len(data)
+        return data
+
+    def read_exact(self, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            data = self.read(min(size, ZIP_STREAM_CHUNK_SIZE))
+            if not data:
+                raise EOFError("Unexpected end of the zip stream")
+            chunks.append(data)
+            size -= len(data)
+        return b"".join(chunks)
+
+    def unread(self, data: bytes) -> None:
+        self._pushed_back = data + self._pushed_back
+
+def _get_zip_stream_target(destination: Path, entry_name: str) -> Path:
+    target = Path(destination, entry_name).resolve()
+    if not target.is_relative_to(destination.resolve()):
+        raise ValueError(f"Zip entry points outside of the extraction dir: {entry_name}")
+    return target
+
+def _write_zip_stream_entry(target: Path, method: int, data: bytes, expected_crc: int) -> int:
+    if method == ZIP_DEFLATED:
+        data = decompressobj(-MAX_WBITS).decompress(data)
+    if crc32(data) != expected_crc:
+        raise ValueError(f"CRC mismatch of extracted zip entry: {target}")
+    makedirs(target.parent, exist_ok=True)
+    with open(target, mode="wb") as target_file:
+        target_file.write(data)
+    return len(data)
+
+def _extract_zip_stream_entry_inline(
+    reader: _PushbackReader, target: Path, method: int, compressed_size: Optional[int]
+) -> Tuple[int, int]:
+    """
+    Extracts the entry chunk by chunk while reading it, returns the crc and the uncompressed size. Without
+    a compressed size (entries followed by a data descriptor), the deflate stream is read until its end.
+    """
+    decompressor = decompressobj(-MAX_WBITS) if method == ZIP_DEFLATED else None
+    entry_crc, entry_size = 0, 0
+    makedirs(target.parent, exist_ok=True)
+    with open(target, mode="wb") as target_file:
+        remaining = compressed_size
+        while remaining is None or remaining > 0:
+            chunk = reader.read(ZIP_STREAM_CHUNK_SIZE if remaining is None else min(remaining, ZIP_STREAM_CHUNK_SIZE))
+            if not chunk:
+                raise EOFError(f"Unexpected end of the zip stream while extracting: {target}")
+            if remaining is not None:
+                remaining -= len(chunk)
+            data = decompressor.decompress(chunk) if decompressor else chunk
+            entry_crc = crc32(data, entry_crc)
+            entry_size += len(data)
+            target_file.write(data)
+            if decompressor and decompressor.eof:
+                reader.unread(decompressor.unused_data)
+                break
+    return entry_crc, entry_size
+
+def _extract_zip_stream_stored_entry_with_descriptor(
+    reader: _PushbackReader, target: Path, is_zip64: bool
+) -> Tuple[int, int]:
+    """
+    Extracts a stored entry followed by a data descriptor, as written by streaming zip writers, and returns the
+    crc and the size. The end of the data is not known in advance, hence, the data is scanned for a descriptor
+    signature followed by the crc and the sizes of the data read so far. The descriptor is consumed as well.
+    """
+    descriptor_size = 4 + (20 if is_zip64 else 12)
+    signature = pack("<I", ZIP_DATA_DESCRIPTOR_SIGNATURE)
+    entry_crc, entry_size = 0, 0
+    buffer = b""
+    makedirs(target.parent, exist_ok=True)
+    with open(target, mode="wb") as target_file:
+        while True:
+            chunk = reader.read(ZIP_STREAM_CHUNK_SIZE)
+            if not chunk:
+                raise EOFError(f"Unexpected end of the zip stream while extracting: {target}")
+            buffer += chunk
+            position = buffer.find(signature)
+            while 0 <= position <= len(buffer) - descriptor_size:
+                descriptor = buffer[position + 4:position + descriptor_size]
+                crc, compressed_size, uncompressed_size = unpack("<IQQ" if is_zip64 else "<III", descriptor)
+                data = buffer[:position]
+                if (compressed_size == uncompressed_size == entry_size + len(data)
+                        and crc == crc32(data, entry_crc)):
+                    target_file.write(data)
+                    reader.unread(buffer[position + descriptor_size:])
+                    return crc, compressed_size
+                position = buffer.find(signature, position + 1)
+            # The tail may hold the beginning of a descriptor, the rest is entry data
+            keep_from = max(0, len(buffer) - descriptor_size + 1)
+            data, buffer = buffer[:keep_from], buffer[keep_from:]
+            entry_crc = crc32(data, entry_crc)
+            entry_size += len(data)
+            target_file.write(data)
+
+def extract_zip_stream(
+    fileobj, destination, threads: int = 1, inline_min_size: int = ZIP_STREAM_INLINE_MIN_SIZE
+) -> Dict[str, Any]:
+    """
+    Extracts the zip archive while its bytes are read from the file object (e.g., a remote sftp file),
+    the archive is never stored as a whole. The local file headers are followed sequentially and the
+    reading stops at the central directory. With several threads, the entries smaller than the inline
+    size are decompressed and written by a thread pool while the next entries are read. Returns the stats.
+    """
+    start_time = time()
+    destination = Path(destination)
+    makedirs(destination, exist_ok=True)
+    reader = _PushbackReader(fileobj)
+    entries, bytes_out = 0, 0
+    pending_entries: List[Future] = []
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="unzip") if threads > 1 else None
+    try:
+        while True:
+            signature = reader.read(4)
+            if len(signature) < 4 or unpack("<I", signature)[0] != ZIP_LOCAL_HEADER_SIGNATURE:
+                # The central directory is reached, all entries were extracted
+                break
+            (_, _, flags, method, _, _, entry_crc, compressed_size, uncompressed_size, name_length,
+             extra_length) = ZIP_LOCAL_HEADER.unpack(signature + reader.read_exact(ZIP_LOCAL_HEADER.size - 4))
+            name_bytes = reader.read_exact(name_length)
+            extra = reader.read_exact(extra_length)
+            entry_name = name_bytes.decode("utf-8" if flags & 0x800 else "cp437")
+            is_zip64 = compressed_size == 0xFFFFFFFF or uncompressed_size == 0xFFFFFFFF
+            if is_zip64:
+                uncompressed_size, compressed_size = _parse_zip64_sizes(extra)
+            if flags & 0x1:
+                raise ValueError(f"Encrypted zip entries are not supported: {entry_name}")
+            if method not in (ZIP_STORED, ZIP_DEFLATED):
+                raise ValueError(f"Unsupported compression method {method} of zip entry: {entry_name}")
+            target = _get_zip_stream_target(destination, entry_name)
+            entries += 1
+            if entry_name.endswith("/"):
+                makedirs(target, exist_ok=True)
+                if flags & 0x8:
+                    _read_zip_stream_data_descriptor(reader, is_zip64)
+                continue
+
+            if flags & 0x8:
+                # The crc and the sizes follow the data in a data descriptor
+                if method == ZIP_STORED:
+                    _, actual_size = _extract_zip_stream_stored_entry_with_descriptor(reader, target, is_zip64)
+                else:
+                    actual_crc, actual_size = _extract_zip_stream_entry_inline(reader, target, method, None)
+                    entry_crc = _read_zip_stream_data_descriptor(reader, is_zip64)
+                    if actual_crc != entry_crc:
+                        raise ValueError(f"CRC mismatch of extracted zip entry: {target}")
+                bytes_out += actual_size
+            elif executor and compressed_size < inline_min_size:
+                pending_entries.append(executor.submit(
+                    _write_zip_stream_entry, target, method, reader.read_exact(compressed_size), entry_crc))
+                # Keeps the amount of entries held in memory bounded
+                while len(pending_entries) > threads * 2:
+                    bytes_out += pending_entries.pop(0).result()
+            else:
+                actual_crc, actual_size = _extract_zip_stream_entry_inline(reader, target, method, compressed_size)
+                if actual_crc != entry_crc:
+                    raise ValueError(f"CRC mismatch of extracted zip entry: {target}")
+                bytes_out += actual_size
+        for pending_entry in pending_entries:
+            bytes_out += pending_entry.result()
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return {
+        "entries": entries, "bytes_in": reader.bytes_read, "bytes_out": bytes_out,
+        "duration": round(time() - start_time, 3)
+    }
+
+def _read_zip_stream_data_descriptor(reader: _PushbackReader, is_zip64: bool) -> int:
+    # Returns the crc of the data descriptor, the signature of the descriptor is optional
+    descriptor = reader.read_exact(4)
+    if unpack("<I", descriptor)[0] == ZIP_DATA_DESCRIPTOR_SIGNATURE:
+        descriptor = reader.read_exact(4)
+    reader.read_exact(16 if is_zip64 else 8)
+    return unpack("<I", descriptor)[0]
+
+def _parse_zip64_sizes(extra: bytes) -> Tuple[int, int]:
+    # Returns the uncompressed and the compressed size from the zip64 extended information extra field
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, data_size = unpack("<HH", extra[offset:offset + 4])
+        if header_id == 0x0001:
+            return unpack("<QQ", extra[offset + 4:offset + 20])
+        offset += 4 + data_size
+    raise ValueError("The zip64 extra field is missing")
+
 def verify_database_uri(mongodb_address: str) -> str:
     try:
         # perform validation check
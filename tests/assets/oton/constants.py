@@ -7,6 +7,8 @@ IN_TXT_WF4 = f'{OTON_RESOURCES_DIR}/workflow4.txt'
 
 OUT_NF_WF1_APPTAINER = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_apptainer.nf'
 OUT_NF_WF1_APPTAINER_WITH_MS = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_apptainer_with_MS.nf'
+OUT_NF_WF1_APPTAINER_CHUNKS = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_apptainer_chunks.nf'
+OUT_NF_WF1_APPTAINER_TREE_MERGE = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_apptainer_tree_merge.nf'
 OUT_NF_WF1_DOCKER = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_docker.nf'
 OUT_NF_WF1_DOCKER_WITH_MS = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_docker_with_MS.nf'
 OUT_NF_WF1_LOCAL = f'{OTON_RESOURCES_DIR}/test_output_nextflow1_local.nf'
@@ -55,6 +57,19 @@ workflow {
 }
 """
 
+EXPECTED_WF1_CHUNKS = """
+workflow {
+    main:
+        ch_range_multipliers = Channel.of(0..params.chunks.intValue()-1)
+        split_page_ranges(ch_range_multipliers)
+        ocrd_cis_ocropy_binarize_0(split_page_ranges.out[0], split_page_ranges.out[1], params.input_file_group, "OCR-D-BIN")
+"""
+
+EXPECTED_WF1_TREE_MERGE = """
+        merging_mets(ocrd_calamari_recognize_7.out[0].collect(), ocrd_calamari_recognize_7.out[1].collect())
+}
+"""
+
 EXPECTED_WF2 = """
 workflow {
     main:
@@ -123,6 +138,13 @@ PARAMETERS_DOCKER = {
     'params.env_wrapper_cmd_step2': '"null"',
 }
 
+PARAMETERS_CHUNKS = {
+    'params.chunk_size': '"auto"',
+    'params.chunks': 'Math.max(1, params.chunk_size == "auto" ? Math.min(params.pages.toInteger(), '
+                     'params.forks.toInteger() * 4) : '
+                     'Math.ceil(params.pages.toInteger() / params.chunk_size.toInteger()).intValue())',
+}
+
 PARAMETERS_APPTAINER = {
     'params.cpus': '"null"',
     'params.ram': '"null"',
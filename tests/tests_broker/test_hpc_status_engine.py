@@ -0,0 +1,60 @@
+from logging import getLogger
+from types import SimpleNamespace
+
+from operandi_broker import hpc_status_engine
+from operandi_broker.hpc_status_engine import HPCStatusEngine
+from operandi_utils.constants import StateJobSlurm
+
+
+class _StubExecutor:
+    def __init__(self, slurm_job_states):
+        self.slurm_job_states = slurm_job_states
+
+    def check_slurm_job_states(self, slurm_job_ids):
+        return {slurm_job_id: self.slurm_job_states[slurm_job_id] for slurm_job_id in slurm_job_ids}
+
+
+def test_failed_handling_does_not_persist_slurm_state(monkeypatch):
+    db_slurm_jobs = {
+        f"wf_job_{index}": SimpleNamespace(
+            workflow_job_id=f"wf_job_{index}", hpc_slurm_job_id=f"slurm_{index}",
+            hpc_slurm_job_state=StateJobSlurm.RUNNING)
+        for index in range(3)
+    }
+    persisted_states = {}
+
+    def update_states(workflow_job_ids_to_states):
+        for workflow_job_id, slurm_job_state in workflow_job_ids_to_states.items():
+            persisted_states[workflow_job_id] = slurm_job_state
+            db_slurm_jobs[workflow_job_id].hpc_slurm_job_state = slurm_job_state
+
+    monkeypatch.setattr(
+        hpc_status_engine, "sync_db_claim_hpc_slurm_jobs_state_check",
+        lambda workflow_job_ids, ttl_seconds: [db_slurm_jobs[job_id] for job_id in workflow_job_ids])
+    monkeypatch.setattr(hpc_status_engine, "sync_db_get_active_hpc_slurm_jobs", lambda: list(db_slurm_jobs.values()))
+    monkeypatch.setattr(hpc_status_engine, "sync_db_update_hpc_slurm_jobs_states", update_states)
+
+    executor = _StubExecutor({f"slurm_{index}": StateJobSlurm.COMPLETED for index in range(3)})
+    engine = HPCStatusEngine(logger=getLogger(__name__), hpc_executor=executor, rmq_publisher=None)
+
+    handled_calls = []
+
+    def failing_handler(workflow_job_id, new_slurm_job_state):
+        handled_calls.append(workflow_job_id)
+        if workflow_job_id == "wf_job_1":
+            raise ConnectionError("Publishing failed")
+
+    monkeypatch.setattr(engine, "handle_workflow_job_state", failing_handler)
+    changed = engine.check_active_jobs(force=True)
+    # The failure of the second job does not stop the handling of the third one
+    assert handled_calls == ["wf_job_0", "wf_job_1", "wf_job_2"]
+    assert changed == ["wf_job_0", "wf_job_2"]
+    assert persisted_states == {"wf_job_0": StateJobSlurm.COMPLETED, "wf_job_2": StateJobSlurm.COMPLETED}
+    assert db_slurm_jobs["wf_job_1"].hpc_slurm_job_state == StateJobSlurm.RUNNING
+
+    # The failed job is handled again with the next reconciliation
+    handled_calls.clear()
+    monkeypatch.setattr(engine, "handle_workflow_job_state", lambda **kwargs: handled_calls.append(kwargs["workflow_job_id"]))
+    assert engine.reconcile_due_jobs() == ["wf_job_1"]
+    assert handled_calls == ["wf_job_1"]
+    assert persisted_states["wf_job_1"] == StateJobSlurm.COMPLETED
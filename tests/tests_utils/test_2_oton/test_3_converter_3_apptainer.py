@@ -1,5 +1,9 @@
+from pytest import raises
+
 from tests.assets.oton.constants import (
-    EXPECTED_WF1, EXPECTED_WF1_WITH_MS, IN_TXT_WF1, OUT_NF_WF1_APPTAINER, OUT_NF_WF1_APPTAINER_WITH_MS)
+    EXPECTED_WF1, EXPECTED_WF1_CHUNKS, EXPECTED_WF1_TREE_MERGE, EXPECTED_WF1_WITH_MS, IN_TXT_WF1,
+    OUT_NF_WF1_APPTAINER, OUT_NF_WF1_APPTAINER_CHUNKS, OUT_NF_WF1_APPTAINER_TREE_MERGE, OUT_NF_WF1_APPTAINER_WITH_MS,
+    PARAMETERS_CHUNKS)
 from tests.tests_utils.test_2_oton.assert_utils import (
     assert_common_features, assert_common_features_apptainer, assert_compare_workflow_blocks)
 
@@ -15,3 +19,32 @@ def test_convert_wf1_with_env_apptainer_with_mets_server(oton_converter):
     assert_common_features(nextflow_file_class, 8, 1, True)
     assert_common_features_apptainer(nextflow_file_class)
     assert_compare_workflow_blocks(OUT_NF_WF1_APPTAINER_WITH_MS, EXPECTED_WF1_WITH_MS)
+
+def test_convert_wf1_with_env_apptainer_with_page_chunks(oton_converter):
+    nextflow_file_class = oton_converter.convert_oton(
+        IN_TXT_WF1, OUT_NF_WF1_APPTAINER_CHUNKS, "apptainer", False, chunk_size="auto")
+    assert_common_features(nextflow_file_class, 8, 1, False)
+    assert_common_features_apptainer(nextflow_file_class)
+    for parameter, value in PARAMETERS_CHUNKS.items():
+        assert nextflow_file_class.nf_lines_parameters[parameter] == value
+    assert "-D ${params.chunks}" in nextflow_file_class.nf_process_split_range.script
+    assert_compare_workflow_blocks(OUT_NF_WF1_APPTAINER_CHUNKS, EXPECTED_WF1_CHUNKS)
+
+def test_convert_wf1_with_env_apptainer_with_invalid_chunk_size(oton_converter):
+    with raises(ValueError):
+        oton_converter.convert_oton(IN_TXT_WF1, OUT_NF_WF1_APPTAINER_CHUNKS, "apptainer", False, chunk_size="0")
+
+def test_convert_wf1_with_env_apptainer_with_tree_merge(oton_converter):
+    nextflow_file_class = oton_converter.convert_oton(
+        IN_TXT_WF1, OUT_NF_WF1_APPTAINER_TREE_MERGE, "apptainer", False, merge_strategy="tree")
+    assert_common_features(nextflow_file_class, 8, 1, False)
+    assert_common_features_apptainer(nextflow_file_class)
+    merge_script = nextflow_file_class.nf_process_merging_mets.script
+    assert "-m \\${mets_chunks[i]} merge --force --no-copy-files \\${mets_chunks[i + step]}" in merge_script
+    assert "merge --force --no-copy-files \\${mets_chunks[0]} --page-id \\${page_ranges[0]}" in merge_script
+    assert_compare_workflow_blocks(OUT_NF_WF1_APPTAINER_TREE_MERGE, EXPECTED_WF1_TREE_MERGE)
+
+def test_convert_wf1_with_env_apptainer_with_invalid_merge_strategy(oton_converter):
+    with raises(ValueError):
+        oton_converter.convert_oton(
+            IN_TXT_WF1, OUT_NF_WF1_APPTAINER_TREE_MERGE, "apptainer", False, merge_strategy="parallel")
@@ -0,0 +1,31 @@
+from operandi_utils.oton.process_call_arguments import ProcessorCallArguments
+
+
+def test_required_models_from_parameters():
+    processor_call = ProcessorCallArguments(executable="kraken-recognize", parameters={"model": "typewriter.mlmodel"})
+    assert processor_call.get_required_models() == ["ocrd-kraken-recognize/typewriter.mlmodel"]
+
+
+def test_required_models_from_defaults():
+    processor_call = ProcessorCallArguments(executable="calamari-recognize")
+    assert processor_call.get_required_models() == ["ocrd-calamari-recognize/qurator-gt4histocr-1.0"]
+
+
+def test_required_models_none():
+    processor_call = ProcessorCallArguments(executable="cis-ocropy-binarize", parameters={"dpi": 300})
+    assert processor_call.get_required_models() == []
+
+
+def test_required_models_of_module():
+    # The tesserocr processors read the shared tessdata, the file extension of the models is resolved
+    tessdata_defaults = [
+        "ocrd-tesserocr-recognize/eng.traineddata",
+        "ocrd-tesserocr-recognize/osd.traineddata",
+        "ocrd-tesserocr-recognize/equ.traineddata",
+        "ocrd-tesserocr-recognize/configs"
+    ]
+    processor_call = ProcessorCallArguments(executable="tesserocr-recognize", parameters={"model": "Fraktur+deu"})
+    assert processor_call.get_required_models() == tessdata_defaults + [
+        "ocrd-tesserocr-recognize/Fraktur.traineddata", "ocrd-tesserocr-recognize/deu.traineddata"]
+    processor_call = ProcessorCallArguments(executable="tesserocr-segment-region", parameters={"dpi": 300})
+    assert processor_call.get_required_models() == tessdata_defaults
@@ -0,0 +1,68 @@
+from logging import getLogger
+from pathlib import Path
+
+from operandi_utils.hpc import nhr_connection_pool
+from operandi_utils.hpc.connection_utils import CircuitBreaker, get_backoff_delay
+from operandi_utils.hpc.nhr_connection_pool import NHRConnectionPool
+
+
+def test_circuit_breaker_opens_after_threshold():
+    circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.is_open
+    assert not circuit_breaker.allow_request()
+    assert circuit_breaker.remaining_open_time() > 0
+
+
+def test_circuit_breaker_half_open_trial():
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    circuit_breaker.record_failure()
+    assert circuit_breaker.is_open
+    # The reset timeout has passed, a trial request is allowed
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_success()
+    assert not circuit_breaker.is_open
+    assert circuit_breaker.remaining_open_time() == 0
+
+
+def test_get_backoff_delay_is_bounded():
+    for attempt in range(10):
+        delay = get_backoff_delay(attempt, base=2, max_delay=30)
+        assert 0 <= delay <= min(30, 2 * 2 ** attempt)
+
+
+class _StubSSHClient:
+    def __init__(self):
+        self.responsive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_pool_closes_broken_connection_after_release(monkeypatch):
+    monkeypatch.setattr(nhr_connection_pool, "is_ssh_conn_responsive", lambda logger, client: client.responsive)
+    connection_pool = NHRConnectionPool(
+        logger=getLogger(__name__), project_username="user", key_path=Path("key"), pool_size=1)
+    monkeypatch.setattr(connection_pool, "_open_connection", _StubSSHClient)
+
+    broken_client = connection_pool.acquire()
+    broken_client.responsive = False
+    # The broken connection is still held by the first caller, it is replaced without being closed
+    new_client = connection_pool.acquire()
+    assert new_client is not broken_client
+    assert not broken_client.closed
+    connection_pool.release(broken_client)
+    assert broken_client.closed
+
+    # A broken connection not held by any caller is closed right away
+    connection_pool.release(new_client)
+    new_client.responsive = False
+    with connection_pool.lease() as ssh_client:
+        assert ssh_client is not new_client
+        assert new_client.closed
+    assert connection_pool.get_metrics()["connections_held"] == 0
+    assert connection_pool.get_metrics()["connections_opened"] == 3
@@ -1,5 +1,12 @@
+from pathlib import Path
+
+from operandi_utils import get_nf_wfs_dir
 from operandi_utils.constants import StateJobSlurm
-from operandi_utils.hpc.nhr_executor_utils import parse_slurm_job_state_from_output
+from operandi_utils.hpc.nhr_executor_cmd_wrappers import cmd_nextflow_run
+from operandi_utils.hpc.nhr_executor_utils import (
+    find_nf_script_ocrd_models, parse_hpc_inventory_from_output, parse_slurm_job_state_from_output,
+    parse_slurm_job_states_from_output)
+from operandi_utils.hpc.nhr_inventory import HPCInventory
 
 
 def test_parse_slurm_job_state_from_output_none_and_empty():
@@ -72,3 +79,112 @@ def test_parse_slurm_job_state_from_output_invalid_state():
     slurm_job_state, msg = parse_slurm_job_state_from_output(test_output_out_of_memory)
     assert msg == f"Unknown parsed state: OUT_OF_ME+ from output: {test_output_out_of_memory}"
     assert slurm_job_state == StateJobSlurm.UNSET
+
+
+def test_parse_slurm_job_states_from_output_none_and_empty():
+    slurm_job_states, msg = parse_slurm_job_states_from_output(None)
+    assert msg == "No output available, something is odd."
+    assert slurm_job_states == {}
+
+    slurm_job_states, msg = parse_slurm_job_states_from_output([])
+    assert msg == "No output available, something is odd."
+    assert slurm_job_states == {}
+
+
+def test_parse_slurm_job_states_from_output_valid_states():
+    # Example output for reference:
+    # sacct -j 6313216,6313217,6313218,6313219 --parsable2 --noheader --format=jobid,state,exitcode
+    test_output = [
+        "6313216|OUT_OF_MEMORY|0:125\n",
+        "6313216.batch|OUT_OF_MEMORY|0:125\n",
+        "6313216.extern|COMPLETED|0:0\n",
+        "6313217|COMPLETED|0:0\n",
+        "6313217.batch|COMPLETED|0:0\n",
+        "6313217.extern|COMPLETED|0:0\n",
+        "6313218|PENDING|0:0\n",
+        "6313219|CANCELLED by 12345|0:0\n",
+        "6313219.batch|CANCELLED|0:15\n",
+        "6313219.extern|COMPLETED|0:0\n"
+    ]
+    slurm_job_states, msg = parse_slurm_job_states_from_output(test_output)
+    assert msg == "Parsed states recognized"
+    assert slurm_job_states == {
+        "6313216": StateJobSlurm.OUT_OF_MEMORY,
+        "6313217": StateJobSlurm.COMPLETED,
+        "6313218": StateJobSlurm.PENDING,
+        "6313219": StateJobSlurm.CANCELLED
+    }
+
+
+def test_parse_slurm_job_states_from_output_batch_step_preferred():
+    test_output = [
+        "6313216|RUNNING|0:0\n",
+        "6313216.batch|FAILED|1:0\n",
+        "6313216.extern|COMPLETED|0:0\n"
+    ]
+    slurm_job_states, msg = parse_slurm_job_states_from_output(test_output)
+    assert msg == "Parsed states recognized"
+    assert slurm_job_states == {"6313216": StateJobSlurm.FAILED}
+
+
+def test_parse_slurm_job_states_from_output_invalid_state():
+    test_output = [
+        "6313216|UNKNOWN_STATE|0:0\n",
+        "6313217|COMPLETED|0:0\n"
+    ]
+    slurm_job_states, msg = parse_slurm_job_states_from_output(test_output)
+    assert msg == f"Unknown parsed states: ['6313216: UNKNOWN_STATE'] from output: {test_output}"
+    assert slurm_job_states == {"6313216": StateJobSlurm.UNSET, "6313217": StateJobSlurm.COMPLETED}
+
+
+def test_parse_hpc_inventory_from_output():
+    test_output = [
+        "model ocrd-tesserocr-recognize/Fraktur.traineddata\n",
+        "model ocrd-calamari-recognize/qurator-gt4histocr-1.0\n",
+        "sif ocrd_core.sif\n",
+        "sif ocrd_tesserocr.sif\n",
+        "\n"
+    ]
+    ocrd_models, sif_images = parse_hpc_inventory_from_output(test_output)
+    assert ocrd_models == [
+        "ocrd-tesserocr-recognize/Fraktur.traineddata", "ocrd-calamari-recognize/qurator-gt4histocr-1.0"]
+    assert sif_images == ["ocrd_core.sif", "ocrd_tesserocr.sif"]
+    assert parse_hpc_inventory_from_output(None) == ([], [])
+
+
+def test_hpc_inventory_checks():
+    hpc_inventory = HPCInventory()
+    assert not hpc_inventory.is_fresh()
+    hpc_inventory.update(
+        ocrd_models=["ocrd-tesserocr-recognize/Fraktur.traineddata"],
+        sif_images=["ocrd_core.sif", "ocrd_tesserocr.sif"])
+    assert hpc_inventory.is_fresh()
+    assert hpc_inventory.has_model(ocrd_processor="ocrd-tesserocr-recognize", model="Fraktur.traineddata")
+    assert not hpc_inventory.has_model(ocrd_processor="ocrd-calamari-recognize", model="Fraktur.traineddata")
+    missing_sif_images = hpc_inventory.get_missing_sif_images(["ocrd_core.sif", "ocrd_calamari.sif"])
+    assert missing_sif_images == ["ocrd_calamari.sif"]
+
+
+def test_find_nf_script_ocrd_models():
+    ocrd_models = find_nf_script_ocrd_models(Path(get_nf_wfs_dir(), "odem_workflow.nf"))
+    assert "ocrd-tesserocr-recognize/Fraktur.traineddata" in ocrd_models
+    assert not [ocrd_model for ocrd_model in ocrd_models if not ocrd_model.startswith("ocrd-tesserocr-recognize/")]
+    assert find_nf_script_ocrd_models(Path(get_nf_wfs_dir(), "template_workflow.nf")) == []
+
+
+def test_cmd_nextflow_run_apptainer_instances():
+    nf_run_command_args = {
+        "sif_core": "ocrd_core.sif", "input_file_grp": "DEFAULT", "mets_basename": "mets.xml",
+        "use_mets_server": False, "nf_executable_steps": ["ocrd-cis-ocropy-binarize", "ocrd-tesserocr-recognize"],
+        "ws_pages_amount": 8, "cpus": 4, "ram": 16, "forks": 4
+    }
+    nf_run_command = cmd_nextflow_run(**nf_run_command_args)
+    assert "PH_NODE_DIR_PROCESSOR_SIFS/ocrd_tesserocr.sif" in nf_run_command
+    assert "instance://" not in nf_run_command
+
+    nf_run_command = cmd_nextflow_run(**nf_run_command_args, use_apptainer_instances=True)
+    assert "PH_NODE_DIR_PROCESSOR_SIFS" not in nf_run_command
+    assert "--bind" not in nf_run_command
+    assert "instance://PH_APPTAINER_INSTANCE_PREFIX_ocrd_core" in nf_run_command
+    assert "instance://PH_APPTAINER_INSTANCE_PREFIX_ocrd_cis" in nf_run_command
+    assert "instance://PH_APPTAINER_INSTANCE_PREFIX_ocrd_tesserocr" in nf_run_command
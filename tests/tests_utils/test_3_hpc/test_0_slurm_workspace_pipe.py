@@ -0,0 +1,50 @@
+from pathlib import Path
+from threading import Thread
+
+from pytest import raises
+
+from operandi_utils.hpc.nhr_transfer import SlurmWorkspacePipe
+
+
+def create_test_pipe() -> SlurmWorkspacePipe:
+    return SlurmWorkspacePipe(
+        ocrd_workspace_dir=Path("ws"), workflow_job_id="wf_job", nextflow_script_path=Path("wf.nf"),
+        buffer_size=8, chunk_size=4)
+
+
+def test_slurm_workspace_pipe_bounded_transfer():
+    zip_pipe = create_test_pipe()
+    data = bytes(range(256)) * 4
+
+    def _write():
+        for index in range(0, len(data), 3):
+            zip_pipe.write(data[index:index + 3])
+        zip_pipe.close()
+
+    # The pipe holds only two chunks, the writer blocks until the reader consumes them
+    writer = Thread(target=_write)
+    writer.start()
+    received = b"".join(chunk for chunk in zip_pipe)
+    writer.join()
+    assert received == data
+
+
+def test_slurm_workspace_pipe_abort_unblocks_writer():
+    zip_pipe = create_test_pipe()
+    errors = []
+
+    def _write():
+        try:
+            while True:
+                zip_pipe.write(b"data")
+        except RuntimeError as error:
+            errors.append(error)
+
+    writer = Thread(target=_write)
+    writer.start()
+    zip_pipe.abort(ConnectionError("Upload failed"))
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+    assert "Upload failed" in str(errors[0])
+    with raises(RuntimeError):
+        next(iter(zip_pipe))
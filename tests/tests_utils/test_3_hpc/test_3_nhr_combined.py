@@ -8,7 +8,7 @@ from operandi_server.constants import (
 from operandi_utils.hpc.constants import (
     HPC_JOB_DEADLINE_TIME_TEST, HPC_NHR_JOB_TEST_PARTITION, HPC_JOB_QOS_SHORT
 )
-from tests.helpers_asserts import assert_exists_dir, assert_exists_file
+from tests.helpers_asserts import assert_exists_dir
 
 OPERANDI_SERVER_BASE_DIR = environ.get("OPERANDI_SERVER_BASE_DIR")
 
@@ -28,19 +28,14 @@ def helper_pack_and_put_slurm_workspace(
     local_workspace_dir = copytree(src=path_workspace_dir, dst=dst_path)
     assert_exists_dir(str(local_workspace_dir))
 
-    local_slurm_workspace_zip_path = hpc_nhr_data_transfer.create_slurm_workspace_zip(
+    # The slurm workspace zip is packed directly into the remote file, no local zip is created
+    hpc_dst_slurm_zip = hpc_nhr_data_transfer.pack_and_put_slurm_workspace(
         ocrd_workspace_dir=Path(local_workspace_dir), workflow_job_id=workflow_job_id,
-        nextflow_script_path=path_workflow, tempdir_prefix="test_slurm_workspace-")
-    assert_exists_file(str(local_slurm_workspace_zip_path))
-
-    hpc_dst_slurm_zip = hpc_nhr_data_transfer.put_slurm_workspace(
-        local_src_slurm_zip=local_slurm_workspace_zip_path, workflow_job_id=workflow_job_id)
+        nextflow_script_path=path_workflow)
 
     # TODO: implement this
     # assert_exists_remote_file(hpc_dst_slurm_zip)
 
-    Path(local_slurm_workspace_zip_path).unlink(missing_ok=True)
-
 
 def _test_pack_and_put_slurm_workspace_failing(hpc_nhr_data_transfer, path_small_workspace_data_dir, template_workflow):
     helper_pack_and_put_slurm_workspace(
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from pytest import skip
+
+from operandi_utils import get_staging_dir, remove_expired_previous_dirs, swap_in_staging_dir, utils
+from operandi_utils.utils import exchange_paths
+
+
+def test_swap_in_staging_dir(tmp_path):
+    target_dir = Path(tmp_path, "workspace")
+    target_dir.mkdir()
+    Path(target_dir, "mets.xml").write_text("previous")
+    staging_dir = get_staging_dir(target_dir)
+    assert staging_dir.parent == target_dir.parent
+    staging_dir.mkdir()
+    Path(staging_dir, "mets.xml").write_text("results")
+
+    previous_dir = swap_in_staging_dir(staging_dir=staging_dir, target_dir=target_dir)
+    assert not staging_dir.exists()
+    assert Path(target_dir, "mets.xml").read_text() == "results"
+    assert Path(previous_dir, "mets.xml").read_text() == "previous"
+
+    # Not expired yet
+    assert remove_expired_previous_dirs(parent_dir=tmp_path, grace_period=300) == []
+    assert previous_dir.exists()
+    # Unrelated dirs with a similar name are left untouched
+    unrelated_dir = Path(tmp_path, ".workspace.previous_unknown")
+    unrelated_dir.mkdir()
+    assert remove_expired_previous_dirs(parent_dir=tmp_path, grace_period=0) == [previous_dir]
+    assert not previous_dir.exists()
+    assert unrelated_dir.exists()
+    assert Path(target_dir, "mets.xml").read_text() == "results"
+
+
+def test_swap_in_staging_dir_without_previous(tmp_path):
+    target_dir = Path(tmp_path, "workspace")
+    staging_dir = get_staging_dir(target_dir)
+    staging_dir.mkdir()
+    assert swap_in_staging_dir(staging_dir=staging_dir, target_dir=target_dir) is None
+    assert target_dir.is_dir()
+
+
+def test_exchange_paths(tmp_path):
+    path_a, path_b = Path(tmp_path, "a"), Path(tmp_path, "b")
+    path_a.mkdir()
+    path_b.mkdir()
+    Path(path_a, "file").write_text("a")
+    Path(path_b, "file").write_text("b")
+    if not exchange_paths(path_a, path_b):
+        skip("renameat2 with RENAME_EXCHANGE is not supported here")
+    assert Path(path_a, "file").read_text() == "b"
+    assert Path(path_b, "file").read_text() == "a"
+
+
+def test_swap_in_staging_dir_without_exchange(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_renameat2", None)
+    target_dir = Path(tmp_path, "workspace")
+    target_dir.mkdir()
+    Path(target_dir, "mets.xml").write_text("previous")
+    staging_dir = get_staging_dir(target_dir)
+    staging_dir.mkdir()
+    Path(staging_dir, "mets.xml").write_text("results")
+    previous_dir = swap_in_staging_dir(staging_dir=staging_dir, target_dir=target_dir)
+    assert Path(target_dir, "mets.xml").read_text() == "results"
+    assert Path(previous_dir, "mets.xml").read_text() == "previous"
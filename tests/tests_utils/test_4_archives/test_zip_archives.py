@@ -0,0 +1,92 @@
+from filecmp import dircmp
+from os import urandom
+from pathlib import Path
+from shutil import which
+from subprocess import PIPE, run
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from pytest import mark
+
+from operandi_utils import extract_zip_stream, make_zip_archive, TransferArchivePolicy
+from operandi_utils.hpc.nhr_transfer import _StreamWriter
+
+
+def assert_same_dirs(dir_a: Path, dir_b: Path):
+    comparison = dircmp(dir_a, dir_b)
+    assert not comparison.left_only and not comparison.right_only and not comparison.diff_files
+    for sub_dir in comparison.common_dirs:
+        assert_same_dirs(Path(dir_a, sub_dir), Path(dir_b, sub_dir))
+
+
+def test_make_zip_archive_policies(tmp_path, path_small_workspace_data_dir):
+    for policy in TransferArchivePolicy:
+        zip_path = Path(tmp_path, f"{policy.value}.zip")
+        archive_stats = make_zip_archive(path_small_workspace_data_dir, zip_path, policy=policy)
+        assert archive_stats["policy"] == policy.value
+        assert archive_stats["bytes_out"] == zip_path.stat().st_size
+        with ZipFile(zip_path) as zip_file:
+            assert zip_file.testzip() is None
+            for zip_info in zip_file.infolist():
+                if policy == TransferArchivePolicy.STORE and not zip_info.is_dir():
+                    assert zip_info.compress_type == 0
+
+
+def test_extract_zip_stream(tmp_path, path_small_workspace_data_dir):
+    zip_path = Path(tmp_path, "workspace.zip")
+    make_zip_archive(path_small_workspace_data_dir, zip_path, policy=TransferArchivePolicy.DEFLATE)
+    expected_dir = Path(tmp_path, "expected")
+    with ZipFile(zip_path) as zip_file:
+        zip_file.extractall(expected_dir)
+    for threads in [1, 4]:
+        extracted_dir = Path(tmp_path, f"extracted_{threads}")
+        with open(zip_path, mode="rb") as zip_fileobj:
+            archive_stats = extract_zip_stream(zip_fileobj, extracted_dir, threads=threads)
+        assert archive_stats["bytes_out"] > 0
+        assert_same_dirs(expected_dir, extracted_dir)
+
+
+def create_test_dir(tmp_path) -> Path:
+    test_dir = Path(tmp_path, "source", "ws")
+    Path(test_dir, "images").mkdir(parents=True)
+    Path(test_dir, "mets.xml").write_text("<mets/>" * 1000)
+    Path(test_dir, "images", "a.tif").write_bytes(urandom(300 * 1024))
+    # Bytes looking like a data descriptor signature inside the data of a stored entry
+    Path(test_dir, "images", "b.tif").write_bytes(b"PK\x07\x08" + urandom(20) + b"PK\x07\x08")
+    Path(test_dir, "images", "empty.tif").write_bytes(b"")
+    return test_dir
+
+
+def assert_extract_zip_stream(tmp_path, zip_path: Path, expected_dir: Path):
+    for threads in [1, 4]:
+        extracted_dir = Path(tmp_path, f"extracted_{threads}")
+        with open(zip_path, mode="rb") as zip_fileobj:
+            extract_zip_stream(zip_fileobj, extracted_dir, threads=threads)
+        assert_same_dirs(expected_dir, Path(extracted_dir, expected_dir.name))
+
+
+def test_extract_zip_stream_data_descriptors(tmp_path):
+    # Written to a non-seekable stream, each entry is followed by a data descriptor, as for the slurm workspace zip
+    test_dir = create_test_dir(tmp_path)
+    zip_path = Path(tmp_path, "streamed.zip")
+    with open(zip_path, mode="wb") as zip_fileobj:
+        with ZipFile(_StreamWriter(zip_fileobj), mode="w") as zip_file:
+            for file_path in sorted(test_dir.rglob("*")):
+                if file_path.is_file():
+                    compress_type = ZIP_STORED if file_path.suffix == ".tif" else ZIP_DEFLATED
+                    zip_file.write(file_path, file_path.relative_to(test_dir.parent), compress_type=compress_type)
+    with ZipFile(zip_path) as zip_file:
+        assert all(zip_info.flag_bits & 0x8 for zip_info in zip_file.infolist())
+    assert_extract_zip_stream(tmp_path, zip_path, test_dir)
+
+
+@mark.skipif(not which("zip"), reason="Info-ZIP is not installed")
+@mark.parametrize("zip_args", [["-r"], ["-0", "-r"]])
+def test_extract_zip_stream_info_zip(tmp_path, zip_args):
+    test_dir = create_test_dir(tmp_path)
+    zip_path = Path(tmp_path, "info_zip.zip")
+    run(["zip", "-q", *zip_args, str(zip_path), test_dir.name], cwd=test_dir.parent, check=True)
+    assert_extract_zip_stream(tmp_path, zip_path, test_dir)
+    # Written to a pipe, Info-ZIP adds data descriptors
+    zip_output = run(["zip", "-q", *zip_args, "-", test_dir.name], cwd=test_dir.parent, check=True, stdout=PIPE)
+    zip_path.write_bytes(zip_output.stdout)
+    assert_extract_zip_stream(tmp_path, zip_path, test_dir)
@@ -0,0 +1,59 @@
+from pathlib import Path
+from shutil import copytree
+
+from ocrd import Resolver
+from pytest import raises
+
+from operandi_utils import remove_file_groups_from_workspace
+
+
+def _copy_workspace(source_dir, destination_dir):
+    copytree(source_dir, destination_dir)
+    return Resolver().workspace_from_url(mets_url=str(Path(destination_dir, "mets.xml")), download=False)
+
+
+def test_remove_file_groups_same_as_ocrd(tmp_path, path_small_workspace_data_dir):
+    file_groups = ["DEFAULT", "THUMBS", "NON-EXISTING"]
+    expected_workspace = _copy_workspace(path_small_workspace_data_dir, Path(tmp_path, "expected"))
+    for file_group in file_groups:
+        expected_workspace.remove_file_group(file_group, recursive=True, force=True)
+    expected_workspace.save_mets()
+
+    workspace = _copy_workspace(path_small_workspace_data_dir, Path(tmp_path, "single_pass"))
+    remove_file_groups_from_workspace(workspace, file_groups=file_groups, recursive=True, force=True)
+    workspace.save_mets()
+
+    assert Path(tmp_path, "single_pass", "mets.xml").read_text() == Path(tmp_path, "expected", "mets.xml").read_text()
+    assert not Path(tmp_path, "single_pass", "DEFAULT").exists()
+    assert sorted(path.name for path in Path(tmp_path, "single_pass").rglob("*")) == \
+        sorted(path.name for path in Path(tmp_path, "expected").rglob("*"))
+
+
+def test_remove_file_groups_not_forced(tmp_path, path_small_workspace_data_dir):
+    workspace = _copy_workspace(path_small_workspace_data_dir, Path(tmp_path, "workspace"))
+    with raises(ValueError):
+        remove_file_groups_from_workspace(workspace, file_groups=["DEFAULT", "NON-EXISTING"], force=False)
+    with raises(ValueError):
+        remove_file_groups_from_workspace(workspace, file_groups=["DEFAULT"], recursive=False)
+    assert "DEFAULT" in workspace.mets.file_groups
+
+
+def test_remove_file_groups_cached_mets(tmp_path, path_small_workspace_data_dir, monkeypatch):
+    monkeypatch.setenv("OCRD_METS_CACHING", "true")
+    workspace = _copy_workspace(path_small_workspace_data_dir, Path(tmp_path, "workspace"))
+    assert workspace.mets._cache_flag
+    remove_file_groups_from_workspace(workspace, file_groups=["DEFAULT", "THUMBS"], recursive=True, force=True)
+    # The same METS object does not return the removed files from its caches
+    assert "DEFAULT" not in workspace.mets.file_groups
+    assert not list(workspace.mets.find_files(fileGrp="DEFAULT"))
+    assert not Path(tmp_path, "workspace", "DEFAULT").exists()
+
+
+def test_remove_file_groups_missing_local_file(tmp_path, path_small_workspace_data_dir):
+    workspace = _copy_workspace(path_small_workspace_data_dir, Path(tmp_path, "workspace"))
+    ocrd_file = next(workspace.mets.find_files(fileGrp="DEFAULT"))
+    Path(workspace.directory, ocrd_file.local_filename).unlink()
+    with raises(FileNotFoundError):
+        remove_file_groups_from_workspace(workspace, file_groups=["DEFAULT"], force=False)
+    assert "DEFAULT" in workspace.mets.file_groups
+    assert list(workspace.mets.find_files(fileGrp="DEFAULT"))